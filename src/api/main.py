@@ -14,11 +14,53 @@
 
 # app.include_router(router)
 
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import os
 
-from src.api.routes import router
+from src.api.routes import metrics_router, router
+from src.config.settings import WORKER_REPORT_INTERVAL
+from src.features.feature_store import feature_store
+from src.models.model_registry import registry
+from src.serving import shared_state
+from src.services import async_signal_service
+
+
+async def report_memory(snapshot):
+    # Lets /api/workers show every worker, whichever one answers
+    loop = asyncio.get_running_loop()
+    while True:
+        with suppress(Exception):
+            await loop.run_in_executor(None, shared_state.write_report, snapshot)
+        await asyncio.sleep(WORKER_REPORT_INTERVAL)
+
+
+# -----------------------------
+# Startup: load every model once
+# (shared mode: attach to the published generation instead)
+# -----------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    reporter = None
+
+    serving_dir = os.getenv(shared_state.SHARED_ENV)
+    if serving_dir:
+        snapshot = shared_state.SharedSnapshot(Path(serving_dir))
+        app.state.snapshot = snapshot
+        registry.attach(snapshot)
+        feature_store.attach(snapshot)
+        reporter = asyncio.create_task(report_memory(snapshot))
+
+    registry.load_all()
+    yield
+
+    if reporter is not None:
+        reporter.cancel()
+    async_signal_service.shutdown()
+
 
 # -----------------------------
 # Create FastAPI app (CRITICAL)
@@ -26,7 +68,8 @@ from src.api.routes import router
 app = FastAPI(
     title="PTRE Signal Engine",
     version="1.0",
-    description="Trend + Momentum based market intelligence"
+    description="Trend + Momentum based market intelligence",
+    lifespan=lifespan
 )
 
 # -----------------------------
@@ -49,5 +92,6 @@ app.add_middleware(
 # API Routes
 # -----------------------------
 app.include_router(router)
+app.include_router(metrics_router)
 
 
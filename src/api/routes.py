@@ -1,15 +1,82 @@
-from fastapi import APIRouter, HTTPException
-from src.services.signal_service import generate_signal
+import asyncio
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
+from src.services.async_signal_service import (
+    cached_signal_async,
+    generate_signals_async,
+    signal_history_async,
+)
 from src.config.tickers import TICKERS
+from src.models.model_registry import registry
+from src.serving import shared_state
+from src.services.response_cache import cache_headers, response_cache
+from src.utils import metrics
 
 router = APIRouter(prefix="/api")
 
+# Unprefixed routes (Prometheus scrapes /metrics)
+metrics_router = APIRouter()
+
 @router.get("/signal/{ticker}")
-def get_signal(ticker: str):
+async def get_signal(
+    ticker: str,
+    if_none_match: Optional[str] = Header(None),
+    x_debug_timing: Optional[str] = Header(None, description="Send to get a Server-Timing breakdown")
+):
+    trace = metrics.start_trace()
+
+    with metrics.stage("request"):
+        try:
+            etag, body, status = await cached_signal_async(ticker.upper(), if_none_match)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Ticker not supported")
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Signal computation timed out")
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+        headers = cache_headers(etag, status)
+
+        # Unchanged since the client's copy: no body (dashboard polling)
+        if body is None:
+            response = Response(status_code=304, headers=headers)
+        else:
+            with metrics.stage("serialize"):
+                response = JSONResponse(body, headers=headers)
+
+    if x_debug_timing:
+        response.headers["Server-Timing"] = metrics.server_timing(trace)
+
+    return response
+
+@router.get("/signal/{ticker}/history")
+async def get_signal_history(
+    ticker: str,
+    start: Optional[date] = Query(None, description="First date (YYYY-MM-DD)"),
+    end: Optional[date] = Query(None, description="Last date (YYYY-MM-DD)"),
+    limit: Optional[int] = Query(None, ge=1, description="Most recent N signals")
+):
+    try:
+        return await signal_history_async(
+            ticker.upper(),
+            None if start is None else start.isoformat(),
+            None if end is None else end.isoformat(),
+            limit
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/signals")
+async def get_signals(tickers: Optional[str] = Query(None, description="Comma-separated tickers")):
+    selected = [t.strip() for t in tickers.split(",") if t.strip()] if tickers else None
     try:
-        return generate_signal(ticker.upper())
-    except FileNotFoundError:
-        raise HTTPException(status_code=404, detail="Ticker not supported")
+        return await generate_signals_async(selected)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Signal computation timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -18,3 +85,60 @@ def get_tickers():
     return {
         "tickers": TICKERS
         }
+
+@router.get("/models")
+def get_models():
+    registry.refresh()
+    return registry.stats()
+
+@router.get("/cache")
+def get_cache():
+    return response_cache.stats()
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    cache = response_cache.stats()
+
+    text = (
+        metrics.stage_metrics.render()
+        + metrics.render_counter(
+            "response_cache_total", "Signal response cache lookups.", "result",
+            {
+                "hit": cache["hits"],
+                "miss": cache["misses"],
+                "not_modified": cache["not_modified"],
+            }
+        )
+        + metrics.render_counter(
+            "response_cache_evictions_total", "Signal responses evicted.", "cache",
+            {"signal": cache["evictions"]}
+        )
+    )
+
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@router.get("/workers")
+def get_workers(request: Request):
+    snapshot = getattr(request.app.state, "snapshot", None)
+
+    if snapshot is None:
+        # Single-process mode: only this process to report
+        return {
+            "mode": "single",
+            "this_worker": shared_state.memory_report(),
+            "workers": [],
+        }
+
+    generation = snapshot.current()
+    this_worker = shared_state.write_report(snapshot)
+    workers = shared_state.read_reports(snapshot.serving_dir)
+
+    return {
+        "mode": "shared",
+        "generation": generation.name,
+        "shared_mb": round(generation.shared_bytes() / 2**20, 2),
+        "this_worker": this_worker,
+        "workers": workers,
+        "total_rss_mb": round(sum(w["rss_mb"] for w in workers), 2),
+        "total_uss_mb": round(sum(w["uss_mb"] for w in workers), 2),
+    }
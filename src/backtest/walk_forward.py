@@ -0,0 +1,456 @@
+"""
+PTRE - Walk-Forward Backtest
+
+Replays generate_final_signal day by day over history, with models
+that only ever saw data available before each test day.
+
+- History is cut into test blocks of STEP trading days; each block's
+  trend and momentum models are fit on the rows before it (expanding
+  window, or the last ROLLING_ROWS rows), minus a purge gap of
+  PREDICTION_HORIZON rows whose labels would peek into the block
+- refit "full": every fold retrains + calibrates like
+  save_calibrated_models (same HGB params, calibration and split)
+- refit "calibrate": the base model is trained once on the first
+  window; later folds only refit the isotonic calibrator on the most
+  recent calibration rows
+- Every test day goes through the same predict_direction +
+  apply_soft_gating as the live signal; a position (the trend
+  direction) is taken when the signal is directional and its
+  confidence clears the cutoff
+- Features come from the memory-mapped panel (built once, shared by
+  all workers); folds run in parallel on a process pool
+- Reports directional accuracy (vs the sign of the horizon return),
+  coverage and next-day PnL per ticker and for an equal-weight book
+
+Outputs (data/backtest/):
+- {ticker}_walk_forward   daily signals, positions and PnL
+- equity                  equity curves (one column per ticker + book)
+- summary.json            settings and metrics
+
+Needs the panel dataset (python -m src.features.build_panel).
+
+Run: python -m src.backtest.walk_forward [--window expanding|rolling]
+                                         [--refit full|calibrate]
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.frozen import FrozenEstimator
+
+from src.config.settings import CONFIDENCE_DEADBAND_HIGH, PREDICTION_HORIZON
+from src.features.build_panel import PANEL_DIR, Panel
+from src.models.generate_final_signal import apply_soft_gating, predict_direction
+from src.models.save_calibrated_models import (
+    CALIB_END,
+    CALIBRATION,
+    HGB_PARAMS,
+    MODEL_SPECS,
+    TRAIN_END,
+    train_and_calibrate,
+    training_dtype,
+)
+from src.models.train_farm import plan
+from src.utils.storage import BASE_DIR, locate, read_dataset, write_frame
+
+BACKTEST_DIR = BASE_DIR / "data" / "backtest"
+
+# Rows before the first test day (~3 trading years)
+MIN_TRAIN_ROWS = 756
+
+# Test block length; models are refit once per block (~half a year)
+STEP_ROWS = 126
+
+# Training window length for --window rolling
+ROLLING_ROWS = 756
+
+# Share of a training window used for calibration (15 / 85, as in
+# save_calibrated_models' 70 / 15 split)
+CALIB_SHARE = (CALIB_END - TRAIN_END) / CALIB_END
+
+TRADING_DAYS = 252
+
+
+# =====================
+# Folds
+# =====================
+
+def make_folds(n_rows: int, window: str = "expanding",
+               min_train: int = MIN_TRAIN_ROWS, step: int = STEP_ROWS,
+               rolling_rows: int = ROLLING_ROWS,
+               purge: int = PREDICTION_HORIZON):
+    """
+    [(train_start, train_end, test_start, test_end)] as row positions
+    inside one ticker's block. A row's label needs `purge` future rows,
+    so training stops `purge` rows before the test block.
+    """
+    if window not in ("expanding", "rolling"):
+        raise ValueError(f"Unknown window: {window}")
+
+    folds = []
+    for test_start in range(min_train, n_rows, step):
+        train_end = test_start - purge
+        train_start = 0 if window == "expanding" else max(0, train_end - rolling_rows)
+
+        folds.append((train_start, train_end, test_start, min(test_start + step, n_rows)))
+
+    return folds
+
+
+# =====================
+# Worker side
+# =====================
+
+# One mapping of the panel per worker process
+_panels = {}
+
+
+def _panel(panel_dir) -> Panel:
+    panel_dir = str(panel_dir)
+    if panel_dir not in _panels:
+        _panels[panel_dir] = Panel(Path(panel_dir))
+    return _panels[panel_dir]
+
+
+def _window(panel: Panel, ticker: str, kind: str, start: int, end: int):
+    """
+    Labeled (fit, calibration) arrays of a training window.
+    """
+    offset = panel.rows(ticker).start
+    X, y = panel.take(slice(offset + start, offset + end), kind)
+
+    X, y = np.asarray(X), y.astype(np.int64)
+    cut = int(len(y) * (1 - CALIB_SHARE))
+
+    return (X[:cut], y[:cut]), (X[cut:], y[cut:])
+
+
+def _test_rows(panel: Panel, ticker: str, start: int, end: int):
+    # Every trading day is scored, labeled or not
+    offset = panel.rows(ticker).start
+    return np.asarray(panel.features[offset + start:offset + end])
+
+
+def _fit_base(X, y):
+    model = HistGradientBoostingClassifier(**HGB_PARAMS)
+    return model.fit(X, y)
+
+
+def _recalibrate(base, X, y):
+    calibrated = CalibratedClassifierCV(
+        FrozenEstimator(base),
+        method=CALIBRATION["method"]
+    )
+    calibrated.fit(X, y)
+    calibrated.feature_dtype_ = training_dtype(X)
+    return calibrated
+
+
+def _predictions(models: dict, X) -> dict:
+    out = {}
+    for kind, model in models.items():
+        direction, conf = predict_direction(model, X)
+        out[f"{kind}_dir"] = direction.astype(np.int8)
+        out[f"{kind}_conf"] = conf
+    return out
+
+
+def run_folds(panel_dir, ticker: str, folds, refit: str, threads: int) -> list:
+    """
+    Fit and score the given folds of one ticker.
+    Returns [(fold number, {column: test-row array}, fit seconds)].
+    """
+    from threadpoolctl import threadpool_limits
+
+    panel = _panel(panel_dir)
+    results = []
+    bases = {}
+
+    with threadpool_limits(limits=threads, user_api="openmp"):
+        for number, (train_start, train_end, test_start, test_end) in folds:
+            start = time.perf_counter()
+
+            models = {}
+            for kind in MODEL_SPECS:
+                (X_fit, y_fit), (X_cal, y_cal) = _window(
+                    panel, ticker, kind, train_start, train_end
+                )
+
+                if refit == "full":
+                    models[kind] = train_and_calibrate(X_fit, y_fit, X_cal, y_cal)
+                else:
+                    if kind not in bases:
+                        bases[kind] = _fit_base(X_fit, y_fit)
+                    models[kind] = _recalibrate(bases[kind], X_cal, y_cal)
+
+            seconds = time.perf_counter() - start
+
+            X_test = _test_rows(panel, ticker, test_start, test_end)
+            results.append((number, _predictions(models, X_test), seconds))
+
+    return results
+
+
+# =====================
+# Replay and metrics
+# =====================
+
+def replay(ticker: str, panel: Panel, folds, predictions: dict,
+           cutoff: float = CONFIDENCE_DEADBAND_HIGH) -> pd.DataFrame:
+    """
+    Daily signal, position and PnL over a ticker's test days.
+    predictions: fold number -> {column: array}.
+    """
+    rows = panel.rows(ticker)
+    test_start = folds[0][2]
+
+    dates = pd.DatetimeIndex(
+        panel.dates[rows.start + test_start:rows.stop].astype("datetime64[ns]")
+    )
+
+    df = pd.DataFrame(
+        {
+            col: np.concatenate([predictions[i][col] for i in range(len(folds))])
+            for col in predictions[0]
+        },
+        index=dates
+    )
+
+    close = read_dataset("clean", ticker, columns=["adj_close"])["adj_close"]
+    close = close.reindex(panel.dates[rows].astype("datetime64[ns]"))
+
+    forward = close.shift(-PREDICTION_HORIZON) / close - 1
+    next_day = close.shift(-1) / close - 1
+
+    df["final_conf"], df["agreement"] = apply_soft_gating(
+        df["trend_dir"], df["trend_conf"], df["momentum_dir"], df["momentum_conf"]
+    )
+
+    active = (df["trend_dir"] != 0) & (df["final_conf"] >= cutoff)
+
+    df["position"] = np.where(active, df["trend_dir"], 0).astype(np.int8)
+    df["forward_return"] = forward.to_numpy()[test_start:]
+    df["next_return"] = next_day.to_numpy()[test_start:]
+    df["pnl"] = (df["position"] * df["next_return"]).fillna(0.0)
+    df["equity"] = (1 + df["pnl"]).cumprod()
+
+    return df
+
+
+def _max_drawdown(equity: pd.Series) -> float:
+    return float((equity / equity.cummax() - 1).min())
+
+
+def _sharpe(pnl: pd.Series) -> float:
+    std = pnl.std()
+    return float(pnl.mean() / std * np.sqrt(TRADING_DAYS)) if std > 0 else 0.0
+
+
+def metrics(df: pd.DataFrame) -> dict:
+    active = df["position"] != 0
+    known = active & df["forward_return"].notna()
+
+    hits = np.sign(df.loc[known, "forward_return"]) == df.loc[known, "position"]
+    buy_hold = (1 + df["next_return"].fillna(0.0)).prod() - 1
+
+    return {
+        "days": len(df),
+        "start": str(df.index[0].date()),
+        "end": str(df.index[-1].date()),
+        "coverage": float(active.mean()),
+        "directional_accuracy": float(hits.mean()) if len(hits) else None,
+        "trend_agreement": float(df["agreement"].mean()),
+        "total_return": float(df["equity"].iloc[-1] - 1),
+        "sharpe": _sharpe(df["pnl"]),
+        "max_drawdown": _max_drawdown(df["equity"]),
+        "buy_hold_return": float(buy_hold),
+    }
+
+
+def book_metrics(daily: dict) -> tuple:
+    """
+    Equal-weight book over every ticker active on a date.
+    Returns (equity frame, metrics).
+    """
+    pnl = pd.DataFrame({t: df["pnl"] for t, df in daily.items()})
+    book = pnl.mean(axis=1)
+
+    equity = (1 + pnl.fillna(0.0)).cumprod()
+    equity["book"] = (1 + book).cumprod()
+
+    return equity, {
+        "days": len(book),
+        "total_return": float(equity["book"].iloc[-1] - 1),
+        "sharpe": _sharpe(book),
+        "max_drawdown": _max_drawdown(equity["book"]),
+    }
+
+
+# =====================
+# Orchestrator
+# =====================
+
+def run_backtest(tickers=None, window: str = "expanding", refit: str = "full",
+                 workers=None, threads=None, cutoff: float = CONFIDENCE_DEADBAND_HIGH,
+                 panel_dir: Path = PANEL_DIR, out_dir: Path = BACKTEST_DIR) -> dict:
+    if refit not in ("full", "calibrate"):
+        raise ValueError(f"Unknown refit mode: {refit}")
+
+    panel = Panel(panel_dir)
+    tickers = list(tickers or panel.tickers)
+
+    folds = {}
+    for ticker in tickers:
+        rows = panel.rows(ticker)
+        folds[ticker] = make_folds(rows.stop - rows.start, window)
+        if not folds[ticker]:
+            raise ValueError(f"{ticker}: fewer than {MIN_TRAIN_ROWS} rows")
+
+    # Full refits are independent per fold; recalibration reuses the
+    # first fold's base model, so one job per ticker
+    jobs = []
+    for ticker in tickers:
+        numbered = list(enumerate(folds[ticker]))
+        if refit == "full":
+            jobs.extend((ticker, [fold]) for fold in numbered)
+        else:
+            jobs.append((ticker, numbered))
+
+    workers, threads = plan(workers, threads, len(jobs))
+    n_folds = sum(len(f) for f in folds.values())
+
+    print(f"\nWalk-forward: {len(tickers)} tickers, {n_folds} folds, "
+          f"{window} window, refit={refit}")
+    print(f"Jobs: {len(jobs)} on {workers} workers × {threads} threads\n")
+
+    start = time.perf_counter()
+    predictions = {t: {} for t in tickers}
+    fit_seconds = 0.0
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(run_folds, str(panel.panel_dir), ticker, job, refit, threads): ticker
+            for ticker, job in jobs
+        }
+
+        for future in as_completed(futures):
+            ticker = futures[future]
+            for number, values, seconds in future.result():
+                predictions[ticker][number] = values
+                fit_seconds += seconds
+
+                _, _, test_start, test_end = folds[ticker][number]
+                print(f"{ticker:<6} fold {number:>3}  rows {test_start}-{test_end}  "
+                      f"fit {seconds:6.2f}s")
+
+    wall = time.perf_counter() - start
+
+    daily = {
+        t: replay(t, panel, folds[t], predictions[t], cutoff)
+        for t in tickers
+    }
+
+    equity, book = book_metrics(daily)
+
+    summary = {
+        "created_at": datetime.utcnow().isoformat(),
+        "settings": {
+            "window": window,
+            "refit": refit,
+            "min_train_rows": MIN_TRAIN_ROWS,
+            "step_rows": STEP_ROWS,
+            "rolling_rows": ROLLING_ROWS if window == "rolling" else None,
+            "purge_rows": PREDICTION_HORIZON,
+            "confidence_cutoff": cutoff,
+        },
+        "folds": n_folds,
+        "fit_seconds": round(fit_seconds, 2),
+        "wall_seconds": round(wall, 2),
+        "tickers": {t: metrics(df) for t, df in daily.items()},
+        "book": book,
+    }
+
+    save_results(daily, equity, summary, out_dir)
+    print_summary(summary)
+
+    return summary
+
+
+def save_results(daily: dict, equity: pd.DataFrame, summary: dict, out_dir: Path):
+    out_dir = Path(out_dir)
+
+    for ticker, df in daily.items():
+        write_frame(df, locate(out_dir, f"{ticker}_walk_forward"))
+
+    write_frame(equity, locate(out_dir, "equity"))
+
+    path = out_dir / "summary.json"
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(summary, f, indent=1)
+    os.replace(tmp, path)
+
+
+def print_summary(summary: dict):
+    print("\n=== WALK-FORWARD SUMMARY ===\n")
+    print(f"{'ticker':<8} {'days':>5} {'cover':>6} {'acc':>6} {'return':>8} "
+          f"{'sharpe':>7} {'maxdd':>7} {'b&h':>8}")
+
+    for ticker, m in summary["tickers"].items():
+        acc = m["directional_accuracy"]
+        print(
+            f"{ticker:<8} {m['days']:>5} {m['coverage']:6.1%} "
+            f"{'n/a' if acc is None else format(acc, '.1%'):>6} "
+            f"{m['total_return']:8.1%} {m['sharpe']:7.2f} "
+            f"{m['max_drawdown']:7.1%} {m['buy_hold_return']:8.1%}"
+        )
+
+    book = summary["book"]
+    print(
+        f"{'book':<8} {book['days']:>5} {'':>6} {'':>6} "
+        f"{book['total_return']:8.1%} {book['sharpe']:7.2f} {book['max_drawdown']:7.1%}"
+    )
+
+    print(f"\nFolds: {summary['folds']}  Fit time: {summary['fit_seconds']:.2f}s  "
+          f"Wall time: {summary['wall_seconds']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE walk-forward backtest")
+    parser.add_argument("--tickers", nargs="+", help="default: every panel ticker")
+    parser.add_argument("--window", choices=["expanding", "rolling"], default="expanding")
+    parser.add_argument("--refit", choices=["full", "calibrate"], default="full",
+                        help="retrain every fold, or only recalibrate")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes (default: TRAIN_WORKERS or all cores)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="OpenMP threads per process (default: cores // workers)")
+    parser.add_argument("--cutoff", type=float, default=CONFIDENCE_DEADBAND_HIGH,
+                        help="minimum gated confidence to take a position")
+
+    args = parser.parse_args()
+
+    print("\n=== PTRE WALK-FORWARD BACKTEST ===")
+
+    run_backtest(
+        tickers=args.tickers,
+        window=args.window,
+        refit=args.refit,
+        workers=args.workers,
+        threads=args.threads,
+        cutoff=args.cutoff,
+    )
+
+
+if __name__ == "__main__":
+    main()
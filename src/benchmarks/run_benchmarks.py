@@ -0,0 +1,587 @@
+"""
+PTRE - Benchmark Suite
+
+Reproducible, offline benchmarks of the pipeline and serving path on
+synthetic OHLCV (src.benchmarks.synthetic), written to JSON so runs can
+be compared across commits.
+
+- History axis (1x / 10x / 100x of BASE_BARS bars, one ticker):
+  build_features (all columns / MOMENTUM_FEATURES only), trend and
+  momentum label builders,
+  train_and_calibrate for both model kinds
+- Universe axis (1x / 10x / 100x of BASE_UNIVERSE tickers): model
+  loading, single generate_signal, batch generate_signals, and
+  /api/signal under concurrent load (response cache on and off)
+- Serving runs in a temporary sandbox: the registry, feature store,
+  price service and ticker list are pointed at synthetic files for the
+  duration of a scale and restored afterwards. Prices are never
+  fetched. Every ticker serves hard links of one trained model pair,
+  so model files cost disk space once.
+- Pickle models are loaded per ticker; universes above
+  MAX_PICKLE_UNIVERSE tickers are skipped for that format
+
+Results: data/benchmarks/bench_<time>_<commit>.json
+
+Run:
+  python -m src.benchmarks.run_benchmarks run [--scales 1 10 100] [--only ...]
+  python -m src.benchmarks.run_benchmarks compare OLD.json NEW.json
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.benchmarks.synthetic import (
+    BASE_BARS,
+    BASE_UNIVERSE,
+    synthetic_ohlcv,
+    synthetic_tickers,
+)
+from src.features.build_features import build_features
+from src.labels.build_labels import build_labels
+from src.labels.build_momentum_labels import build_momentum_labels
+from src.models.calibrate_momentum import MOMENTUM_FEATURES
+from src.models.save_calibrated_models import CALIB_END, TRAIN_END, train_and_calibrate
+from src.utils.storage import write_frame
+
+# ABSOLUTE PROJECT ROOT (same convention as generate_final_signal)
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+BENCH_DIR = BASE_DIR / "data" / "benchmarks"
+
+SCALES = (1, 10, 100)
+
+GROUPS = ("pipeline", "training", "serving")
+
+# Timed runs per measurement (training: TRAIN_REPEATS)
+REPEATS = 5
+TRAIN_REPEATS = 1
+
+# Distinct synthetic series behind the serving universe (tickers reuse
+# them round-robin; the serving cost does not depend on the values)
+SERVING_SOURCES = 10
+
+# Per-ticker pickles are ~7.5 MB in memory; larger universes would not fit
+MAX_PICKLE_UNIVERSE = 100
+
+# generate_signal calls timed per universe (sampled across tickers)
+SIGNAL_SAMPLES = 200
+
+LOAD_REQUESTS = 400
+LOAD_CONCURRENCY = 16
+
+# compare: new / old above this ratio (or below its inverse for
+# throughput) is reported as a regression
+REGRESSION_THRESHOLD = 1.25
+
+# metric -> True when lower is better
+COMPARED_METRICS = {
+    "median_s": True,
+    "p50_ms": True,
+    "p95_ms": True,
+    "throughput_rps": False,
+}
+
+
+# =====================
+# Measurement
+# =====================
+
+def _measure(fn, repeats: int = REPEATS) -> dict:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    return {
+        "best_s": round(min(times), 6),
+        "median_s": round(float(np.median(times)), 6),
+        "repeats": repeats,
+    }
+
+
+def _latency_stats(seconds) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "samples": int(len(ms)),
+    }
+
+
+def _record(name, axis, scale, params, metrics, variant=None) -> dict:
+    record = {"name": name, "axis": axis, "scale": scale}
+    if variant is not None:
+        record["variant"] = variant
+    record["params"] = params
+    record["metrics"] = metrics
+
+    label = f"{name}{'/' + variant if variant else ''}"
+    shown = {k: v for k, v in metrics.items() if k in COMPARED_METRICS}
+    print(f"  {label:<28} {axis} {scale:>3}x  {shown}")
+
+    return record
+
+
+# =====================
+# History axis
+# =====================
+
+def _aligned(features, labels, col):
+    df = features.join(labels[col], how="inner").dropna()
+
+    n = len(df)
+    train, calib = df.iloc[:int(n * TRAIN_END)], df.iloc[int(n * TRAIN_END):int(n * CALIB_END)]
+
+    return (
+        train.drop(columns=col), train[col],
+        calib.drop(columns=col), calib[col],
+    )
+
+
+def bench_history(scale: int, groups, repeats: int, train_repeats: int) -> list:
+    bars = BASE_BARS * scale
+    df = synthetic_ohlcv(bars, seed=scale)
+    params = {"bars": bars}
+
+    records = []
+
+    features = build_features(df).dropna()
+    priced = df.join(features[["vol_10d"]], how="inner")
+
+    if "pipeline" in groups:
+        records.append(_record(
+            "build_features", "history", scale, params,
+            _measure(lambda: build_features(df).dropna(), repeats)
+        ))
+        records.append(_record(
+            "build_features", "history", scale,
+            dict(params, columns=len(MOMENTUM_FEATURES)),
+            _measure(lambda: build_features(df, columns=MOMENTUM_FEATURES).dropna(), repeats),
+            variant="momentum"
+        ))
+        records.append(_record(
+            "build_labels", "history", scale, params,
+            _measure(lambda: build_labels(priced).dropna(), repeats)
+        ))
+        records.append(_record(
+            "build_momentum_labels", "history", scale, params,
+            _measure(lambda: build_momentum_labels(df), repeats)
+        ))
+
+    if "training" in groups:
+        labels = {
+            "trend": (build_labels(priced).dropna(), "label"),
+            "momentum": (build_momentum_labels(df).to_frame(), "momentum_label"),
+        }
+        for kind, (frame, col) in labels.items():
+            split = _aligned(features, frame, col)
+            records.append(_record(
+                "train_and_calibrate", "history", scale,
+                dict(params, train_rows=len(split[0]), calib_rows=len(split[2])),
+                _measure(lambda: train_and_calibrate(*split), train_repeats),
+                variant=kind
+            ))
+
+    return records
+
+
+# =====================
+# Universe axis (serving sandbox)
+# =====================
+
+def _link(src: Path, dst: Path):
+    if dst.exists():
+        return
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def prepare_sources(root: Path) -> dict:
+    """
+    Synthetic clean + feature files of SERVING_SOURCES series, and one
+    trained (trend, momentum) model pair in pickle and compact form.
+    """
+    from src.models.compact_model import write_compact
+    from src.models.export_compact_models import compile_model
+
+    sources = {"clean": [], "features": [], "models": {}}
+
+    for i in range(SERVING_SOURCES):
+        df = synthetic_ohlcv(BASE_BARS, seed=1000 + i)
+        features = build_features(df).dropna()
+
+        sources["clean"].append(write_frame(df, root / "sources" / f"{i}_clean.parquet"))
+        sources["features"].append(
+            write_frame(features, root / "sources" / f"{i}_features.parquet")
+        )
+
+        if i == 0:
+            priced = df.join(features[["vol_10d"]], how="inner")
+            labels = {
+                "trend": (build_labels(priced).dropna(), "label"),
+                "momentum": (build_momentum_labels(df).to_frame(), "momentum_label"),
+            }
+
+            for kind, (frame, col) in labels.items():
+                model = train_and_calibrate(*_aligned(features, frame, col))
+                path = root / "sources" / f"{kind}.pkl"
+                joblib.dump(model, path)
+                write_compact(path.with_suffix(".ptm"), *compile_model(model))
+                sources["models"][kind] = path
+
+    return sources
+
+
+def build_universe(root: Path, sources: dict, tickers) -> Path:
+    """
+    Per-ticker file tree (hard links into the sources).
+    """
+    universe = root / f"universe_{len(tickers)}"
+
+    for i, ticker in enumerate(tickers):
+        j = i % SERVING_SOURCES
+        _link(sources["clean"][j], universe / "processed" / f"{ticker}_clean.parquet")
+        _link(
+            sources["features"][j],
+            universe / "processed" / "features" / f"{ticker}_features.parquet"
+        )
+        for kind, path in sources["models"].items():
+            for suffix in (".pkl", ".ptm"):
+                _link(
+                    path.with_suffix(suffix),
+                    universe / "models" / kind / f"{ticker}_{kind}{suffix}"
+                )
+
+    return universe
+
+
+@contextmanager
+def serving_sandbox(universe: Path, tickers, model_format: str):
+    """
+    Point the serving singletons at the universe files; restore on exit.
+    """
+    from src.config.tickers import TICKERS
+    from src.features.feature_store import FeatureStore
+    from src.models import generate_final_signal
+    from src.models.model_registry import ModelRegistry
+    from src.services import async_signal_service
+    from src.services.response_cache import response_cache
+    from src.utils import market_data
+
+    registry = ModelRegistry(
+        tickers,
+        model_dirs={kind: universe / "models" / kind for kind in ("trend", "momentum")},
+        layout="per_ticker",
+        model_format=model_format,
+    )
+
+    patches = [
+        (generate_final_signal, "registry", registry),
+        (generate_final_signal, "feature_store",
+         FeatureStore(universe / "processed" / "features")),
+        (market_data, "price_service", market_data.PriceService(
+            fetcher=market_data.offline_fetcher,
+            processed_dir=universe / "processed"
+        )),
+    ]
+    saved = [(module, name, getattr(module, name)) for module, name, _ in patches]
+    saved_tickers = list(TICKERS)
+
+    for module, name, value in patches:
+        setattr(module, name, value)
+    # Shared list object: every module that imported TICKERS sees the change
+    TICKERS[:] = tickers
+    response_cache.clear()
+
+    try:
+        yield registry
+    finally:
+        async_signal_service.shutdown()
+        response_cache.clear()
+        TICKERS[:] = saved_tickers
+        for module, name, value in saved:
+            setattr(module, name, value)
+
+
+async def _api_load(tickers, n_requests: int, concurrency: int) -> dict:
+    import httpx
+
+    from src.api.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(f"/api/signal/{tickers[i % len(tickers)]}")
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(n_requests)))
+        wall = time.perf_counter() - start
+
+    return dict(
+        _latency_stats(latencies),
+        throughput_rps=round(n_requests / wall, 2),
+        wall_s=round(wall, 4),
+        statuses={str(k): v for k, v in sorted(statuses.items())},
+    )
+
+
+def bench_universe(scale: int, root: Path, sources: dict, model_format: str,
+                   repeats: int) -> list:
+    from src.models import generate_final_signal
+    from src.services.response_cache import response_cache
+
+    n_tickers = BASE_UNIVERSE * scale
+    params = {"tickers": n_tickers, "model_format": model_format}
+
+    if model_format == "pickle" and n_tickers > MAX_PICKLE_UNIVERSE:
+        print(f"  pickle models, {n_tickers} tickers: skipped (memory)")
+        return [_record("serving", "universe", scale, params,
+                        {"skipped": "exceeds MAX_PICKLE_UNIVERSE"}, model_format)]
+
+    tickers = synthetic_tickers(n_tickers)
+    universe = build_universe(root, sources, tickers)
+
+    records = []
+
+    with serving_sandbox(universe, tickers, model_format) as registry:
+        start = time.perf_counter()
+        registry.load_all()
+        records.append(_record(
+            "load_models", "universe", scale, params,
+            {"median_s": round(time.perf_counter() - start, 6), "repeats": 1},
+            model_format
+        ))
+
+        sample = [tickers[i % n_tickers] for i in range(SIGNAL_SAMPLES)]
+
+        # First call per ticker reads its feature row; time warm calls
+        for ticker in dict.fromkeys(sample):
+            generate_final_signal.generate_signal(ticker)
+
+        latencies = []
+        for ticker in sample:
+            start = time.perf_counter()
+            generate_final_signal.generate_signal(ticker)
+            latencies.append(time.perf_counter() - start)
+
+        records.append(_record(
+            "generate_signal", "universe", scale, params,
+            _latency_stats(latencies), model_format
+        ))
+
+        batch = _measure(lambda: generate_final_signal.generate_signals(tickers), repeats)
+        batch["per_ticker_ms"] = round(batch["median_s"] * 1000 / n_tickers, 4)
+        records.append(_record(
+            "generate_signals", "universe", scale, params, batch, model_format
+        ))
+
+        load_params = dict(params, requests=LOAD_REQUESTS, concurrency=LOAD_CONCURRENCY)
+
+        for variant, entries in (("cached", response_cache.max_entries), ("uncached", 0)):
+            saved_entries = response_cache.max_entries
+            response_cache.max_entries = entries
+            response_cache.clear()
+            try:
+                metrics = asyncio.run(_api_load(tickers, LOAD_REQUESTS, LOAD_CONCURRENCY))
+                metrics["cache"] = response_cache.stats()
+            finally:
+                response_cache.max_entries = saved_entries
+
+            records.append(_record(
+                "api_signal", "universe", scale, load_params, metrics,
+                f"{model_format}/{variant}"
+            ))
+
+    return records
+
+
+# =====================
+# Run / compare
+# =====================
+
+def _git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def _environment() -> dict:
+    import sklearn
+
+    commit, dirty = _git_commit()
+    return {
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(scales=SCALES, groups=GROUPS, model_formats=("pickle", "compact"),
+        repeats: int = REPEATS, train_repeats: int = TRAIN_REPEATS) -> dict:
+    results = []
+
+    for scale in scales:
+        if {"pipeline", "training"} & set(groups):
+            print(f"\n--- history {scale}x ({BASE_BARS * scale} bars) ---")
+            results += bench_history(scale, groups, repeats, train_repeats)
+
+    if "serving" in groups:
+        with tempfile.TemporaryDirectory(prefix="ptre-bench-") as tmp:
+            root = Path(tmp)
+            print("\nPreparing serving sources (trains one model pair)...")
+            sources = prepare_sources(root)
+
+            for scale in scales:
+                for model_format in model_formats:
+                    print(f"\n--- universe {scale}x ({BASE_UNIVERSE * scale} tickers, "
+                          f"{model_format}) ---")
+                    results += bench_universe(scale, root, sources, model_format, repeats)
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "environment": _environment(),
+        "config": {
+            "scales": list(scales),
+            "groups": list(groups),
+            "model_formats": list(model_formats),
+            "repeats": repeats,
+            "train_repeats": train_repeats,
+            "base_bars": BASE_BARS,
+            "base_universe": BASE_UNIVERSE,
+        },
+        "results": results,
+    }
+
+
+def write_results(report: dict, out: Path = None) -> Path:
+    if out is None:
+        commit = (report["environment"]["commit"] or "nogit")[:8]
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        out = BENCH_DIR / f"bench_{stamp}_{commit}.json"
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=1)
+
+    return out
+
+
+def _key(record):
+    return (record["name"], record.get("variant"), record["axis"], record["scale"])
+
+
+def compare(old_path: Path, new_path: Path,
+            threshold: float = REGRESSION_THRESHOLD) -> int:
+    """
+    Print new/old ratios of every shared metric. Returns the number of
+    regressions beyond threshold.
+    """
+    with open(old_path) as f:
+        old = {_key(r): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = {_key(r): r for r in json.load(f)["results"]}
+
+    regressions = 0
+
+    print(f"\n{'benchmark':<40} {'metric':<15} {'old':>12} {'new':>12} {'ratio':>7}")
+    for key in [k for k in new if k in old]:
+        name, variant, axis, scale = key
+        label = f"{name}{'/' + variant if variant else ''} {axis} {scale}x"
+
+        for metric, lower_is_better in COMPARED_METRICS.items():
+            before = old[key]["metrics"].get(metric)
+            after = new[key]["metrics"].get(metric)
+            if not before or after is None:
+                continue
+
+            ratio = after / before
+            worse = ratio > threshold if lower_is_better else ratio < 1 / threshold
+            regressions += worse
+
+            print(f"{label:<40} {metric:<15} {before:>12.4f} {after:>12.4f} "
+                  f"{ratio:>6.2f}x{'  REGRESSION' if worse else ''}")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE benchmark suite")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--scales", nargs="+", type=int, default=list(SCALES))
+    run_parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS))
+    run_parser.add_argument("--formats", nargs="+", choices=["pickle", "compact"],
+                            default=["pickle", "compact"])
+    run_parser.add_argument("--repeats", type=int, default=REPEATS)
+    run_parser.add_argument("--train-repeats", type=int, default=TRAIN_REPEATS)
+    run_parser.add_argument("--out", type=Path, help="default: data/benchmarks/")
+
+    cmp_parser = sub.add_parser("compare", help="compare two result files")
+    cmp_parser.add_argument("old", type=Path)
+    cmp_parser.add_argument("new", type=Path)
+    cmp_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        regressions = compare(args.old, args.new, args.threshold)
+        if regressions:
+            print(f"\n{regressions} metric(s) regressed beyond {args.threshold}x")
+            sys.exit(1)
+        return
+
+    print("\n=== PTRE BENCHMARKS ===")
+
+    report = run(args.scales, args.only, args.formats, args.repeats, args.train_repeats)
+    out = write_results(report, args.out)
+
+    print(f"\nResults → {out}")
+
+
+if __name__ == "__main__":
+    main()
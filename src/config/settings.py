@@ -51,3 +51,100 @@ CONFIDENCE_DEADBAND_HIGH = 0.55
 
 # Hard cap on exposure (used later in risk engine)
 MAX_EXPOSURE = 0.20   # 20% of capital
+
+
+# =====================
+# Serving settings (API)
+# =====================
+
+# Threads for CPU-bound model inference
+INFERENCE_WORKERS = 4
+
+# Simultaneous upstream price downloads (one slow fetch holds one slot)
+MAX_CONCURRENT_FETCHES = 8
+
+# Seconds to wait for fresh prices before serving cached/local ones
+PRICE_FETCH_TIMEOUT = 5.0
+
+# Seconds to wait for the cached/local fallback (a cold cache reads the
+# clean dataset); past it the signal is served without prices
+PRICE_FALLBACK_TIMEOUT = 1.0
+
+# Seconds before a signal request gives up on inference
+SIGNAL_TIMEOUT = 10.0
+
+# Signal responses kept per worker (least recently used are evicted)
+RESPONSE_CACHE_ENTRIES = 256
+
+# Seconds a client may reuse a signal response before revalidating
+# (0: every poll revalidates with If-None-Match and gets a 304)
+RESPONSE_MAX_AGE = 0
+
+# Worker processes started by src.serving.launcher
+SERVING_WORKERS = 4
+
+# Seconds between a shared-mode worker's checks for a new generation
+SHARED_RELOAD_INTERVAL = 2.0
+
+# Published generations kept on disk (older ones are deleted)
+SHARED_KEEP_GENERATIONS = 2
+
+# Seconds between a worker's memory reports
+WORKER_REPORT_INTERVAL = 5.0
+
+
+# =====================
+# Storage settings
+# =====================
+
+# On-disk format for clean / feature / label datasets: "parquet" or "csv"
+# (falls back to "csv" when pyarrow is not installed)
+STORAGE_FORMAT = "parquet"
+
+# Compact dtypes: feature matrices (stored datasets, panel, serving
+# block) and model inputs as float32 instead of float64. Labels are
+# int8 either way; clean prices stay float64
+COMPACT_DTYPES = False
+
+
+# =====================
+# Pipeline settings
+# =====================
+
+# Processes for CPU-bound pipeline stages (None means os.cpu_count())
+PIPELINE_WORKERS = None
+
+# Threads for concurrent raw data downloads
+DOWNLOAD_WORKERS = 8
+
+
+# =====================
+# Training settings
+# =====================
+
+# Processes training (ticker, model) jobs (None means os.cpu_count())
+TRAIN_WORKERS = None
+
+# OpenMP threads per training process (None means cores // workers)
+TRAIN_THREADS_PER_WORKER = None
+
+# Model files served and trained by default:
+# "per_ticker" (one pickle per ticker and kind) or "pooled" (one per kind)
+MODEL_LAYOUT = "per_ticker"
+
+# Served model files: "pickle" (sklearn objects) or "compact" (.ptm files
+# from export_compact_models: NumPy-only, memory-mapped)
+MODEL_FORMAT = "pickle"
+
+
+# =====================
+# Artifact cache
+# =====================
+
+# Reuse cached stage outputs when inputs, code and config are unchanged
+ARTIFACT_CACHE = True
+
+# Cached runs kept per stage output (most recently used first); older
+# entries, and objects no kept entry references, are pruned after each
+# pipeline run
+ARTIFACT_CACHE_KEEP = 2
@@ -317,213 +317,90 @@ import pandas as pd
 import numpy as np
 
 from src.config.tickers import TICKERS
-from src.config.settings import PREDICTION_HORIZON
+from src.config.settings import COMPACT_DTYPES
+import src.features.feature_registry as feature_registry
+import src.features.rolling as rolling
+from src.features.feature_registry import FEATURE_DTYPE, compute
+from src.utils.artifact_cache import artifact_cache, stage_key
+from src.utils.storage import dataset_path, read_dataset, write_dataset, write_path
 
 
 PROCESSED_DIR = Path("data/processed")
 FEATURE_DIR = Path("data/processed/features")
 FEATURE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Source files the stored features depend on (cache keys)
+FEATURE_CODE = [__file__, feature_registry.__file__, rolling.__file__]
 
-def build_features(df: pd.DataFrame) -> pd.DataFrame:
-    features = pd.DataFrame(index=df.index)
 
-    # =============================
-    # A. RETURNS
-    # =============================
-    features["ret_1d"] = df["adj_close"].pct_change(1)
-    features["ret_3d"] = df["adj_close"].pct_change(3)
-    features["ret_5d"] = df["adj_close"].pct_change(5)
-    features["ret_10d"] = df["adj_close"].pct_change(10)
-
-    features["log_ret_1d"] = np.log(df["adj_close"]).diff(1)
-    features["log_ret_5d"] = np.log(df["adj_close"]).diff(5)
-
-    features["cum_ret_5d"] = (1 + features["ret_1d"]).rolling(5).apply(np.prod, raw=True) - 1
-    features["cum_ret_10d"] = (1 + features["ret_1d"]).rolling(10).apply(np.prod, raw=True) - 1
-
-    # =============================
-    # B. VOLATILITY
-    # =============================
-    features["vol_5d"] = features["ret_1d"].rolling(5).std()
-    features["vol_10d"] = features["ret_1d"].rolling(10).std()
-    features["vol_20d"] = features["ret_1d"].rolling(20).std()
-
-    features["vol_ratio_5_20"] = features["vol_5d"] / (features["vol_20d"] + 1e-6)
-    features["vol_ratio_10_20"] = features["vol_10d"] / (features["vol_20d"] + 1e-6)
-
-    hl_range = (df["high"] - df["low"]) / df["adj_close"]
-    features["hl_vol_5d"] = hl_range.rolling(5).mean()
-    features["hl_vol_10d"] = hl_range.rolling(10).mean()
-
-    # =============================
-    # C. MOMENTUM
-    # =============================
-    delta = df["adj_close"].diff()
-    gain = delta.clip(lower=0)
-    loss = -delta.clip(upper=0)
-
-    avg_gain = gain.rolling(14).mean()
-    avg_loss = loss.rolling(14).mean()
-    rs = avg_gain / avg_loss
-    features["rsi_14"] = 100 - (100 / (1 + rs))
-
-    # RSI divergence (normalized & stable)
-    price_ret_14 = df["adj_close"].pct_change(14)
-    rsi_change_14 = features["rsi_14"].diff(14)
-
-    features["rsi_divergence"] = (
-        (price_ret_14 - price_ret_14.rolling(50).mean()) /
-        (price_ret_14.rolling(50).std() + 1e-6)
-        -
-        (rsi_change_14 - rsi_change_14.rolling(50).mean()) /
-        (rsi_change_14.rolling(50).std() + 1e-6)
-    )
-
-    # Correct DMI spread
-    high = df["high"]
-    low = df["low"]
-    close = df["close"]
+def build_features(df: pd.DataFrame, carry: dict = None,
+                   columns=None, dtype=FEATURE_DTYPE) -> pd.DataFrame:
+    """
+    carry: optional running state from incremental_features. It supplies
+    EMA and cumulative AD/OBV series seeded from earlier history (aligned
+    to df) and the sorted atr_20 values of earlier bars. Without it,
+    everything is computed from df alone.
 
-    up_move = high.diff()
-    down_move = low.shift() - low
+    columns: subset of FEATURE_COLUMNS (in that order by default); only
+    the feature_registry nodes they depend on are computed.
 
-    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
-    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
-
-    plus_dm = pd.Series(plus_dm, index=df.index)
-    minus_dm = pd.Series(minus_dm, index=df.index)
-
-    tr = pd.concat([
-        high - low,
-        (high - close.shift()).abs(),
-        (low - close.shift()).abs()
-    ], axis=1).max(axis=1)
-
-    atr_14 = tr.rolling(14).mean()
-
-    plus_di = 100 * (plus_dm.rolling(14).mean() / atr_14)
-    minus_di = 100 * (minus_dm.rolling(14).mean() / atr_14)
-
-    features["dmi_spread"] = (plus_di - minus_di) / (plus_di + minus_di + 1e-6)
-
-    features["roc_5d"] = df["adj_close"].pct_change(5)
-    features["roc_10d"] = df["adj_close"].pct_change(10)
-
-    features["mom_slope_5d"] = features["ret_1d"].rolling(5).mean()
-    features["mom_slope_10d"] = features["ret_1d"].rolling(10).mean()
+    dtype: of the returned frame (float32 with COMPACT_DTYPES). Features
+    are computed in float64 and rounded once, here.
+    """
+    features = compute(df, columns, carry)
 
     # =============================
-    # D. TREND CONTEXT
-    # =============================
-    sma_5 = df["adj_close"].rolling(5).mean()
-    sma_10 = df["adj_close"].rolling(10).mean()
-    sma_20 = df["adj_close"].rolling(20).mean()
-    sma_50 = df["adj_close"].rolling(50).mean()
-
-    features["dist_sma_20"] = (df["adj_close"] - sma_20) / sma_20
-    features["dist_sma_50"] = (df["adj_close"] - sma_50) / sma_50
-
-    trend_score = (
-        (sma_5 > sma_10).astype(int) +
-        (sma_10 > sma_20).astype(int) +
-        (sma_20 > sma_50).astype(int) +
-        (df["adj_close"] > sma_50).astype(int)
-    )
-
-    features["trend_alignment"] = (trend_score - 2) / 2
-
-    ema_20 = df["adj_close"].ewm(span=20, adjust=False).mean()
-    ema_50 = df["adj_close"].ewm(span=50, adjust=False).mean()
-
-    features["dist_ema_20"] = (df["adj_close"] - ema_20) / ema_20
-    features["dist_ema_50"] = (df["adj_close"] - ema_50) / ema_50
-
-    rolling_low_20 = df["adj_close"].rolling(20).min()
-    rolling_high_20 = df["adj_close"].rolling(20).max()
-
-    features["price_range_pos_20"] = (
-        (df["adj_close"] - rolling_low_20) /
-        (rolling_high_20 - rolling_low_20)
-    )
-
-    # =============================
-    # E. VOLUME
-    # =============================
-    vol_mean_20 = df["volume"].rolling(20).mean()
-    vol_std_20 = df["volume"].rolling(20).std()
-
-    features["volume_zscore"] = (df["volume"] - vol_mean_20) / vol_std_20
-    features["volume_change_1d"] = df["volume"].pct_change(1)
-    features["volume_change_5d"] = df["volume"].pct_change(5)
-    features["volume_price_corr_10d"] = df["volume"].rolling(10).corr(df["adj_close"])
-
-    # =============================
-    # F. ENGINEERED FEATURES
+    # LEAKAGE PROTECTION
     # =============================
-    features["vol_weighted_momentum"] = (
-        (features["ret_1d"] * df["volume"]).rolling(20).sum() /
-        df["volume"].rolling(20).sum()
+    # One (feature, bar) block, shifted by one bar; its transpose is the
+    # column-major layout the DataFrame keeps, so nothing is copied again
+    shifted = np.full((len(features), len(df)), np.nan, dtype=dtype)
+    with np.errstate(over="ignore"):
+        for i, values in enumerate(features.values()):
+            shifted[i, 1:] = np.asarray(values, dtype=float)[:-1]
+    # After the cast, so values beyond float32 range are dropped as well
+    shifted[np.isinf(shifted)] = np.nan
+
+    return pd.DataFrame(shifted.T, index=df.index, columns=list(features))
+
+
+def build_columns(ticker: str, columns) -> pd.DataFrame:
+    """
+    Features for one ticker restricted to columns, built from its clean
+    data (only their feature_registry nodes are computed, nothing is
+    stored). Rows start once every column is complete, so a subset
+    with a shorter lookback keeps more history than the stored
+    features dataset.
+    """
+    df = read_dataset("clean", ticker)
+    return build_features(df, columns=columns).dropna()
+
+
+def build_ticker(ticker: str):
+    """
+    Build and store features for one ticker.
+    Returns (output path, feature frame); the frame is None when the
+    cached output was reused.
+    """
+    out_path = write_path("features", ticker)
+
+    key, lineage = stage_key(
+        "features", [dataset_path("clean", ticker)], [out_path],
+        config={"COMPACT_DTYPES": COMPACT_DTYPES},
+        code=FEATURE_CODE
     )
+    if artifact_cache.restore(key, [out_path]):
+        return out_path, None
 
-    money_flow_mult = (
-        ((df["close"] - df["low"]) - (df["high"] - df["close"])) /
-        (df["high"] - df["low"])
-    ).replace([np.inf, -np.inf], 0)
-
-    ad_line = (money_flow_mult * df["volume"]).cumsum()
-    features["ad_momentum_14d"] = ad_line.pct_change(14)
-
-    features["volume_surprise"] = df["volume"] / df["volume"].ewm(span=20, adjust=False).mean()
-
-    features["parkinson_vol"] = np.sqrt(
-        (1 / (4 * np.log(2))) * (np.log(df["high"] / df["low"]) ** 2)
-    )
-
-    features["garman_klass_vol"] = (
-        0.5 * (np.log(df["high"] / df["low"]) ** 2)
-        -
-        (2 * np.log(2) - 1) * (np.log(df["close"] / df["open"]) ** 2)
-    )
+    df = read_dataset("clean", ticker)
 
-    atr_20 = tr.rolling(20).mean()
-    features["atr_percentile"] = atr_20.rank(pct=True)
+    features = build_features(df)
+    features = features.dropna()
 
-    log_price = np.log(df["adj_close"])
+    write_dataset(features, "features", ticker)
 
-    def slope_confidence(series):
-        x = np.arange(len(series))
-        if series.isna().any():
-            return np.nan
-        coef = np.polyfit(x, series, 1)
-        slope = coef[0]
-        fitted = np.polyval(coef, x)
-        ss_res = np.sum((series - fitted) ** 2)
-        ss_tot = np.sum((series - series.mean()) ** 2)
-        r2 = 1 - ss_res / ss_tot if ss_tot != 0 else 0
-        return slope * r2
-
-    features["lr_slope_conf_20"] = log_price.rolling(20).apply(slope_confidence, raw=False)
-
-    obv = (np.sign(df["close"].diff()) * df["volume"]).fillna(0).cumsum()
-
-    price_slope_10 = df["adj_close"].rolling(10).apply(
-        lambda x: np.polyfit(np.arange(len(x)), x, 1)[0], raw=False
-    )
-
-    obv_slope_10 = obv.rolling(10).apply(
-        lambda x: np.polyfit(np.arange(len(x)), x, 1)[0], raw=False
-    )
-
-    features["obv_divergence"] = obv_slope_10 - price_slope_10
-
-    # =============================
-    # LEAKAGE PROTECTION
-    # =============================
-    features = features.replace([np.inf, -np.inf], np.nan)
-    features = features.shift(1)
-
-    return features
+    artifact_cache.store(key, [out_path], lineage)
+    return out_path, features
 
 
 def main():
@@ -532,17 +409,11 @@ def main():
     for ticker in TICKERS:
         print(f"Processing {ticker}...")
 
-        df = pd.read_csv(
-            PROCESSED_DIR / f"{ticker}_clean.csv",
-            index_col=0,
-            parse_dates=True
-        )
-
-        features = build_features(df)
-        features = features.dropna()
+        out_path, features = build_ticker(ticker)
 
-        out_path = FEATURE_DIR / f"{ticker}_features.csv"
-        features.to_csv(out_path)
+        if features is None:
+            print(f"Unchanged (cached) → {out_path}\n")
+            continue
 
         print(f"Saved → {out_path}")
         print(f"Feature shape: {features.shape}\n")
@@ -0,0 +1,270 @@
+"""
+PTRE - Panel Dataset
+
+Builds one (date, ticker) × feature matrix for the whole universe, with
+the trend and momentum labels aligned to it, so trainers stop reading
+and re-aligning two files per ticker.
+
+Layout (data/processed/panel/, all .npy files memory-mappable):
+- features.npy       FEATURE_DTYPE (rows, features): float64, or float32
+                     with COMPACT_DTYPES; one contiguous block per
+                     ticker in TICKERS order, dates ascending inside it
+- dates.npy          datetime64[D] per row
+- ticker_ids.npy     int16 per row (position in index.json "tickers")
+- {kind}_label.npy   int8 label per row (0 where missing)
+- {kind}_mask.npy    bool, True where the row has a label
+- index.json         columns, tickers, per-ticker [start, end) offsets
+                     and the content hash of each source dataset
+
+Rows are the stored feature rows; a row belongs to a training set when
+its label is present, which is the same row set as the trainers'
+index intersection + dropna. load_panel() rebuilds the panel first
+when any of those datasets changed since it was built.
+
+Run: python -m src.features.build_panel
+"""
+
+from pathlib import Path
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.config.tickers import TICKERS
+from src.features.feature_registry import FEATURE_DTYPE
+from src.utils.artifact_cache import file_hash
+from src.utils.storage import PROCESSED_DIR, dataset_path, read_dataset
+
+PANEL_DIR = PROCESSED_DIR / "panel"
+
+# kind -> (label dataset, label column)
+LABELS = {
+    "trend": ("labels", "label"),
+    "momentum": ("momentum_labels", "momentum_label"),
+}
+
+
+# =====================
+# Build
+# =====================
+
+def _ticker_block(ticker: str):
+    features = read_dataset("features", ticker)
+
+    labels = {}
+    for kind, (dataset, col) in LABELS.items():
+        y = read_dataset(dataset, ticker, columns=[col])[col].dropna()
+        labels[kind] = y.reindex(features.index)
+
+    return features, labels
+
+
+def _sources(ticker: str) -> dict:
+    """
+    {dataset: content hash} of the files a ticker's block is built from.
+    """
+    datasets = ["features", *(dataset for dataset, _ in LABELS.values())]
+    return {d: file_hash(dataset_path(d, ticker)) for d in datasets}
+
+
+def build_panel(tickers=None, panel_dir: Path = PANEL_DIR) -> Path:
+    tickers = list(tickers or TICKERS)
+
+    blocks = [_ticker_block(t) for t in tickers]
+
+    columns = list(blocks[0][0].columns)
+    for ticker, (features, _) in zip(tickers, blocks):
+        if list(features.columns) != columns:
+            raise ValueError(f"{ticker} feature columns differ from {tickers[0]}")
+
+    sizes = [len(features) for features, _ in blocks]
+    ends = np.cumsum(sizes)
+    offsets = {
+        t: [int(end - size), int(end)]
+        for t, size, end in zip(tickers, sizes, ends)
+    }
+
+    arrays = {
+        "features": np.concatenate(
+            [features.to_numpy(dtype=FEATURE_DTYPE) for features, _ in blocks]
+        ),
+        "dates": np.concatenate(
+            [features.index.values.astype("datetime64[D]") for features, _ in blocks]
+        ),
+        "ticker_ids": np.repeat(np.arange(len(tickers), dtype=np.int16), sizes),
+    }
+
+    for kind in LABELS:
+        y = pd.concat([labels[kind] for _, labels in blocks])
+        mask = y.notna().to_numpy()
+        arrays[f"{kind}_label"] = np.where(mask, y.fillna(0), 0).astype(np.int8)
+        arrays[f"{kind}_mask"] = mask
+
+    index = {
+        "columns": columns,
+        "tickers": tickers,
+        "offsets": offsets,
+        "n_rows": int(ends[-1]) if len(ends) else 0,
+        "sources": {t: _sources(t) for t in tickers},
+    }
+
+    # Build next to the live panel, then swap directories
+    tmp_dir = panel_dir.with_name(panel_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    for name, values in arrays.items():
+        np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(values))
+
+    with open(tmp_dir / "index.json", "w") as f:
+        json.dump(index, f, indent=1)
+
+    old_dir = panel_dir.with_name(panel_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if panel_dir.exists():
+        panel_dir.rename(old_dir)
+    tmp_dir.rename(panel_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    return panel_dir
+
+
+# =====================
+# Load
+# =====================
+
+class Panel:
+    """
+    Memory-mapped panel. Row slices of the arrays are views: nothing is
+    copied until a caller selects columns or drops unlabeled rows.
+    """
+
+    def __init__(self, panel_dir: Path = PANEL_DIR, mmap_mode: str = "r"):
+        self.panel_dir = Path(panel_dir)
+
+        with open(self.panel_dir / "index.json") as f:
+            index = json.load(f)
+
+        self.columns = index["columns"]
+        self.tickers = index["tickers"]
+        self.offsets = {t: tuple(v) for t, v in index["offsets"].items()}
+        self.sources = index.get("sources", {})
+
+        def load(name):
+            return np.load(self.panel_dir / f"{name}.npy", mmap_mode=mmap_mode)
+
+        self.features = load("features")
+        self.dates = load("dates")
+        self.ticker_ids = load("ticker_ids")
+        self.labels = {kind: load(f"{kind}_label") for kind in LABELS}
+        self.masks = {kind: load(f"{kind}_mask") for kind in LABELS}
+
+    def __len__(self):
+        return len(self.features)
+
+    def is_current(self, ticker: str) -> bool:
+        """
+        True when ticker's block was built from its current datasets.
+        """
+        try:
+            return self.sources.get(ticker) == _sources(ticker)
+        except FileNotFoundError:
+            return False
+
+    def rows(self, ticker: str) -> slice:
+        start, end = self.offsets[ticker]
+        return slice(start, end)
+
+    def labeled_rows(self, ticker: str, kind: str) -> np.ndarray:
+        """
+        Panel row numbers of ticker's labeled rows, in date order.
+        """
+        rows = self.rows(ticker)
+        return rows.start + np.flatnonzero(self.masks[kind][rows])
+
+    def split(self, ticker: str, kind: str, bounds=(0.7, 0.85)):
+        """
+        Chronological splits as panel row slices. Cut points are counted
+        in labeled rows (int(n * bound)), exactly like the trainers.
+        """
+        labeled = self.labeled_rows(ticker, kind)
+        n = len(labeled)
+
+        cuts = [0] + [int(n * b) for b in bounds] + [n]
+
+        return [
+            slice(int(labeled[a]), int(labeled[b - 1]) + 1) if b > a else slice(0, 0)
+            for a, b in zip(cuts[:-1], cuts[1:])
+        ]
+
+    def take(self, rows: slice, kind: str, columns=None):
+        """
+        (X, y) for a row slice. Views of the mapped arrays when every row
+        is labeled and all columns are requested; unlabeled rows (e.g.
+        zero-return days for momentum) or a column subset force a copy.
+        """
+        X = self.features[rows]
+        y = self.labels[kind][rows]
+
+        if columns is not None:
+            X = X[:, [self.columns.index(c) for c in columns]]
+
+        mask = self.masks[kind][rows]
+        if not mask.all():
+            X, y = X[mask], y[mask]
+
+        return X, y
+
+    def frame(self, rows: slice, kind: str, columns=None) -> pd.DataFrame:
+        """
+        DataFrame copy of take(rows, kind) with dates and a "label" column.
+        """
+        X, y = self.take(rows, kind, columns)
+        dates = self.dates[rows][self.masks[kind][rows]]
+
+        df = pd.DataFrame(
+            np.array(X),
+            index=pd.DatetimeIndex(dates.astype("datetime64[ns]")),
+            columns=list(columns or self.columns)
+        )
+        df["label"] = np.array(y)
+
+        return df
+
+
+def load_panel(tickers=None, panel_dir: Path = PANEL_DIR) -> Panel:
+    """
+    Panel holding tickers (default: TICKERS), rebuilt first when it is
+    missing, lacks one of them, or was built from older datasets.
+    Call from one process only (the rebuild swaps the directory).
+    """
+    tickers = list(tickers or TICKERS)
+
+    if (Path(panel_dir) / "index.json").exists():
+        panel = Panel(panel_dir)
+        if all(t in panel.offsets and panel.is_current(t) for t in tickers):
+            return panel
+
+    # The panel is the whole universe, not just the tickers asked for
+    print("Panel missing or out of date, rebuilding...")
+    return Panel(build_panel(list(dict.fromkeys([*TICKERS, *tickers])), panel_dir))
+
+
+def main():
+    print("Building panel dataset...\n")
+
+    panel_dir = build_panel()
+    panel = Panel(panel_dir)
+
+    print(f"Saved → {panel_dir}")
+    print(f"Rows: {len(panel)}  Features: {len(panel.columns)}")
+
+    for kind in LABELS:
+        print(f"{kind} labeled rows: {int(np.sum(panel.masks[kind]))}")
+
+    print("\nPanel build completed.")
+
+
+if __name__ == "__main__":
+    main()
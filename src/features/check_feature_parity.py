@@ -0,0 +1,148 @@
+"""
+PTRE - Feature Parity Check
+
+Compares the vectorized rolling kernels build_features uses
+(src.features.rolling) against the original pandas rolling() /
+rolling().apply implementations on every ticker's clean data.
+
+Run: python -m src.features.check_feature_parity
+"""
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from src.config.tickers import TICKERS
+from src.features.rolling import (
+    rolling_corr,
+    rolling_linregress,
+    rolling_max,
+    rolling_min,
+    rolling_moments,
+    rolling_prod,
+    true_range,
+)
+
+
+PROCESSED_DIR = Path("data/processed")
+
+# Max allowed |vectorized - reference| relative to the column's scale
+RTOL = 1e-9
+
+
+# -----------------------------
+# Reference implementations (pre-vectorization)
+# -----------------------------
+def slope_confidence(series):
+    x = np.arange(len(series))
+    if series.isna().any():
+        return np.nan
+    coef = np.polyfit(x, series, 1)
+    slope = coef[0]
+    fitted = np.polyval(coef, x)
+    ss_res = np.sum((series - fitted) ** 2)
+    ss_tot = np.sum((series - series.mean()) ** 2)
+    r2 = 1 - ss_res / ss_tot if ss_tot != 0 else 0
+    return slope * r2
+
+
+def polyfit_slope(series, window):
+    return series.rolling(window).apply(
+        lambda x: np.polyfit(np.arange(len(x)), x, 1)[0], raw=False
+    )
+
+
+def reference_columns(df: pd.DataFrame) -> dict:
+    ret_1d = df["adj_close"].pct_change(1)
+    log_price = np.log(df["adj_close"])
+    obv = (np.sign(df["close"].diff()) * df["volume"]).fillna(0).cumsum()
+
+    return {
+        "cum_ret_5d": (1 + ret_1d).rolling(5).apply(np.prod, raw=True) - 1,
+        "cum_ret_10d": (1 + ret_1d).rolling(10).apply(np.prod, raw=True) - 1,
+        "lr_slope_conf_20": log_price.rolling(20).apply(slope_confidence, raw=False),
+        "price_slope_10": polyfit_slope(df["adj_close"], 10),
+        "obv_slope_10": polyfit_slope(obv, 10),
+        "atr_20": pd.concat([
+            df["high"] - df["low"],
+            (df["high"] - df["close"].shift()).abs(),
+            (df["low"] - df["close"].shift()).abs()
+        ], axis=1).max(axis=1).rolling(20).mean(),
+        "sma_50": df["adj_close"].rolling(50).mean(),
+        "vol_20d": ret_1d.rolling(20).std(),
+        "volume_std_20": df["volume"].rolling(20).std(),
+        "low_20": df["adj_close"].rolling(20).min(),
+        "high_20": df["adj_close"].rolling(20).max(),
+        "volume_price_corr_10d": df["volume"].rolling(10).corr(df["adj_close"]),
+    }
+
+
+def vectorized_columns(df: pd.DataFrame) -> dict:
+    ret_1d = df["adj_close"].pct_change(1)
+    log_price = np.log(df["adj_close"])
+    obv = (np.sign(df["close"].diff()) * df["volume"]).fillna(0).cumsum()
+
+    lr_slope, lr_r2 = rolling_linregress(log_price, 20)
+
+    return {
+        "cum_ret_5d": rolling_prod(1 + ret_1d, 5) - 1,
+        "cum_ret_10d": rolling_prod(1 + ret_1d, 10) - 1,
+        "lr_slope_conf_20": lr_slope * lr_r2,
+        "price_slope_10": rolling_linregress(df["adj_close"], 10)[0],
+        "obv_slope_10": rolling_linregress(obv, 10)[0],
+        "atr_20": rolling_moments(true_range(df), (20,), std=False)[20][0],
+        "sma_50": rolling_moments(df["adj_close"], (50,), std=False)[50][0],
+        "vol_20d": rolling_moments(ret_1d, (20,))[20][1],
+        "volume_std_20": rolling_moments(df["volume"], (20,))[20][1],
+        "low_20": rolling_min(df["adj_close"], 20),
+        "high_20": rolling_max(df["adj_close"], 20),
+        "volume_price_corr_10d": rolling_corr(df["volume"], df["adj_close"], 10),
+    }
+
+
+def compare(df: pd.DataFrame) -> dict:
+    ref = reference_columns(df)
+    new = vectorized_columns(df)
+
+    report = {}
+    for name in ref:
+        a = ref[name].to_numpy()
+        b = new[name].to_numpy()
+
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            raise AssertionError(f"{name}: NaN positions differ")
+
+        scale = np.nanmax(np.abs(a)) or 1.0
+        max_diff = np.nanmax(np.abs(a - b)) if np.isfinite(a).any() else 0.0
+
+        report[name] = max_diff / scale
+
+    return report
+
+
+def main():
+    print("Checking vectorized feature parity...\n")
+
+    failed = False
+    for ticker in TICKERS:
+        df = pd.read_csv(
+            PROCESSED_DIR / f"{ticker}_clean.csv",
+            index_col=0,
+            parse_dates=True
+        )
+
+        report = compare(df)
+        worst = max(report, key=report.get)
+        status = "OK" if report[worst] <= RTOL else "FAIL"
+        failed |= status == "FAIL"
+
+        print(f"{ticker}: {status} (worst {worst}: rel diff {report[worst]:.2e})")
+
+    if failed:
+        raise SystemExit("Feature parity check failed.")
+
+    print("\nFeature parity check passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,504 @@
+"""
+PTRE - Feature Registry
+
+Declares every feature (and the shared series they are built from) as
+a node naming its inputs and window, so a caller can ask for any subset
+of the feature columns and only that part of the graph is computed.
+
+- Sources are the clean OHLCV columns, plus "bars" (the frame itself)
+  and "carry" (incremental_features state, {} when absent)
+- A node's window is the number of earlier bars it looks at beyond its
+  inputs (w - 1 for a rolling window of w, n for an n-bar change), and
+  applies to every input: a rolling pass over some inputs, combined
+  with others on the same bar, is a node of its own.
+  lookback(columns) sums windows along the deepest path; a frame needs
+  lookback + 1 rows for the last one to be complete
+- Shared series (returns, true range, the multi-window moment passes)
+  are nodes too, computed once however many features use them
+- compute() returns raw (unshifted) columns; build_features adds the
+  leakage shift and NaN handling
+
+Run: python -m src.features.feature_registry [--columns ...]
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.config.settings import COMPACT_DTYPES
+from src.features.rolling import (
+    pct_rank,
+    rolling_corr,
+    rolling_linregress,
+    rolling_max,
+    rolling_min,
+    rolling_moments,
+    rolling_prod,
+    true_range,
+)
+
+# Column order of build_features
+FEATURE_COLUMNS = [
+    "ret_1d", "ret_3d", "ret_5d", "ret_10d",
+    "log_ret_1d", "log_ret_5d", "cum_ret_5d", "cum_ret_10d",
+    "vol_5d", "vol_10d", "vol_20d", "vol_ratio_5_20", "vol_ratio_10_20",
+    "hl_vol_5d", "hl_vol_10d",
+    "rsi_14", "rsi_divergence", "dmi_spread",
+    "roc_5d", "roc_10d", "mom_slope_5d", "mom_slope_10d",
+    "dist_sma_20", "dist_sma_50", "trend_alignment",
+    "dist_ema_20", "dist_ema_50", "price_range_pos_20",
+    "volume_zscore", "volume_change_1d", "volume_change_5d",
+    "volume_price_corr_10d",
+    "vol_weighted_momentum", "ad_momentum_14d", "volume_surprise",
+    "parkinson_vol", "garman_klass_vol", "atr_percentile",
+    "lr_slope_conf_20", "obv_divergence",
+]
+
+# dtype of stored / served feature matrices (computed in float64)
+FEATURE_DTYPE = np.float32 if COMPACT_DTYPES else np.float64
+
+SOURCES = ("open", "high", "low", "close", "adj_close", "volume", "bars", "carry")
+
+
+# =====================
+# Nodes
+# =====================
+
+class Node:
+
+    __slots__ = ("name", "inputs", "window", "compute")
+
+    def __init__(self, name, inputs, window, compute):
+        self.name = name
+        self.inputs = inputs      # node / source names
+        self.window = window      # earlier bars looked at beyond the inputs
+        self.compute = compute    # called with {name: value} of the inputs
+
+
+NODES = {}
+
+
+def register(name: str, inputs=(), window: int = 0):
+    def decorator(compute):
+        NODES[name] = Node(name, tuple(inputs), window, compute)
+        return compute
+    return decorator
+
+
+# =============================
+# CUMULATIVE LINE INCREMENTS
+# =============================
+def money_flow_volume(df: pd.DataFrame) -> pd.Series:
+    money_flow_mult = (
+        ((df["close"] - df["low"]) - (df["high"] - df["close"])) /
+        (df["high"] - df["low"])
+    ).replace([np.inf, -np.inf], 0)
+
+    return money_flow_mult * df["volume"]
+
+
+def obv_increment(df: pd.DataFrame) -> pd.Series:
+    return (np.sign(df["close"].diff()) * df["volume"]).fillna(0)
+
+
+# =============================
+# SHARED SERIES
+# =============================
+for _n in (1, 3, 5, 10, 14):
+    register(f"pct_change_{_n}", ["adj_close"], window=_n)(
+        lambda v, n=_n: v["adj_close"].pct_change(n)
+    )
+
+
+@register("log_price", ["adj_close"])
+def _log_price(v):
+    return np.log(v["adj_close"])
+
+
+@register("log_hl", ["high", "low"])
+def _log_hl(v):
+    return np.log(v["high"] / v["low"])
+
+
+@register("true_range", ["bars"], window=1)
+def _true_range(v):
+    return true_range(v["bars"])
+
+
+@register("ret_moments", ["ret_1d"], window=19)
+def _ret_moments(v):
+    return rolling_moments(v["ret_1d"], (5, 10, 20))
+
+
+@register("atr", ["true_range"], window=19)
+def _atr(v):
+    return rolling_moments(v["true_range"], (14, 20), std=False)
+
+
+@register("sma", ["adj_close"], window=49)
+def _sma(v):
+    return rolling_moments(v["adj_close"], (5, 10, 20, 50), std=False)
+
+
+@register("ema", ["adj_close", "carry"])
+def _ema(v):
+    carry = v["carry"]
+    if "ema_20" in carry:
+        return carry["ema_20"], carry["ema_50"]
+
+    price = v["adj_close"]
+    return (
+        price.ewm(span=20, adjust=False).mean(),
+        price.ewm(span=50, adjust=False).mean(),
+    )
+
+
+@register("volume_moments_20", ["volume"], window=19)
+def _volume_moments_20(v):
+    return rolling_moments(v["volume"], (20,))[20]
+
+
+@register("directional_movement", ["high", "low"], window=1)
+def _directional_movement(v):
+    high, low = v["high"], v["low"]
+
+    up_move = high.diff()
+    down_move = low.shift() - low
+
+    plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+    minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+    return (
+        pd.Series(plus_dm, index=high.index),
+        pd.Series(minus_dm, index=high.index),
+    )
+
+
+@register("rsi_change_14", ["rsi_14"], window=14)
+def _rsi_change_14(v):
+    return v["rsi_14"].diff(14)
+
+
+@register("ad_line", ["bars", "carry"])
+def _ad_line(v):
+    if "ad_line" in v["carry"]:
+        return v["carry"]["ad_line"]
+    return money_flow_volume(v["bars"]).cumsum()
+
+
+@register("obv", ["bars", "carry"])
+def _obv(v):
+    if "obv" in v["carry"]:
+        return v["carry"]["obv"]
+    return obv_increment(v["bars"]).cumsum()
+
+
+# =============================
+# A. RETURNS
+# =============================
+for _name, _n in (("ret_1d", 1), ("ret_3d", 3), ("ret_5d", 5), ("ret_10d", 10)):
+    register(_name, [f"pct_change_{_n}"])(lambda v, n=_n: v[f"pct_change_{n}"])
+
+register("log_ret_1d", ["log_price"], window=1)(lambda v: v["log_price"].diff(1))
+register("log_ret_5d", ["log_price"], window=5)(lambda v: v["log_price"].diff(5))
+
+register("cum_ret_5d", ["ret_1d"], window=4)(
+    lambda v: rolling_prod(1 + v["ret_1d"], 5) - 1
+)
+register("cum_ret_10d", ["ret_1d"], window=9)(
+    lambda v: rolling_prod(1 + v["ret_1d"], 10) - 1
+)
+
+
+# =============================
+# B. VOLATILITY
+# =============================
+for _w in (5, 10, 20):
+    register(f"vol_{_w}d", ["ret_moments"])(lambda v, w=_w: v["ret_moments"][w][1])
+
+register("vol_ratio_5_20", ["vol_5d", "vol_20d"])(
+    lambda v: v["vol_5d"] / (v["vol_20d"] + 1e-6)
+)
+register("vol_ratio_10_20", ["vol_10d", "vol_20d"])(
+    lambda v: v["vol_10d"] / (v["vol_20d"] + 1e-6)
+)
+
+
+@register("hl_means", ["high", "low", "adj_close"], window=9)
+def _hl_means(v):
+    hl_range = (v["high"] - v["low"]) / v["adj_close"]
+    return rolling_moments(hl_range, (5, 10), std=False)
+
+
+register("hl_vol_5d", ["hl_means"])(lambda v: v["hl_means"][5][0])
+register("hl_vol_10d", ["hl_means"])(lambda v: v["hl_means"][10][0])
+
+
+# =============================
+# C. MOMENTUM
+# =============================
+@register("rsi_14", ["adj_close"], window=14)
+def _rsi_14(v):
+    delta = v["adj_close"].diff()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+
+    avg_gain = rolling_moments(gain, (14,), std=False)[14][0]
+    avg_loss = rolling_moments(loss, (14,), std=False)[14][0]
+    rs = avg_gain / avg_loss
+
+    return 100 - (100 / (1 + rs))
+
+
+@register("rsi_divergence", ["pct_change_14", "rsi_change_14"], window=49)
+def _rsi_divergence(v):
+    # RSI divergence (normalized & stable)
+    price_ret_14 = v["pct_change_14"]
+    rsi_change_14 = v["rsi_change_14"]
+
+    price_ret_mean, price_ret_std = rolling_moments(price_ret_14, (50,))[50]
+    rsi_change_mean, rsi_change_std = rolling_moments(rsi_change_14, (50,))[50]
+
+    return (
+        (price_ret_14 - price_ret_mean) / (price_ret_std + 1e-6)
+        -
+        (rsi_change_14 - rsi_change_mean) / (rsi_change_std + 1e-6)
+    )
+
+
+@register("dm_means_14", ["directional_movement"], window=13)
+def _dm_means_14(v):
+    plus_dm, minus_dm = v["directional_movement"]
+    return (
+        rolling_moments(plus_dm, (14,), std=False)[14][0],
+        rolling_moments(minus_dm, (14,), std=False)[14][0],
+    )
+
+
+@register("dmi_spread", ["dm_means_14", "atr"])
+def _dmi_spread(v):
+    plus_dm_14, minus_dm_14 = v["dm_means_14"]
+    atr_14 = v["atr"][14][0]
+
+    plus_di = 100 * (plus_dm_14 / atr_14)
+    minus_di = 100 * (minus_dm_14 / atr_14)
+
+    return (plus_di - minus_di) / (plus_di + minus_di + 1e-6)
+
+
+register("roc_5d", ["pct_change_5"])(lambda v: v["pct_change_5"])
+register("roc_10d", ["pct_change_10"])(lambda v: v["pct_change_10"])
+
+register("mom_slope_5d", ["ret_moments"])(lambda v: v["ret_moments"][5][0])
+register("mom_slope_10d", ["ret_moments"])(lambda v: v["ret_moments"][10][0])
+
+
+# =============================
+# D. TREND CONTEXT
+# =============================
+for _w in (20, 50):
+    register(f"dist_sma_{_w}", ["adj_close", "sma"])(
+        lambda v, w=_w: (v["adj_close"] - v["sma"][w][0]) / v["sma"][w][0]
+    )
+
+
+@register("trend_alignment", ["adj_close", "sma"])
+def _trend_alignment(v):
+    sma_5, sma_10, sma_20, sma_50 = (v["sma"][w][0] for w in (5, 10, 20, 50))
+
+    trend_score = (
+        (sma_5 > sma_10).astype(int) +
+        (sma_10 > sma_20).astype(int) +
+        (sma_20 > sma_50).astype(int) +
+        (v["adj_close"] > sma_50).astype(int)
+    )
+
+    return (trend_score - 2) / 2
+
+
+register("dist_ema_20", ["adj_close", "ema"])(
+    lambda v: (v["adj_close"] - v["ema"][0]) / v["ema"][0]
+)
+register("dist_ema_50", ["adj_close", "ema"])(
+    lambda v: (v["adj_close"] - v["ema"][1]) / v["ema"][1]
+)
+
+
+@register("price_range_pos_20", ["adj_close"], window=19)
+def _price_range_pos_20(v):
+    price = v["adj_close"]
+    rolling_low_20 = rolling_min(price, 20)
+    rolling_high_20 = rolling_max(price, 20)
+
+    return (price - rolling_low_20) / (rolling_high_20 - rolling_low_20)
+
+
+# =============================
+# E. VOLUME
+# =============================
+@register("volume_zscore", ["volume", "volume_moments_20"])
+def _volume_zscore(v):
+    vol_mean_20, vol_std_20 = v["volume_moments_20"]
+    return (v["volume"] - vol_mean_20) / vol_std_20
+
+
+register("volume_change_1d", ["volume"], window=1)(lambda v: v["volume"].pct_change(1))
+register("volume_change_5d", ["volume"], window=5)(lambda v: v["volume"].pct_change(5))
+
+register("volume_price_corr_10d", ["volume", "adj_close"], window=9)(
+    lambda v: rolling_corr(v["volume"], v["adj_close"], 10)
+)
+
+
+# =============================
+# F. ENGINEERED FEATURES
+# =============================
+@register("weighted_ret_mean_20", ["ret_1d", "volume"], window=19)
+def _weighted_ret_mean_20(v):
+    return rolling_moments(v["ret_1d"] * v["volume"], (20,), std=False)[20][0]
+
+
+# Ratio of 20-bar sums == ratio of 20-bar means
+register("vol_weighted_momentum", ["weighted_ret_mean_20", "volume_moments_20"])(
+    lambda v: v["weighted_ret_mean_20"] / v["volume_moments_20"][0]
+)
+
+
+register("ad_momentum_14d", ["ad_line"], window=14)(lambda v: v["ad_line"].pct_change(14))
+
+
+@register("volume_surprise", ["volume", "carry"])
+def _volume_surprise(v):
+    if "volume_ema_20" in v["carry"]:
+        volume_ema_20 = v["carry"]["volume_ema_20"]
+    else:
+        volume_ema_20 = v["volume"].ewm(span=20, adjust=False).mean()
+    return v["volume"] / volume_ema_20
+
+
+register("parkinson_vol", ["log_hl"])(
+    lambda v: np.sqrt((1 / (4 * np.log(2))) * (v["log_hl"] ** 2))
+)
+
+
+@register("garman_klass_vol", ["log_hl", "close", "open"])
+def _garman_klass_vol(v):
+    return (
+        0.5 * (v["log_hl"] ** 2)
+        -
+        (2 * np.log(2) - 1) * (np.log(v["close"] / v["open"]) ** 2)
+    )
+
+
+@register("atr_percentile", ["atr", "carry"])
+def _atr_percentile(v):
+    atr_20 = v["atr"][20][0]
+
+    atr_history = v["carry"].get("atr_history")
+    if atr_history is not None:
+        # df is the tail of a longer history: its first true range has no
+        # previous close, so only fully covered windows join the ranking
+        atr_20 = atr_20.copy()
+        atr_20.iloc[:20] = np.nan
+
+    return pct_rank(atr_20, atr_history)
+
+
+@register("lr_slope_conf_20", ["log_price"], window=19)
+def _lr_slope_conf_20(v):
+    # Linear regression slope confidence (slope × R²)
+    lr_slope_20, lr_r2_20 = rolling_linregress(v["log_price"], 20)
+    return lr_slope_20 * lr_r2_20
+
+
+@register("obv_divergence", ["adj_close", "obv"], window=9)
+def _obv_divergence(v):
+    price_slope_10, _ = rolling_linregress(v["adj_close"], 10, r2=False)
+    obv_slope_10, _ = rolling_linregress(v["obv"], 10, r2=False)
+    return obv_slope_10 - price_slope_10
+
+
+# =====================
+# Planning / evaluation
+# =====================
+
+def resolve(columns=None) -> list:
+    """
+    Nodes needed for columns (default: FEATURE_COLUMNS), dependencies
+    first.
+    """
+    columns = FEATURE_COLUMNS if columns is None else list(columns)
+
+    unknown = [c for c in columns if c not in NODES]
+    if unknown:
+        raise KeyError(f"Unknown features: {unknown}")
+
+    order, seen = [], set()
+
+    def visit(name):
+        if name in seen or name in SOURCES:
+            return
+        seen.add(name)
+        for dep in NODES[name].inputs:
+            visit(dep)
+        order.append(name)
+
+    for name in columns:
+        visit(name)
+
+    return order
+
+
+def lookback(columns=None) -> int:
+    """
+    Earlier bars the columns depend on: the largest sum of windows
+    along any dependency path (EWM / cumulative lines count as 0,
+    they are carried).
+    """
+    depth = {}
+    for name in resolve(columns):
+        node = NODES[name]
+        depth[name] = node.window + max(
+            (depth.get(dep, 0) for dep in node.inputs), default=0
+        )
+
+    columns = FEATURE_COLUMNS if columns is None else columns
+    return max((depth[c] for c in columns), default=0)
+
+
+def compute(df: pd.DataFrame, columns=None, carry: dict = None) -> dict:
+    """
+    {column: raw Series} for columns (default: FEATURE_COLUMNS),
+    computing only the nodes they depend on.
+    """
+    columns = FEATURE_COLUMNS if columns is None else list(columns)
+
+    values = {name: df[name] for name in SOURCES[:6] if name in df}
+    values["bars"] = df
+    values["carry"] = carry or {}
+
+    for name in resolve(columns):
+        node = NODES[name]
+        values[name] = node.compute({dep: values[dep] for dep in node.inputs})
+
+    return {name: values[name] for name in columns}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE feature registry")
+    parser.add_argument("--columns", nargs="+", help="default: every feature")
+    args = parser.parse_args()
+
+    columns = args.columns or FEATURE_COLUMNS
+    nodes = resolve(columns)
+
+    bars = lookback(columns)
+    print(f"{len(columns)} features → {len(nodes)} nodes, lookback {bars} bars ({bars + 1} rows)\n")
+    for name in nodes:
+        node = NODES[name]
+        print(f"  {name:<24} window {node.window:>2}  ← {', '.join(node.inputs)}")
+
+
+if __name__ == "__main__":
+    main()
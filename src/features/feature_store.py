@@ -0,0 +1,214 @@
+"""
+PTRE - Latest Feature Store
+
+Keeps the most recent feature row per ticker in memory for serving.
+
+- Entries are keyed by the feature file's (mtime, size), so a row is
+  only re-read after build_features rewrites the ticker's features
+- Cold reads touch only the end of the file (last CSV line / last
+  Parquet row group), so latency does not grow with stored history
+- Rows whose date does not parse (leftover "Date"/"Ticker" header rows)
+  are skipped, as in storage.read_frame
+- Rows are held as FEATURE_DTYPE (float32 with COMPACT_DTYPES)
+- attach(snapshot) serves the latest rows of a published shared
+  generation instead (one memory-mapped block for all workers)
+- stream(ticker, bar, date) feeds a new bar through the ticker's
+  streaming engine; until invalidate(), the ticker is served that row
+  (features through the bar, dated the next session) without any
+  file being rebuilt
+"""
+
+from pathlib import Path
+import io
+import os
+import threading
+
+import pandas as pd
+
+from src.features.feature_registry import FEATURE_DTYPE
+from src.utils.metrics import stage
+from src.utils.storage import SUFFIXES, locate
+
+# ABSOLUTE PROJECT ROOT (same convention as generate_final_signal)
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+FEATURE_DIR = BASE_DIR / "data" / "processed" / "features"
+
+# Bytes read per backwards step when seeking the last line
+TAIL_BLOCK_SIZE = 8192
+
+
+def _is_dated(line: bytes) -> bool:
+    field = line.split(b",", 1)[0].strip().decode()
+    return pd.notna(pd.to_datetime(field, errors="coerce"))
+
+
+def read_last_row(path: Path) -> pd.DataFrame:
+    """
+    Parse only the header and the last dated line of a feature CSV.
+    Returns the same frame as storage.read_frame(path).iloc[[-1]].
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+
+        tail = b""
+        while pos > data_start:
+            step = min(TAIL_BLOCK_SIZE, pos - data_start)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+
+            lines = tail.rstrip(b"\r\n").split(b"\n")
+
+            # The first line may be cut off until the header is reached
+            if pos > data_start:
+                lines = lines[1:]
+
+            for line in reversed(lines):
+                if _is_dated(line):
+                    # Same parser as the full read -> bit-identical values
+                    row = pd.read_csv(
+                        io.BytesIO(header + line.rstrip(b"\r") + b"\n"),
+                        index_col=0
+                    )
+                    row.index = pd.to_datetime(row.index)
+                    return row
+
+    raise ValueError(f"No feature rows in {path}")
+
+
+def read_last_parquet_row(path: Path) -> pd.DataFrame:
+    """
+    Last row of a feature Parquet file; only the final row group is read.
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    table = parquet.read_row_group(parquet.num_row_groups - 1)
+
+    if table.num_rows == 0:
+        raise ValueError(f"No feature rows in {path}")
+
+    return table.slice(table.num_rows - 1).to_pandas()
+
+
+def _file_version(path: Path):
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class FeatureStore:
+
+    def __init__(self, feature_dir: Path = FEATURE_DIR):
+        self.feature_dir = Path(feature_dir)
+        self.snapshot = None
+        self._rows = {}
+        self._engines = {}
+        self._live = {}
+        self._lock = threading.Lock()
+
+    def attach(self, snapshot):
+        """
+        Serve latest rows from snapshot's current generation.
+        """
+        self.snapshot = snapshot
+        self.invalidate()
+        return self
+
+    def path_for(self, ticker: str) -> Path:
+        if self.snapshot is not None:
+            return self.snapshot.current().path / "features.npy"
+        return locate(self.feature_dir, f"{ticker}_features")
+
+    def latest(self, ticker: str) -> pd.DataFrame:
+        """
+        Latest feature row (1-row DataFrame) for ticker.
+        The frame is shared between callers; do not mutate it.
+        """
+        ticker = ticker.upper()
+
+        live = self._live.get(ticker)
+        if live is not None:
+            return live[1]
+
+        if self.snapshot is not None:
+            return self.snapshot.current().latest(ticker)
+
+        path = self.path_for(ticker)
+
+        if not path.exists():
+            raise FileNotFoundError(f"Missing features for {ticker}")
+
+        version = _file_version(path)
+
+        cached = self._rows.get(ticker)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self._lock:
+            cached = self._rows.get(ticker)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            with stage("feature_parse"):
+                if path.suffix == SUFFIXES["parquet"]:
+                    row = read_last_parquet_row(path)
+                else:
+                    row = read_last_row(path)
+                row = row.astype(FEATURE_DTYPE, copy=False)
+            self._rows[ticker] = (version, row)
+
+        return row
+
+    def stream(self, ticker: str, bar, date) -> pd.DataFrame:
+        """
+        Push bar (open, high, low, close, adj_close, volume) dated date
+        into ticker's streaming engine, warmed up on its clean history
+        before date the first time. Returns the row now served.
+        """
+        from src.features.streaming_features import StreamingFeatures
+        from src.utils.storage import read_dataset
+
+        ticker = ticker.upper()
+        date = pd.Timestamp(date)
+
+        with self._lock:
+            engine = self._engines.get(ticker)
+            if engine is None:
+                history = read_dataset("clean", ticker)
+                engine = StreamingFeatures.from_history(history[history.index < date])
+                self._engines[ticker] = engine
+
+            engine.push(bar, date)
+            row = engine.frame(engine.next_row(), date + pd.offsets.BDay(1))
+            self._live[ticker] = (("live", engine.bars, date), row)
+
+        return row
+
+    def version(self, ticker: str):
+        live = self._live.get(ticker.upper())
+        if live is not None:
+            return live[0]
+        if self.snapshot is not None:
+            return self.snapshot.current().name
+        cached = self._rows.get(ticker.upper())
+        return None if cached is None else cached[0]
+
+    def invalidate(self, ticker: str = None):
+        with self._lock:
+            if ticker is None:
+                self._rows.clear()
+                self._engines.clear()
+                self._live.clear()
+            else:
+                self._rows.pop(ticker.upper(), None)
+                self._engines.pop(ticker.upper(), None)
+                self._live.pop(ticker.upper(), None)
+
+
+# Process-wide store shared by the API and CLI scripts
+feature_store = FeatureStore()
@@ -0,0 +1,279 @@
+"""
+PTRE - Incremental Feature Builder
+
+Appends feature rows for newly arrived daily bars instead of rebuilding
+the full history with build_features.main.
+
+Per ticker we keep a small running state next to the feature files:
+- the last LOOKBACK clean bars (enough for every rolling window)
+- EMA values for ema_20 / ema_50 / volume_surprise at the last bar
+- the cumulative AD and OBV lines over those bars
+- every earlier atr_20 value in a sorted array (order statistics for
+  the atr_percentile rank)
+
+New rows are computed by build_features on (stored bars + new bars)
+with that state carried in, so they match what a full rebuild produces
+for the same rows. atr_percentile is a full-sample rank: rows already on
+disk keep the rank they had when written, so run a full rebuild when
+historical values must be refreshed. Rows whose date does not parse
+(leftover "Date"/"Ticker" header rows) are dropped, as in the trainers.
+
+Run: python -m src.features.incremental_features
+"""
+
+from pathlib import Path
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from src.config.tickers import TICKERS
+from src.features.build_features import FEATURE_DIR, build_features
+from src.features.feature_registry import money_flow_volume, obv_increment
+from src.features.rolling import rolling_moments, true_range
+from src.utils.storage import (
+    append_dataset,
+    dataset_path,
+    read_dataset,
+    write_dataset,
+)
+
+STATE_DIR = FEATURE_DIR / "state"
+
+# Longest lookback of any feature (rsi_divergence needs ~80 bars) + margin
+LOOKBACK = 120
+
+ATR_WINDOW = 20
+
+# Tail bars whose atr_20 is recomputed from the stored window
+# (the first ATR_WINDOW bars lack a complete true-range window)
+ATR_RECOMPUTED = LOOKBACK - ATR_WINDOW
+
+EMA_SPANS = {
+    "ema_20": ("adj_close", 20),
+    "ema_50": ("adj_close", 50),
+    "volume_ema_20": ("volume", 20),
+}
+
+
+# -----------------------------
+# Seeded recursions
+# -----------------------------
+def _ewm_from(seed: float, values: pd.Series, span: int) -> np.ndarray:
+    # Prepending the last EMA value reproduces pandas' adjust=False recursion
+    seeded = pd.concat([pd.Series([seed]), values.reset_index(drop=True)])
+    return seeded.ewm(span=span, adjust=False).mean().to_numpy()[1:]
+
+
+def _cumsum_from(acc: float, increments: pd.Series) -> np.ndarray:
+    seeded = pd.concat([pd.Series([acc]), increments.reset_index(drop=True)])
+    return seeded.cumsum().to_numpy()[1:]
+
+
+def _last_valid(values, default=0.0) -> float:
+    values = np.asarray(values, dtype=float)
+    valid = values[~np.isnan(values)]
+    return float(valid[-1]) if len(valid) else default
+
+
+def _atr_20(df: pd.DataFrame) -> pd.Series:
+    # Same kernel as build_features, so ranks against the history tie alike
+    return rolling_moments(true_range(df), (ATR_WINDOW,), std=False)[ATR_WINDOW][0]
+
+
+def _file_version(path: Path):
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# -----------------------------
+# State
+# -----------------------------
+def state_path(ticker: str) -> Path:
+    return STATE_DIR / f"{ticker}_state.pkl"
+
+
+def load_state(ticker: str):
+    path = state_path(ticker)
+    if not path.exists():
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def save_state(ticker: str, state: dict):
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    path = state_path(ticker)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _history_state(df: pd.DataFrame, ema: dict, ad_line, obv, atr_20) -> dict:
+    """
+    State after the last bar of df. ad_line / obv / atr_20 are aligned to df.
+    """
+    atr_20 = np.asarray(atr_20, dtype=float)
+    older = atr_20[:max(len(atr_20) - ATR_RECOMPUTED, 0)]
+
+    return {
+        "last_date": df.index[-1],
+        "tail": df.iloc[-LOOKBACK:].copy(),
+        "ema": ema,
+        "ad_line": np.asarray(ad_line, dtype=float)[-LOOKBACK:],
+        "ad_acc": _last_valid(ad_line),
+        "obv": np.asarray(obv, dtype=float)[-LOOKBACK:],
+        "atr_history": np.sort(older[~np.isnan(older)]),
+    }
+
+
+def initial_state(df: pd.DataFrame) -> dict:
+    ema = {
+        name: float(df[col].ewm(span=span, adjust=False).mean().iloc[-1])
+        for name, (col, span) in EMA_SPANS.items()
+    }
+
+    return _history_state(
+        df,
+        ema,
+        money_flow_volume(df).cumsum(),
+        obv_increment(df).cumsum(),
+        _atr_20(df),
+    )
+
+
+# -----------------------------
+# Builds
+# -----------------------------
+def load_clean(ticker: str) -> pd.DataFrame:
+    # Sorted DatetimeIndex, leftover "Date"/"Ticker" header rows dropped
+    return read_dataset("clean", ticker)
+
+
+def full_rebuild(ticker: str, df: pd.DataFrame) -> int:
+    features = build_features(df).dropna()
+
+    out_path = write_dataset(features, "features", ticker)
+
+    state = initial_state(df)
+    state["features_version"] = _file_version(out_path)
+    save_state(ticker, state)
+
+    return len(features)
+
+
+def _carry(frame: pd.DataFrame, state: dict) -> dict:
+    """
+    Seeded EMA / AD / OBV series aligned to frame (= stored tail + new bars).
+    """
+    n_tail = len(state["tail"])
+    new = frame.iloc[n_tail:]
+
+    carry = {}
+    for name, (col, span) in EMA_SPANS.items():
+        values = np.full(len(frame), np.nan)
+        values[n_tail - 1] = state["ema"][name]
+        values[n_tail:] = _ewm_from(state["ema"][name], new[col], span)
+        carry[name] = pd.Series(values, index=frame.index)
+
+    ad_new = _cumsum_from(state["ad_acc"], money_flow_volume(frame).iloc[n_tail:])
+    carry["ad_line"] = pd.Series(
+        np.concatenate([state["ad_line"], ad_new]), index=frame.index
+    )
+
+    obv_new = _cumsum_from(state["obv"][-1], obv_increment(frame).iloc[n_tail:])
+    carry["obv"] = pd.Series(
+        np.concatenate([state["obv"], obv_new]), index=frame.index
+    )
+
+    carry["atr_history"] = state["atr_history"]
+
+    return carry
+
+
+def _next_state(frame: pd.DataFrame, state: dict, carry: dict) -> dict:
+    atr_20 = _atr_20(frame).to_numpy()
+
+    # Bars leaving the recomputed window join the sorted history
+    n_new = len(frame) - len(state["tail"])
+    start = ATR_WINDOW
+    leaving = atr_20[start:start + n_new]
+    leaving = np.sort(leaving[~np.isnan(leaving)])
+
+    history = state["atr_history"]
+    history = np.insert(history, np.searchsorted(history, leaving), leaving)
+
+    new_state = _history_state(
+        frame,
+        {name: float(carry[name].iloc[-1]) for name in EMA_SPANS},
+        carry["ad_line"],
+        carry["obv"],
+        atr_20,
+    )
+    new_state["ad_acc"] = _last_valid(carry["ad_line"], state["ad_acc"])
+    new_state["atr_history"] = history
+
+    return new_state
+
+
+def update_ticker(ticker: str) -> tuple:
+    """
+    Append feature rows for bars newer than the stored state.
+    Returns (mode, rows written) with mode "full", "incremental" or "none".
+    """
+    df = load_clean(ticker)
+
+    out_path = dataset_path("features", ticker)
+    state = load_state(ticker)
+
+    # Missing / stale state (features rebuilt elsewhere) -> full rebuild
+    if (
+        state is None or not out_path.exists()
+        or state.get("features_version") != _file_version(out_path)
+    ):
+        return "full", full_rebuild(ticker, df)
+
+    tail = state["tail"]
+
+    # History was rewritten (e.g. re-adjusted prices) -> full rebuild
+    stored = df.reindex(tail.index)
+    if not stored[tail.columns].equals(tail):
+        return "full", full_rebuild(ticker, df)
+
+    new_bars = df[df.index > state["last_date"]]
+    if new_bars.empty:
+        return "none", 0
+
+    frame = pd.concat([tail, new_bars[tail.columns]])
+    carry = _carry(frame, state)
+
+    features = build_features(frame, carry=carry)
+    rows = features.iloc[len(tail):].dropna()
+
+    out_path = append_dataset(rows, "features", ticker)
+
+    new_state = _next_state(frame, state, carry)
+    new_state["features_version"] = _file_version(out_path)
+    save_state(ticker, new_state)
+
+    return "incremental", len(rows)
+
+
+def main():
+    print("Updating features incrementally...\n")
+
+    for ticker in TICKERS:
+        mode, rows = update_ticker(ticker)
+
+        if mode == "none":
+            print(f"{ticker}: up to date")
+        else:
+            print(f"{ticker}: {mode} → {rows} rows written")
+
+    print("\nIncremental feature update completed.")
+
+
+if __name__ == "__main__":
+    main()
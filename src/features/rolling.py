@@ -0,0 +1,635 @@
+"""
+PTRE - Rolling Kernels
+
+Rolling-window primitives shared by build_features, the incremental
+and streaming feature builders and market_data.
+
+Batch kernels (whole Series in, aligned Series out):
+- rolling_moments: mean / std for several windows from one set of
+  extended-precision prefix sums; windows that contain NaN or are not
+  yet full give NaN, constant windows give their value and 0 exactly,
+  as pandas does
+- rolling_min / rolling_max: van Herk / Gil-Werman block scans, exact
+  and O(n) for any window (no per-window reduction)
+- rolling_corr: pandas rolling().corr() from the same prefix sums
+- rolling_prod, rolling_linregress: sliding-window reductions
+- true_range, pct_rank
+
+Running aggregates (one value per push, for streaming_features):
+- RollingMean / RollingSum / RollingVar repeat pandas' compensated
+  add-remove updates, so they are bit-identical to .rolling()
+- RollingExtreme keeps a monotonic deque (amortized O(1) per push)
+- Ewm, RollingCorr, RollingProd, RollingRegression, ExpandingRank, Lag
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+import math
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+NAN = float("nan")
+
+
+# =============================
+# BATCH KERNELS
+# =============================
+def _windows(series: pd.Series, window: int):
+    values = series.to_numpy(dtype=float)
+    if len(values) < window:
+        return values, None
+    return values, sliding_window_view(values, window)
+
+
+def _align(values, window_result, window: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if window_result is not None:
+        out[window - 1:] = window_result
+    return out
+
+
+def _prefix(values: np.ndarray, dtype=float) -> np.ndarray:
+    # prefix[i] = sum of values[:i]; window sums are prefix differences
+    out = np.empty(len(values) + 1, dtype=dtype)
+    out[0] = 0.0
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _window_sums(prefix: np.ndarray, window: int) -> np.ndarray:
+    return prefix[window:] - prefix[:-window]
+
+
+def _constant_runs(values: np.ndarray) -> np.ndarray:
+    """
+    Length of the run of equal values ending at each position.
+    """
+    n = len(values)
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = values[1:] != values[:-1]
+    start_index = np.flatnonzero(starts)
+    return np.arange(n) - start_index[np.cumsum(starts) - 1] + 1
+
+
+class _Prefix:
+    """
+    Prefix sums of one series (and of its squares around its mean),
+    shared by every window asked of it. They are accumulated in
+    extended precision (np.longdouble), so a window sum is rounded to
+    float64 once, as pandas' compensated running sum is: rolling means
+    agree with pandas to the last bit almost everywhere and exact ties
+    (atr_percentile ranks) survive.
+    """
+
+    def __init__(self, series: pd.Series, squares: bool = True):
+        self.values = series.to_numpy(dtype=float)
+        valid = ~np.isnan(self.values)
+
+        extended = np.where(valid, self.values, 0.0).astype(np.longdouble)
+        self.center = extended[valid].mean() if valid.any() else np.longdouble(0)
+
+        self.sums = _prefix(extended, np.longdouble)
+        self.counts = _prefix(valid, np.int64)
+
+        self.squares = None
+        if squares:
+            centred = np.where(valid, extended - self.center, 0)
+            self.squares = _prefix(centred * centred, np.longdouble)
+
+        self._runs = None
+
+    def runs(self) -> np.ndarray:
+        if self._runs is None:
+            self._runs = _constant_runs(self.values)
+        return self._runs
+
+    def moments(self, window: int, std: bool = True):
+        n = len(self.values)
+        mean = np.full(n, np.nan)
+        dev = np.full(n, np.nan) if std else None
+
+        if n < window:
+            return mean, dev
+
+        # Only windows with `window` valid values (pandas' min_periods)
+        full = _window_sums(self.counts, window) == window
+        constant = full & (self.runs()[window - 1:] >= window)
+
+        sums = _window_sums(self.sums, window)
+        mean[window - 1:] = np.where(full, sums.astype(float) / window, np.nan)
+        mean[window - 1:][constant] = self.values[window - 1:][constant]
+
+        if std:
+            centred_sums = sums - window * self.center
+            ssq = _window_sums(self.squares, window) - centred_sums * centred_sums / window
+            var = (np.maximum(ssq, 0) / (window - 1)).astype(float)
+            var[constant] = 0.0
+            dev[window - 1:] = np.where(full, np.sqrt(var), np.nan)
+
+        return mean, dev
+
+
+def rolling_moments(series: pd.Series, windows, std: bool = True) -> dict:
+    """
+    {window: (mean, std)} of series for every window, from a single
+    pass of prefix sums (std is None with std=False). Same values as
+    series.rolling(window).mean() / .std() (means almost always
+    bit-identical, stds within a few ulp).
+    """
+    prefix = _Prefix(series, squares=std)
+
+    out = {}
+    for window in windows:
+        mean, dev = prefix.moments(window, std=std)
+        out[window] = (
+            pd.Series(mean, index=series.index),
+            None if dev is None else pd.Series(dev, index=series.index),
+        )
+
+    return out
+
+
+def rolling_corr(x: pd.Series, y: pd.Series, window: int) -> pd.Series:
+    """
+    x.rolling(window).corr(y), two-pass over each window (deviations
+    from the window mean, so large offsets like volume · price do not
+    cancel). Windows where either side is constant give NaN (0 / 0 or
+    ±inf in pandas, NaN once build_features drops infinities).
+    """
+    xv, win_x = _windows(x, window)
+    yv, win_y = _windows(y, window)
+
+    corr = None
+    if win_x is not None:
+        dx = win_x - win_x.mean(axis=1, keepdims=True)
+        dy = win_y - win_y.mean(axis=1, keepdims=True)
+
+        sxy = np.einsum("ij,ij->i", dx, dy)
+        sxx = np.einsum("ij,ij->i", dx, dx)
+        syy = np.einsum("ij,ij->i", dy, dy)
+
+        with np.errstate(all="ignore"):
+            corr = sxy / np.sqrt(sxx * syy)
+
+        constant = (
+            (_constant_runs(xv)[window - 1:] >= window) |
+            (_constant_runs(yv)[window - 1:] >= window)
+        )
+        corr[constant] = np.nan
+
+    return pd.Series(_align(xv, corr, window), index=x.index)
+
+
+def _rolling_extreme(series: pd.Series, window: int, ufunc, identity) -> pd.Series:
+    """
+    van Herk / Gil-Werman: split into blocks of `window`, scan each
+    block forwards (prefix) and backwards (suffix); a window is
+    suffix[start] combined with prefix[end]. NaN propagates, so
+    windows containing NaN give NaN as with rolling(window).
+    """
+    values = series.to_numpy(dtype=float)
+    n = len(values)
+    out = np.full(n, np.nan)
+
+    if n < window:
+        return pd.Series(out, index=series.index)
+
+    padded = np.concatenate([values, np.full(-n % window, identity)])
+    blocks = padded.reshape(-1, window)
+
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+
+    out[window - 1:] = ufunc(suffix[:n - window + 1], prefix[window - 1:n])
+    return pd.Series(out, index=series.index)
+
+
+def rolling_max(series: pd.Series, window: int) -> pd.Series:
+    return _rolling_extreme(series, window, np.maximum, -np.inf)
+
+
+def rolling_min(series: pd.Series, window: int) -> pd.Series:
+    return _rolling_extreme(series, window, np.minimum, np.inf)
+
+
+def rolling_prod(series: pd.Series, window: int) -> pd.Series:
+    """
+    Same as series.rolling(window).apply(np.prod, raw=True), without the
+    per-window Python call.
+    """
+    values, win = _windows(series, window)
+    prod = None if win is None else np.prod(win, axis=1)
+    return pd.Series(_align(values, prod, window), index=series.index)
+
+
+def rolling_linregress(series: pd.Series, window: int, r2: bool = True):
+    """
+    Closed-form rolling OLS of series on x = 0..window-1.
+
+    Matches np.polyfit(x, y, 1) per window: slope = Sxy / Sxx and
+    R² = Sxy² / (Sxx · Syy) (0 when the window is flat). Windows that
+    contain NaN give NaN. Returns (slope, r2) as Series; r2 is None
+    with r2=False (skips the Syy pass).
+    """
+    values, win = _windows(series, window)
+
+    slope = fit = None
+    if win is not None:
+        x = np.arange(window) - (window - 1) / 2
+        sxx = np.sum(x ** 2)
+
+        # Σ(x - x̄)·y == Σ(x - x̄)(y - ȳ) because Σ(x - x̄) = 0
+        sxy = win @ x
+        slope = sxy / sxx
+
+        if r2:
+            syy = np.sum((win - win.mean(axis=1, keepdims=True)) ** 2, axis=1)
+            fit = np.divide(
+                sxy ** 2, sxx * syy,
+                out=np.zeros_like(sxy), where=syy != 0
+            )
+            fit[np.isnan(sxy)] = np.nan
+
+    return (
+        pd.Series(_align(values, slope, window), index=series.index),
+        pd.Series(_align(values, fit, window), index=series.index) if r2 else None,
+    )
+
+
+def pct_rank(series: pd.Series, history=None) -> pd.Series:
+    """
+    series.rank(pct=True) (average ties). With history, a sorted array of
+    earlier observations, ranks are taken against history + series, as if
+    both had been ranked together.
+    """
+    if history is None:
+        return series.rank(pct=True)
+
+    values = series.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    own = np.sort(values[valid])
+
+    less = (
+        np.searchsorted(history, values, side="left") +
+        np.searchsorted(own, values, side="left")
+    )
+    equal = (
+        np.searchsorted(history, values, side="right") +
+        np.searchsorted(own, values, side="right")
+    ) - less
+
+    pct = (less + (equal + 1) / 2) / (len(history) + len(own))
+    pct[~valid] = np.nan
+
+    return pd.Series(pct, index=series.index)
+
+
+def true_range(df: pd.DataFrame) -> pd.Series:
+    """
+    max(high - low, |high - prev close|, |low - prev close|), skipping
+    NaN (the first bar is high - low).
+    """
+    high = df["high"].to_numpy(dtype=float)
+    low = df["low"].to_numpy(dtype=float)
+    prev_close = df["close"].shift().to_numpy(dtype=float)
+
+    tr = np.fmax(
+        np.fmax(high - low, np.abs(high - prev_close)),
+        np.abs(low - prev_close)
+    )
+    return pd.Series(tr, index=df.index)
+
+
+# =============================
+# RUNNING AGGREGATES
+# =============================
+class Lag:
+    """
+    The last n + 1 values: ago(k) is the value k pushes back.
+    """
+
+    def __init__(self, n: int):
+        self.values = deque([NAN] * (n + 1), maxlen=n + 1)
+
+    def push(self, value):
+        self.values.append(value)
+
+    def ago(self, k: int):
+        return self.values[-1 - k]
+
+
+class RollingMean:
+    """
+    pandas rolling(window).mean(): Kahan-compensated running sum with
+    separate add / remove compensation and its special cases.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = deque()
+        self.nobs = 0
+        self.total = 0.0
+        self.add_comp = 0.0
+        self.remove_comp = 0.0
+        self.negatives = 0
+        self.same = 0
+        self.prev = NAN
+
+    def _add(self, value):
+        if value == value:
+            self.nobs += 1
+            y = value - self.add_comp
+            t = self.total + y
+            self.add_comp = t - self.total - y
+            self.total = t
+            if math.copysign(1.0, value) < 0:
+                self.negatives += 1
+            self.same = self.same + 1 if value == self.prev else 1
+            self.prev = value
+
+    def _remove(self, value):
+        if value == value:
+            self.nobs -= 1
+            y = -value - self.remove_comp
+            t = self.total + y
+            self.remove_comp = t - self.total - y
+            self.total = t
+            if math.copysign(1.0, value) < 0:
+                self.negatives -= 1
+
+    def push(self, value):
+        if not self.buffer:
+            self.prev, self.same = value, 0
+
+        self.buffer.append(value)
+        if len(self.buffer) > self.window:
+            self._remove(self.buffer.popleft())
+        self._add(value)
+
+        if self.nobs < self.window:
+            return NAN
+
+        mean = self.total / self.nobs
+        if self.same >= self.nobs:
+            return self.prev
+        if self.negatives == 0 and mean < 0:
+            return 0.0
+        if self.negatives == self.nobs and mean > 0:
+            return 0.0
+        return mean
+
+
+class RollingSum(RollingMean):
+    """
+    pandas rolling(window).sum().
+    """
+
+    def push(self, value):
+        if not self.buffer:
+            self.prev, self.same = value, 0
+
+        self.buffer.append(value)
+        if len(self.buffer) > self.window:
+            self._remove(self.buffer.popleft())
+        self._add(value)
+
+        if self.nobs < self.window:
+            return NAN
+        if self.same >= self.nobs:
+            return self.prev * self.nobs
+        return self.total
+
+
+class RollingVar:
+    """
+    pandas rolling(window).var(): Welford updates with Kahan
+    compensation, removals applied before additions.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.buffer = deque()
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.add_comp = 0.0
+        self.remove_comp = 0.0
+        self.same = 0
+        self.prev = NAN
+
+    def _add(self, value):
+        if value != value:
+            return
+
+        self.nobs += 1
+        self.same = self.same + 1 if value == self.prev else 1
+        self.prev = value
+
+        prev_mean = self.mean - self.add_comp
+        y = value - self.add_comp
+        t = y - self.mean
+        self.add_comp = t + self.mean - y
+        self.mean = self.mean + t / self.nobs
+        self.ssqdm += (value - prev_mean) * (value - self.mean)
+
+    def _remove(self, value):
+        if value != value:
+            return
+
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean - self.remove_comp
+            y = value - self.remove_comp
+            t = y - self.mean
+            self.remove_comp = t + self.mean - y
+            self.mean = self.mean - t / self.nobs
+            self.ssqdm -= (value - prev_mean) * (value - self.mean)
+        else:
+            self.mean = self.ssqdm = 0.0
+
+    def push(self, value):
+        if not self.buffer:
+            self.prev, self.same = value, 0
+
+        self.buffer.append(value)
+        if len(self.buffer) > self.window:
+            self._remove(self.buffer.popleft())
+        self._add(value)
+
+        if self.nobs < self.window or self.nobs <= 1:
+            return NAN
+        if self.same >= self.nobs:
+            return 0.0
+        return self.ssqdm / (self.nobs - 1)
+
+
+def std_of(variance):
+    return math.sqrt(variance) if variance > 0 else (0.0 if variance == variance else NAN)
+
+
+class RollingExtreme:
+    """
+    Rolling min (or max) over window values with a monotonic deque of
+    (index, value): amortized O(1) per push.
+    """
+
+    def __init__(self, window: int, largest: bool):
+        self.window = window
+        self.largest = largest
+        self.deque = deque()
+        self.count = 0
+        self.valid = deque()
+
+    def push(self, value):
+        i = self.count
+        self.count += 1
+
+        self.valid.append(value == value)
+        if len(self.valid) > self.window:
+            self.valid.popleft()
+
+        if value == value:
+            if self.largest:
+                while self.deque and self.deque[-1][1] <= value:
+                    self.deque.pop()
+            else:
+                while self.deque and self.deque[-1][1] >= value:
+                    self.deque.pop()
+            self.deque.append((i, value))
+
+        while self.deque and self.deque[0][0] <= i - self.window:
+            self.deque.popleft()
+
+        if self.count < self.window or not all(self.valid):
+            return NAN
+        return self.deque[0][1]
+
+
+class Ewm:
+    """
+    pandas ewm(span, adjust=False).mean() recursion.
+    """
+
+    def __init__(self, span: int):
+        com = (span - 1) / 2
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_weight = 1.0 - self.alpha
+        self.value = NAN
+
+    def push(self, value):
+        if self.value != self.value:
+            self.value = value
+        elif value == value and self.value != value:
+            self.value = (
+                (self.old_weight * self.value + self.alpha * value)
+                / (self.old_weight + self.alpha)
+            )
+        return self.value
+
+
+class RollingCorr:
+    """
+    pandas x.rolling(window).corr(y): built from rolling means of x, y
+    and x·y and the rolling variances, as pandas does.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.mean_xy = RollingMean(window)
+        self.mean_x = RollingMean(window)
+        self.mean_y = RollingMean(window)
+        self.var_x = RollingVar(window)
+        self.var_y = RollingVar(window)
+        self.count = RollingSum(window)
+
+    def push(self, x, y):
+        mean_xy = self.mean_xy.push(x * y)
+        mean_x = self.mean_x.push(x)
+        mean_y = self.mean_y.push(y)
+        count = self.count.push(1.0 if (x + y) == (x + y) else 0.0)
+        var_x = self.var_x.push(x)
+        var_y = self.var_y.push(y)
+
+        with np.errstate(all="ignore"):
+            numerator = (
+                np.float64(mean_xy - mean_x * mean_y) * (count / np.float64(count - 1))
+            )
+            return float(numerator / np.float64(var_x * var_y) ** 0.5)
+
+
+class RollingWindow:
+    """
+    The last `window` values as an array (NaN-padded until full).
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque([NAN] * window, maxlen=window)
+        self.count = 0
+
+    def push(self, value):
+        self.values.append(value)
+        self.count += 1
+        return self.count >= self.window
+
+    def array(self) -> np.ndarray:
+        return np.fromiter(self.values, dtype=float, count=self.window)
+
+
+class RollingProd(RollingWindow):
+    """
+    rolling_prod: np.prod over the window (same reduction as the batch
+    kernel).
+    """
+
+    def push(self, value):
+        if not super().push(value):
+            return NAN
+        return float(np.prod(self.array()))
+
+
+class RollingRegression(RollingWindow):
+    """
+    rolling_linregress: OLS of the window on x = 0..window-1, returning
+    (slope, r2).
+    """
+
+    def __init__(self, window: int):
+        super().__init__(window)
+        self.x = np.arange(window) - (window - 1) / 2
+        self.sxx = np.sum(self.x ** 2)
+
+    def push(self, value):
+        if not super().push(value):
+            return NAN, NAN
+
+        y = self.array()
+        sxy = y @ self.x
+        if sxy != sxy:
+            return NAN, NAN
+
+        syy = np.sum((y - y.mean()) ** 2)
+        r2 = sxy ** 2 / (self.sxx * syy) if syy != 0 else 0.0
+
+        return float(sxy / self.sxx), float(r2)
+
+
+class ExpandingRank:
+    """
+    Rank (pct, average ties) of each value among all values so far.
+    """
+
+    def __init__(self):
+        self.sorted = []
+
+    def push(self, value):
+        if value != value:
+            return NAN
+
+        insort(self.sorted, value)
+        less = bisect_left(self.sorted, value)
+        equal = bisect_right(self.sorted, value) - less
+
+        return (less + (equal + 1) / 2) / len(self.sorted)
@@ -0,0 +1,442 @@
+"""
+PTRE - Streaming Features
+
+Bar-by-bar counterpart of build_features: push(bar) updates a fixed
+amount of running state and emits the feature row for that bar, in
+time independent of how much history came before.
+
+- Every rolling window is a ring buffer of at most 50 values with
+  running aggregates (src.features.rolling): rolling means / sums /
+  variances repeat pandas' compensated add-remove updates, rolling
+  min / max use monotonic deques, EMAs and the cumulative AD and OBV
+  lines are one-step recursions
+- Rolling regressions and products are evaluated over their (20 or
+  fewer) buffered values
+- push(bar) returns the same leakage-safe row build_features gives
+  that date: the features of everything up to the previous bar.
+  next_row() is the row the next bar will get, i.e. the features of
+  everything up to and including the bar just pushed; that is what a
+  live signal at the close should be scored on
+- atr_percentile ranks each atr_20 value among all earlier ones (the
+  as-of rank incremental_features also produces); its insertion into
+  the sorted history is the only step that grows with history
+  (binary search + one memmove)
+
+Run: python -m src.features.streaming_features check [--tickers ...]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config.tickers import TICKERS
+from src.features.feature_registry import FEATURE_COLUMNS, FEATURE_DTYPE
+from src.features.rolling import (
+    NAN,
+    Ewm,
+    ExpandingRank,
+    Lag,
+    RollingCorr,
+    RollingExtreme,
+    RollingMean,
+    RollingProd,
+    RollingRegression,
+    RollingSum,
+    RollingVar,
+    std_of,
+    true_range,
+)
+from src.utils.storage import read_dataset
+
+BAR_FIELDS = ("open", "high", "low", "close", "adj_close", "volume")
+
+LOG_2 = np.log(2)
+
+# Max |streamed - build_features| relative to the column's scale
+RTOL = 1e-9
+
+
+# =============================
+# ENGINE
+# =============================
+class StreamingFeatures:
+    """
+    Running feature state of one ticker.
+
+        engine = StreamingFeatures.from_history(clean_df)
+        row = engine.push(bar)     # row of bar's date (as build_features)
+        live = engine.next_row()   # includes bar: for the next session
+    """
+
+    def __init__(self):
+        self.bars = 0
+        self.last_date = None
+
+        # Price / volume lags
+        self.adj_close = Lag(50)
+        self.log_close = Lag(5)
+        self.high = Lag(1)
+        self.low = Lag(1)
+        self.close = Lag(1)
+        self.volume = Lag(5)
+        self.rsi = Lag(14)
+        self.ad_filled = Lag(14)
+
+        # A. returns
+        self.growth_5 = RollingProd(5)
+        self.growth_10 = RollingProd(10)
+
+        # B. volatility
+        self.ret_var = {w: RollingVar(w) for w in (5, 10, 20)}
+        self.hl_mean = {w: RollingMean(w) for w in (5, 10)}
+
+        # C. momentum
+        self.avg_gain = RollingMean(14)
+        self.avg_loss = RollingMean(14)
+        self.price_ret_14_mean = RollingMean(50)
+        self.price_ret_14_var = RollingVar(50)
+        self.rsi_change_mean = RollingMean(50)
+        self.rsi_change_var = RollingVar(50)
+        self.plus_dm = RollingMean(14)
+        self.minus_dm = RollingMean(14)
+        self.atr_14 = RollingMean(14)
+        self.ret_mean = {w: RollingMean(w) for w in (5, 10)}
+
+        # D. trend context
+        self.sma = {w: RollingMean(w) for w in (5, 10, 20, 50)}
+        self.ema_20 = Ewm(20)
+        self.ema_50 = Ewm(50)
+        self.low_20 = RollingExtreme(20, largest=False)
+        self.high_20 = RollingExtreme(20, largest=True)
+
+        # E. volume
+        self.volume_mean = RollingMean(20)
+        self.volume_var = RollingVar(20)
+        self.volume_price_corr = RollingCorr(10)
+
+        # F. engineered
+        self.weighted_ret_sum = RollingSum(20)
+        self.volume_sum = RollingSum(20)
+        self.ad_acc = 0.0
+        self.ad_last_valid = NAN
+        self.volume_ema = Ewm(20)
+        self.atr_20 = RollingMean(20)
+        self.atr_rank = ExpandingRank()
+        self.log_price_fit = RollingRegression(20)
+        self.obv = 0.0
+        self.price_fit = RollingRegression(10)
+        self.obv_fit = RollingRegression(10)
+
+        # Features of everything up to the last pushed bar
+        self._pending = np.full(len(FEATURE_COLUMNS), np.nan)
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame):
+        """
+        Engine warmed up on a clean OHLCV frame (one push per row).
+        """
+        engine = cls()
+        for date, values in zip(df.index, df[list(BAR_FIELDS)].to_numpy(dtype=float)):
+            engine.push(dict(zip(BAR_FIELDS, values)), date)
+        return engine
+
+    def push(self, bar, date=None) -> np.ndarray:
+        """
+        Add one bar (mapping with open, high, low, close, adj_close,
+        volume). Returns the feature row build_features gives this
+        bar's date, in FEATURE_COLUMNS order (NaN while warming up).
+        """
+        row = self._pending
+        self._pending = self._update(
+            float(bar["open"]), float(bar["high"]), float(bar["low"]),
+            float(bar["close"]), float(bar["adj_close"]), float(bar["volume"]),
+        )
+
+        self.bars += 1
+        self.last_date = date
+
+        return row
+
+    def next_row(self) -> np.ndarray:
+        """
+        Row the next bar will get: features of all bars pushed so far.
+        """
+        return self._pending.copy()
+
+    def ready(self) -> bool:
+        return not np.isnan(self._pending).any()
+
+    def frame(self, row: np.ndarray, date) -> pd.DataFrame:
+        """
+        1-row DataFrame of row (model input), as FEATURE_DTYPE.
+        """
+        return pd.DataFrame(
+            np.asarray([row], dtype=FEATURE_DTYPE),
+            index=pd.DatetimeIndex([date]),
+            columns=FEATURE_COLUMNS
+        )
+
+    # ------------------------
+    # One bar
+    # ------------------------
+    def _update(self, open_, high, low, close, adj_close, volume) -> np.ndarray:
+        f = {}
+
+        with np.errstate(all="ignore"):
+            c = np.float64(adj_close)
+            h, l, cl, o = np.float64(high), np.float64(low), np.float64(close), np.float64(open_)
+            v = np.float64(volume)
+
+            self.adj_close.push(c)
+            log_c = np.log(c)
+            self.log_close.push(log_c)
+
+            c_ago = self.adj_close.ago
+
+            # A. RETURNS
+            ret_1d = c / c_ago(1) - 1
+            f["ret_1d"] = ret_1d
+            f["ret_3d"] = c / c_ago(3) - 1
+            f["ret_5d"] = c / c_ago(5) - 1
+            f["ret_10d"] = c / c_ago(10) - 1
+
+            f["log_ret_1d"] = log_c - self.log_close.ago(1)
+            f["log_ret_5d"] = log_c - self.log_close.ago(5)
+
+            f["cum_ret_5d"] = self.growth_5.push(1 + ret_1d) - 1
+            f["cum_ret_10d"] = self.growth_10.push(1 + ret_1d) - 1
+
+            # B. VOLATILITY
+            vol = {w: std_of(self.ret_var[w].push(ret_1d)) for w in (5, 10, 20)}
+            f["vol_5d"], f["vol_10d"], f["vol_20d"] = vol[5], vol[10], vol[20]
+            f["vol_ratio_5_20"] = np.float64(vol[5]) / (vol[20] + 1e-6)
+            f["vol_ratio_10_20"] = np.float64(vol[10]) / (vol[20] + 1e-6)
+
+            hl_range = (h - l) / c
+            f["hl_vol_5d"] = self.hl_mean[5].push(hl_range)
+            f["hl_vol_10d"] = self.hl_mean[10].push(hl_range)
+
+            # C. MOMENTUM
+            delta = c - c_ago(1)
+            gain = delta if (delta >= 0 or delta != delta) else np.float64(0.0)
+            loss = -(delta if (delta <= 0 or delta != delta) else np.float64(0.0))
+
+            rs = np.float64(self.avg_gain.push(gain)) / self.avg_loss.push(loss)
+            rsi = 100 - (100 / (1 + rs))
+            f["rsi_14"] = rsi
+
+            price_ret_14 = c / c_ago(14) - 1
+            rsi_change_14 = rsi - self.rsi.ago(13) if self.bars >= 14 else np.float64(NAN)
+            self.rsi.push(rsi)
+
+            f["rsi_divergence"] = (
+                (price_ret_14 - self.price_ret_14_mean.push(price_ret_14)) /
+                (std_of(self.price_ret_14_var.push(price_ret_14)) + 1e-6)
+                -
+                (rsi_change_14 - self.rsi_change_mean.push(rsi_change_14)) /
+                (std_of(self.rsi_change_var.push(rsi_change_14)) + 1e-6)
+            )
+
+            prev_close = self.close.ago(0)
+            up_move = h - self.high.ago(0)
+            down_move = self.low.ago(0) - l
+            self.high.push(h)
+            self.low.push(l)
+            self.close.push(cl)
+
+            plus_dm = up_move if (up_move > down_move) & (up_move > 0) else 0.0
+            minus_dm = down_move if (down_move > up_move) & (down_move > 0) else 0.0
+
+            tr = max(
+                (x for x in (h - l, abs(h - prev_close), abs(l - prev_close)) if x == x),
+                default=np.float64(NAN)
+            )
+
+            atr_14 = np.float64(self.atr_14.push(tr))
+            plus_di = 100 * (self.plus_dm.push(plus_dm) / atr_14)
+            minus_di = 100 * (self.minus_dm.push(minus_dm) / atr_14)
+            f["dmi_spread"] = (plus_di - minus_di) / (plus_di + minus_di + 1e-6)
+
+            f["roc_5d"] = f["ret_5d"]
+            f["roc_10d"] = f["ret_10d"]
+
+            f["mom_slope_5d"] = self.ret_mean[5].push(ret_1d)
+            f["mom_slope_10d"] = self.ret_mean[10].push(ret_1d)
+
+            # D. TREND CONTEXT
+            sma = {w: np.float64(self.sma[w].push(c)) for w in (5, 10, 20, 50)}
+
+            f["dist_sma_20"] = (c - sma[20]) / sma[20]
+            f["dist_sma_50"] = (c - sma[50]) / sma[50]
+
+            trend_score = (
+                int(sma[5] > sma[10]) + int(sma[10] > sma[20]) +
+                int(sma[20] > sma[50]) + int(c > sma[50])
+            )
+            f["trend_alignment"] = (trend_score - 2) / 2
+
+            ema_20 = np.float64(self.ema_20.push(c))
+            ema_50 = np.float64(self.ema_50.push(c))
+            f["dist_ema_20"] = (c - ema_20) / ema_20
+            f["dist_ema_50"] = (c - ema_50) / ema_50
+
+            low_20 = self.low_20.push(c)
+            high_20 = self.high_20.push(c)
+            f["price_range_pos_20"] = (c - low_20) / np.float64(high_20 - low_20)
+
+            # E. VOLUME
+            volume_std = std_of(self.volume_var.push(v))
+            f["volume_zscore"] = (v - self.volume_mean.push(v)) / np.float64(volume_std)
+            f["volume_change_1d"] = v / self.volume.ago(0) - 1
+            f["volume_change_5d"] = v / self.volume.ago(4) - 1
+            self.volume.push(v)
+            f["volume_price_corr_10d"] = self.volume_price_corr.push(v, c)
+
+            # F. ENGINEERED FEATURES
+            f["vol_weighted_momentum"] = (
+                np.float64(self.weighted_ret_sum.push(ret_1d * v)) /
+                self.volume_sum.push(v)
+            )
+
+            money_flow_mult = ((cl - l) - (h - cl)) / (h - l)
+            if np.isinf(money_flow_mult):
+                money_flow_mult = np.float64(0.0)
+            money_flow = money_flow_mult * v
+
+            if money_flow == money_flow:
+                self.ad_acc = self.ad_acc + money_flow
+                self.ad_last_valid = self.ad_acc
+            self.ad_filled.push(self.ad_last_valid)
+            f["ad_momentum_14d"] = (
+                np.float64(self.ad_filled.ago(0)) / self.ad_filled.ago(14) - 1
+            )
+
+            f["volume_surprise"] = v / np.float64(self.volume_ema.push(v))
+
+            f["parkinson_vol"] = np.sqrt(
+                (1 / (4 * LOG_2)) * (np.log(h / l) ** 2)
+            )
+            f["garman_klass_vol"] = (
+                0.5 * (np.log(h / l) ** 2)
+                -
+                (2 * LOG_2 - 1) * (np.log(cl / o) ** 2)
+            )
+
+            f["atr_percentile"] = self.atr_rank.push(self.atr_20.push(tr))
+
+            slope_20, r2_20 = self.log_price_fit.push(log_c)
+            f["lr_slope_conf_20"] = np.float64(slope_20) * r2_20
+
+            direction = np.sign(cl - prev_close)
+            increment = direction * v
+            self.obv = self.obv + (increment if increment == increment else 0.0)
+
+            price_slope_10, _ = self.price_fit.push(c)
+            obv_slope_10, _ = self.obv_fit.push(self.obv)
+            f["obv_divergence"] = np.float64(obv_slope_10) - price_slope_10
+
+        row = np.array([f[name] for name in FEATURE_COLUMNS], dtype=float)
+        row[np.isinf(row)] = np.nan
+
+        return row
+
+
+# =============================
+# PARITY CHECK
+# =============================
+def stream(df: pd.DataFrame):
+    """
+    (rows, seconds): every row push() emits for df, as a DataFrame.
+    """
+    engine = StreamingFeatures()
+    bars = df[list(BAR_FIELDS)].to_numpy(dtype=float)
+
+    start = time.perf_counter()
+    rows = [engine.push(dict(zip(BAR_FIELDS, values))) for values in bars]
+    elapsed = time.perf_counter() - start
+
+    return pd.DataFrame(rows, index=df.index, columns=FEATURE_COLUMNS), elapsed
+
+
+def _as_of_rank(atr_20: pd.Series) -> pd.Series:
+    # Rank of each value among the values up to it (what streaming sees)
+    values = atr_20.to_numpy()
+    ranks = ExpandingRank()
+    return pd.Series([ranks.push(x) for x in values], index=atr_20.index)
+
+
+def compare(df: pd.DataFrame) -> dict:
+    """
+    Max |streamed - build_features| per column, relative to the
+    column's scale. atr_percentile is compared with the as-of rank:
+    build_features ranks over the full sample, so even its last row
+    still sees one later atr_20 value.
+    """
+    from src.features.build_features import build_features
+
+    batch = build_features(df)
+    streamed, elapsed = stream(df)
+
+    expected_rank = _as_of_rank(true_range(df).rolling(20).mean()).shift(1)
+
+    diffs = {}
+    for col in FEATURE_COLUMNS:
+        expected = expected_rank if col == "atr_percentile" else batch[col]
+        a, b = streamed[col].to_numpy(), expected.to_numpy()
+
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            diffs[col] = float("inf")
+            continue
+
+        scale = np.nanmax(np.abs(b)) if np.any(~np.isnan(b)) else 1.0
+        diffs[col] = float(np.nanmax(np.abs(a - b)) / max(scale, 1e-12)) if np.any(~np.isnan(b)) else 0.0
+
+    columns = [c for c in FEATURE_COLUMNS if c != "atr_percentile"]
+    last = streamed[columns].iloc[-1].to_numpy()
+    batch_last = batch[columns].iloc[-1].to_numpy()
+    last_ok = np.allclose(last, batch_last, rtol=RTOL, atol=0, equal_nan=True)
+
+    return {
+        "diffs": diffs,
+        "last_row_ok": bool(last_ok),
+        "us_per_bar": elapsed / len(df) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE streaming features")
+    sub = parser.add_subparsers(dest="command", required=True)
+    check = sub.add_parser("check", help="compare with build_features")
+    check.add_argument("--tickers", nargs="+", help="default: TICKERS")
+    args = parser.parse_args()
+
+    print("\n=== STREAMING FEATURE PARITY ===\n")
+
+    failed = False
+    for ticker in args.tickers or TICKERS:
+        try:
+            df = read_dataset("clean", ticker)
+        except FileNotFoundError as e:
+            print(f"{ticker:<6} skipped → {e}")
+            continue
+
+        result = compare(df)
+        worst_col = max(result["diffs"], key=result["diffs"].get)
+        worst = result["diffs"][worst_col]
+        ok = worst <= RTOL and result["last_row_ok"]
+        failed |= not ok
+
+        print(
+            f"{ticker:<6} {'OK  ' if ok else 'FAIL'} "
+            f"max rel diff {worst:.2e} ({worst_col})  "
+            f"{result['us_per_bar']:6.1f} µs/bar"
+        )
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,8 @@ from pathlib import Path
 import pandas as pd
 
 from src.config.tickers import TICKERS
+from src.utils.artifact_cache import artifact_cache, stage_key
+from src.utils.storage import write_dataset, write_path
 
 
 RAW_DIR = Path("data/raw")
@@ -64,16 +66,37 @@ def clean_stock(ticker: str):
     return df
 
 
+def clean_ticker(ticker: str):
+    """
+    Clean and store one ticker. Returns (output path, clean frame);
+    the frame is None when the cached output was reused.
+    """
+    out_path = write_path("clean", ticker)
+
+    key, lineage = stage_key(
+        "clean", [RAW_DIR / f"{ticker}.csv"], [out_path], code=[__file__]
+    )
+    if artifact_cache.restore(key, [out_path]):
+        return out_path, None
+
+    df_clean = clean_stock(ticker)
+    write_dataset(df_clean, "clean", ticker)
+
+    artifact_cache.store(key, [out_path], lineage)
+    return out_path, df_clean
+
+
 def main():
     print("Starting data cleaning...\n")
 
     for ticker in TICKERS:
         print(f"Cleaning {ticker}...")
 
-        df_clean = clean_stock(ticker)
+        output_path, df_clean = clean_ticker(ticker)
 
-        output_path = PROCESSED_DIR / f"{ticker}_clean.csv"
-        df_clean.to_csv(output_path)
+        if df_clean is None:
+            print(f"Unchanged (cached) → {output_path}\n")
+            continue
 
         print(f"Saved → {output_path}")
         print(f"Rows: {len(df_clean)}\n")
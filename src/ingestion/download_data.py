@@ -40,13 +40,38 @@ def download_stock_data(ticker: str):
     return df
 
 
-def save_to_csv(df, ticker: str):
+def save_to_csv(df, ticker: str) -> bool:
     """
     Save dataframe to CSV in raw data directory.
+    An identical existing file is left untouched (keeps its mtime, so
+    the pipeline runner can skip downstream stages).
+    Returns True if the file was written.
     """
     file_path = RAW_DATA_DIR / f"{ticker}.csv"
-    df.to_csv(file_path)
+    content = df.to_csv().encode()
+
+    if file_path.exists() and file_path.read_bytes() == content:
+        print(f"Unchanged {ticker} → {file_path}")
+        return False
+
+    file_path.write_bytes(content)
     print(f"Saved {ticker} → {file_path}")
+    return True
+
+
+def download_ticker(ticker: str):
+    """
+    Download and save one ticker. Returns the raw file path,
+    or None when no data was returned.
+    """
+    df = download_stock_data(ticker)
+
+    if df.empty:
+        print(f"⚠️  Warning: No data returned for {ticker}")
+        return None
+
+    save_to_csv(df, ticker)
+    return RAW_DATA_DIR / f"{ticker}.csv"
 
 
 # =====================
@@ -58,13 +83,7 @@ def main():
 
     for ticker in TICKERS:
         print(f"Downloading {ticker}...")
-        df = download_stock_data(ticker)
-
-        if df.empty:
-            print(f"⚠️  Warning: No data returned for {ticker}\n")
-            continue
-
-        save_to_csv(df, ticker)
+        download_ticker(ticker)
         print()
 
     print("Data download completed.")
@@ -3,7 +3,13 @@ import pandas as pd
 import numpy as np
 
 from src.config.tickers import TICKERS
-from src.config.settings import PREDICTION_HORIZON
+from src.config.settings import (
+    PREDICTION_HORIZON,
+    BULLISH_THRESHOLD,
+    BEARISH_THRESHOLD,
+)
+from src.utils.artifact_cache import artifact_cache, stage_key
+from src.utils.storage import dataset_path, read_dataset, write_dataset, write_path
 
 
 PROCESSED_DIR = Path("data/processed")
@@ -11,6 +17,17 @@ FEATURE_DIR = Path("data/processed/features")
 LABEL_DIR = Path("data/processed/labels")
 LABEL_DIR.mkdir(parents=True, exist_ok=True)
 
+# |risk-adjusted return| needed for a Bullish / Bearish label
+RISK_ADJ_THRESHOLD = 0.75
+
+# Settings a label file depends on (part of its cache key)
+LABEL_CONFIG = {
+    "PREDICTION_HORIZON": PREDICTION_HORIZON,
+    "BULLISH_THRESHOLD": BULLISH_THRESHOLD,
+    "BEARISH_THRESHOLD": BEARISH_THRESHOLD,
+    "RISK_ADJ_THRESHOLD": RISK_ADJ_THRESHOLD,
+}
+
 
 def build_labels(df: pd.DataFrame) -> pd.DataFrame:
     labels = pd.DataFrame(index=df.index)
@@ -25,40 +42,62 @@ def build_labels(df: pd.DataFrame) -> pd.DataFrame:
 
     # Label assignment
     labels["label"] = 0
-    labels.loc[risk_adj_ret >= 0.75, "label"] = 1
-    labels.loc[risk_adj_ret <= -0.75, "label"] = -1
+    labels.loc[risk_adj_ret >= RISK_ADJ_THRESHOLD, "label"] = 1
+    labels.loc[risk_adj_ret <= -RISK_ADJ_THRESHOLD, "label"] = -1
+
+    # -1 / 0 / +1 fit in a byte
+    labels["label"] = labels["label"].astype(np.int8)
 
     return labels
 
 
+def label_ticker(ticker: str):
+    """
+    Build and store trend labels for one ticker.
+    Returns (output path, label frame); the frame is None when the
+    cached output was reused.
+    """
+    out_path = write_path("labels", ticker)
+
+    key, lineage = stage_key(
+        "labels",
+        [dataset_path("clean", ticker), dataset_path("features", ticker)],
+        [out_path],
+        config=LABEL_CONFIG,
+        code=[__file__]
+    )
+    if artifact_cache.restore(key, [out_path]):
+        return out_path, None
+
+    # Load clean price data (for future returns)
+    price_df = read_dataset("clean", ticker)
+
+    # Load feature data (for volatility)
+    feature_df = read_dataset("features", ticker, columns=["vol_10d"])
+
+    # Align indices (safety)
+    df = price_df.join(feature_df[["vol_10d"]], how="inner")
+
+    labels = build_labels(df)
+    labels = labels.dropna()
+
+    write_dataset(labels, "labels", ticker)
+
+    artifact_cache.store(key, [out_path], lineage)
+    return out_path, labels
+
+
 def main():
     print("Building labels...\n")
 
     for ticker in TICKERS:
         print(f"Processing {ticker}...")
 
-        # Load clean price data (for future returns)
-        price_df = pd.read_csv(
-            PROCESSED_DIR / f"{ticker}_clean.csv",
-            index_col=0,
-            parse_dates=True
-        )
-
-        # Load feature data (for volatility)
-        feature_df = pd.read_csv(
-            FEATURE_DIR / f"{ticker}_features.csv",
-            index_col=0,
-            parse_dates=True
-        )
-
-        # Align indices (safety)
-        df = price_df.join(feature_df[["vol_10d"]], how="inner")
-
-        labels = build_labels(df)
-        labels = labels.dropna()
+        out_path, labels = label_ticker(ticker)
 
-        out_path = LABEL_DIR / f"{ticker}_labels.csv"
-        labels.to_csv(out_path)
+        if labels is None:
+            print(f"Unchanged (cached) → {out_path}\n")
+            continue
 
         print(f"Saved → {out_path}")
         print(labels["label"].value_counts(normalize=True), "\n")
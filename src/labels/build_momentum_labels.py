@@ -11,6 +11,8 @@ import pandas as pd
 import numpy as np
 
 from src.config.tickers import TICKERS
+from src.utils.artifact_cache import artifact_cache, stage_key
+from src.utils.storage import dataset_path, read_dataset, write_dataset, write_path
 
 PROCESSED_DIR = Path("data/processed")
 LABEL_DIR = Path("data/processed/momentum_labels")
@@ -32,27 +34,48 @@ def build_momentum_labels(df: pd.DataFrame) -> pd.Series:
     labels = pd.Series(labels, index=df.index, name="momentum_label")
 
     # Drop NaNs caused by horizon shift or zero returns
-    labels = labels.dropna()
+    labels = labels.dropna().astype(np.int8)
 
     return labels
 
 
+def label_ticker(ticker: str):
+    """
+    Build and store momentum labels for one ticker.
+    Returns (output path, label series); the series is None when the
+    cached output was reused.
+    """
+    out_path = write_path("momentum_labels", ticker)
+
+    key, lineage = stage_key(
+        "momentum_labels", [dataset_path("clean", ticker)], [out_path],
+        config={"HORIZON": HORIZON},
+        code=[__file__]
+    )
+    if artifact_cache.restore(key, [out_path]):
+        return out_path, None
+
+    df = read_dataset("clean", ticker, columns=["adj_close"])
+
+    labels = build_momentum_labels(df)
+
+    write_dataset(labels, "momentum_labels", ticker)
+
+    artifact_cache.store(key, [out_path], lineage)
+    return out_path, labels
+
+
 def main():
     print("Building momentum labels (7-day horizon)...\n")
 
     for ticker in TICKERS:
         print(f"Processing {ticker}...")
 
-        df = pd.read_csv(
-            PROCESSED_DIR / f"{ticker}_clean.csv",
-            index_col=0,
-            parse_dates=True
-        )
-
-        labels = build_momentum_labels(df)
+        out_path, labels = label_ticker(ticker)
 
-        out_path = LABEL_DIR / f"{ticker}_momentum_labels.csv"
-        labels.to_csv(out_path)
+        if labels is None:
+            print(f"Unchanged (cached) → {out_path}\n")
+            continue
 
         print(f"Saved → {out_path}")
         print(labels.value_counts(normalize=True).rename("proportion"), "\n")
@@ -7,6 +7,8 @@ from sklearn.calibration import CalibratedClassifierCV
 from sklearn.metrics import brier_score_loss
 
 from src.config.tickers import TICKERS
+from src.features.build_features import build_columns
+from src.utils.storage import read_dataset
 
 # -----------------------------
 # Paths
@@ -39,15 +41,9 @@ MOMENTUM_FEATURES = [
 # Data loading & alignment
 # -----------------------------
 def load_data(ticker: str) -> pd.DataFrame:
-    X = pd.read_csv(
-        FEATURE_DIR / f"{ticker}_features.csv",
-        index_col=0
-    )
-
-    y = pd.read_csv(
-        LABEL_DIR / f"{ticker}_momentum_labels.csv",
-        index_col=0
-    )["momentum_label"]
+    X = build_columns(ticker, MOMENTUM_FEATURES)
+
+    y = read_dataset("momentum_labels", ticker)["momentum_label"]
 
     # Force clean datetime index
     X.index = pd.to_datetime(X.index, errors="coerce")
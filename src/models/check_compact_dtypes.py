@@ -0,0 +1,252 @@
+"""
+PTRE - Compact Dtype Check
+
+Evidence for COMPACT_DTYPES (float32 features and model inputs, int8
+labels) before switching it on.
+
+- parity: every ticker's full signal history scored by the served
+  models the way serving feeds them (generate_final_signal.input_dtype:
+  the precision each model was trained at) against float64 inputs.
+  That check must show no change. Reported alongside, not checked:
+  the same models fed float32 (why models are only fed float32 when
+  they were trained on it), and with --retrain, refits from float64
+  and from float32 features (same splits and parameters as
+  save_calibrated_models, nothing is saved), each scored at its own
+  precision, i.e. the whole compact path against the float64 one
+- memory: bytes of the feature datasets, labels, panel and serving
+  feature store in float64 vs compact dtypes
+
+float32 rounding moves some inputs across split thresholds learned on
+float64, and merges a few nearly equal values (e.g. dmi_spread), which
+moves some histogram bin edges of a float32 refit.
+
+Run:
+  python -m src.models.check_compact_dtypes parity [--retrain] [--tickers ...]
+  python -m src.models.check_compact_dtypes memory [--tickers ...]
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from src.config.tickers import TICKERS
+from src.features.build_panel import LABELS
+from src.models.generate_final_signal import (
+    SIGNAL_NAMES,
+    apply_soft_gating,
+    predict_direction,
+)
+from src.models.model_registry import registry
+from src.utils.storage import read_dataset
+
+KINDS = ("trend", "momentum")
+
+MB = 1024 ** 2
+
+
+# =====================
+# Parity
+# =====================
+
+def score(models: dict, X: pd.DataFrame, dtype) -> pd.DataFrame:
+    """
+    Signal, directions and confidence of every row of X, as
+    replay_signals computes them, with X fed to the models as dtype
+    (None: each model's input_dtype, as in serving).
+    """
+    trend_dir, trend_conf = predict_direction(models["trend"], X, dtype)
+    mom_dir, mom_conf = predict_direction(models["momentum"], X, dtype)
+
+    final_conf, _ = apply_soft_gating(trend_dir, trend_conf, mom_dir, mom_conf)
+
+    return pd.DataFrame(
+        {
+            "signal": [SIGNAL_NAMES[int(d)] for d in trend_dir],
+            "confidence": final_conf,
+            "trend_direction": trend_dir.astype(np.int8),
+            "momentum_direction": mom_dir.astype(np.int8),
+        },
+        index=X.index
+    )
+
+
+def retrain(ticker: str, float32: bool) -> dict:
+    """
+    {kind: model} fit like save_calibrated_models.train_model, from
+    features read as float32 or float64.
+    """
+    from src.models.save_calibrated_models import (
+        CALIB_END,
+        MODEL_SPECS,
+        TRAIN_END,
+        train_and_calibrate,
+    )
+
+    X = read_dataset("features", ticker, float32=float32)
+
+    models = {}
+    for kind in KINDS:
+        _, label_dataset, label_col = MODEL_SPECS[kind]
+        y = read_dataset(label_dataset, ticker, columns=[label_col])
+
+        df = X.join(y, how="inner").dropna()
+
+        train_end = int(len(df) * TRAIN_END)
+        calib_end = int(len(df) * CALIB_END)
+        train = df.iloc[:train_end]
+        calib = df.iloc[train_end:calib_end]
+
+        models[kind] = train_and_calibrate(
+            train.drop(columns=label_col), train[label_col],
+            calib.drop(columns=label_col), calib[label_col]
+        )
+
+    return models
+
+
+def compare(base: pd.DataFrame, compact: pd.DataFrame) -> dict:
+    return {
+        "rows": len(base),
+        "signal_changes": int((base["signal"] != compact["signal"]).sum()),
+        "direction_changes": int(
+            (base["trend_direction"] != compact["trend_direction"]).sum() +
+            (base["momentum_direction"] != compact["momentum_direction"]).sum()
+        ),
+        "max_conf_diff": float(np.max(
+            np.abs(base["confidence"].to_numpy() - compact["confidence"].to_numpy()),
+            initial=0.0
+        )),
+    }
+
+
+def parity(tickers, with_retrain: bool = False) -> bool:
+    passed = True
+
+    for ticker in tickers:
+        X = read_dataset("features", ticker, float32=False)
+        served = {kind: registry.get(ticker, kind) for kind in KINDS}
+
+        base = score(served, X, np.float64)
+        checks = {
+            "served": (base, score(served, X, None)),
+            "float32": (base, score(served, X, np.float32)),
+        }
+
+        if with_retrain:
+            checks["retrained"] = (
+                score(retrain(ticker, float32=False), X, np.float64),
+                score(retrain(ticker, float32=True), X, np.float32),
+            )
+
+        for name, (base, compact) in checks.items():
+            report = compare(base, compact)
+
+            status = "info"
+            if name == "served":
+                ok = report["signal_changes"] == 0 and report["direction_changes"] == 0
+                passed &= ok
+                status = "OK" if ok else "FAIL"
+
+            print(
+                f"{ticker:<6} {name:<10} {status:<5}"
+                f"{report['rows']:>6} rows  "
+                f"signal changes {report['signal_changes']:>3}  "
+                f"direction changes {report['direction_changes']:>3}  "
+                f"max conf diff {report['max_conf_diff']:.2e}"
+            )
+
+    return passed
+
+
+# =====================
+# Memory
+# =====================
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory(tickers) -> dict:
+    """
+    {item: (float64 bytes, compact bytes)}.
+    """
+    report = {
+        "feature frames": [0, 0],
+        "labels": [0, 0],
+        "panel": [0, 0],
+        "serving block": [0, 0],
+        "feature store rows": [0, 0],
+    }
+
+    for ticker in tickers:
+        features = read_dataset("features", ticker, float32=False)
+        compact = features.astype(np.float32)
+
+        n_rows, n_cols = features.shape
+
+        report["feature frames"][0] += _frame_bytes(features)
+        report["feature frames"][1] += _frame_bytes(compact)
+
+        # Labels were int64 (trend) / float64 (momentum) columns before
+        for dataset, col in LABELS.values():
+            n_labels = len(read_dataset(dataset, ticker, columns=[col]))
+            report["labels"][0] += n_labels * 8
+            report["labels"][1] += n_labels * np.dtype(np.int8).itemsize
+
+        # build_panel arrays: features + dates, ticker ids, int8 labels
+        # and bool masks per label kind
+        per_row = 8 + 2 + len(LABELS) * 2
+        for i, itemsize in enumerate((8, 4)):
+            report["panel"][i] += n_rows * (n_cols * itemsize + per_row)
+            report["serving block"][i] += n_cols * itemsize
+
+        report["feature store rows"][0] += _frame_bytes(features.iloc[[-1]])
+        report["feature store rows"][1] += _frame_bytes(compact.iloc[[-1]])
+
+    return {item: tuple(sizes) for item, sizes in report.items()}
+
+
+def print_memory(report: dict):
+    print(f"{'':<20}{'float64':>12}{'compact':>12}{'saved':>9}")
+
+    for item, (before, after) in report.items():
+        saved = 1 - after / before if before else 0.0
+
+        if before >= MB:
+            sizes = f"{before / MB:>9.2f} MB{after / MB:>9.2f} MB"
+        else:
+            sizes = f"{before / 1024:>9.2f} KB{after / 1024:>9.2f} KB"
+
+        print(f"{item:<20}{sizes}{saved:>9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact dtype parity / memory check")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    par = sub.add_parser("parity", help="signals as served vs float64 inputs")
+    par.add_argument("--retrain", action="store_true",
+                     help="also refit both models on float32 features")
+    par.add_argument("--tickers", nargs="*", default=None)
+
+    mem = sub.add_parser("memory", help="float64 vs compact memory footprint")
+    mem.add_argument("--tickers", nargs="*", default=None)
+
+    args = parser.parse_args()
+    tickers = [t.upper() for t in (args.tickers or TICKERS)]
+
+    if args.command == "parity":
+        print("Checking compact dtype signal parity...\n")
+
+        if not parity(tickers, with_retrain=args.retrain):
+            raise SystemExit("\nCompact dtype parity check failed.")
+
+        print("\nCompact dtype parity check passed.")
+    else:
+        print("Compact dtype memory report\n")
+        print_memory(memory(tickers))
+
+
+if __name__ == "__main__":
+    main()
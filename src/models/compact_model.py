@@ -0,0 +1,336 @@
+"""
+PTRE - Compact Models
+
+Array-backed form of the calibrated models for serving, evaluated with
+NumPy only (no scikit-learn import, no unpickling).
+
+- Every HistGradientBoosting ensemble becomes flat node arrays
+  (feature, threshold, children, missing direction, leaf value,
+  categorical bitsets) plus its baseline
+- Every isotonic calibrator becomes its interpolation table
+- One file per model (.ptm): a JSON header followed by 64-byte aligned
+  arrays, opened with np.memmap so processes serving the same file
+  share its pages
+- Evaluation repeats scikit-learn's arithmetic step by step (sequential
+  leaf sums, np.interp for the isotonic maps, the one-vs-rest
+  normalization and the ensemble mean), so probabilities are
+  bit-identical
+
+Files are written by src.models.export_compact_models.
+"""
+
+from pathlib import Path
+import json
+import os
+
+import numpy as np
+
+MAGIC = b"PTRECM1\n"
+
+ALIGN = 64
+
+# Matches sklearn: probabilities within 1e-5 above 1.0 are set to 1.0
+PROBA_CLIP = 1e-5
+
+
+# =====================
+# File format
+# =====================
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+
+def write_compact(path: Path, meta: dict, arrays: dict) -> Path:
+    """
+    Write meta (JSON) and arrays to path, replacing it atomically.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    arrays = {name: np.ascontiguousarray(a) for name, a in arrays.items()}
+
+    # Offsets are relative to the end of the header block
+    layout, offset = {}, 0
+    for name, a in arrays.items():
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+        offset += a.nbytes + _pad(a.nbytes)
+
+    header = json.dumps({"meta": meta, "arrays": layout}).encode()
+    header += b" " * _pad(len(MAGIC) + 8 + len(header))
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for a in arrays.values():
+            f.write(a.tobytes())
+            f.write(b"\0" * _pad(a.nbytes))
+    os.replace(tmp, path)
+
+    return path
+
+
+def read_compact(path: Path):
+    """
+    (meta, {name: read-only array view of the mapped file}).
+    """
+    path = Path(path)
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a compact model file")
+        header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_len))
+
+    start = len(MAGIC) + 8 + header_len
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        begin = start + spec["offset"]
+        arrays[name] = (
+            data[begin:begin + count * dtype.itemsize]
+            .view(dtype)
+            .reshape(spec["shape"])
+        )
+
+    return header["meta"], arrays
+
+
+# =====================
+# Evaluation
+# =====================
+
+class _Forest:
+    """
+    One HistGradientBoosting ensemble. Child indices are absolute, and
+    leaves point to themselves, so every tree is walked in lockstep for
+    a fixed number of steps.
+    """
+
+    def __init__(self, meta: dict, arrays: dict, prefix: str):
+        a = {k[len(prefix):]: v for k, v in arrays.items() if k.startswith(prefix)}
+
+        self.n_per_iteration = meta["n_trees_per_iteration"]
+        self.depth = meta["depth"]
+        self.has_categorical = meta["has_categorical"]
+
+        self.baseline = a["baseline"]
+        self.roots = a["roots"]
+        self.feature = a["feature"]
+        self.threshold = a["threshold"]
+        self.left = a["left"]
+        self.right = a["right"]
+        self.missing_left = a["missing_left"]
+        self.value = a["value"]
+
+        # Present when the model had a categorical (OrdinalEncoder) input
+        self.column_order = a.get("column_order")
+        self.categories = [
+            a[f"categories{j}"] for j in range(meta.get("n_categorical", 0))
+        ]
+
+        if self.has_categorical:
+            self.categorical = a["categorical"]
+            self.bitset = a["bitset"]
+            self.left_bitsets = a["left_bitsets"]
+            self.known_bitsets = a["known_bitsets"]
+            self.f_idx_map = a["f_idx_map"]
+
+    def _preprocess(self, X):
+        # sklearn's ColumnTransformer: ordinal-encoded categoricals first
+        # (unknown values -> NaN), then the numerical columns
+        if self.column_order is None:
+            return X
+
+        X = X[:, self.column_order]
+        for j, categories in enumerate(self.categories):
+            values = X[:, j]
+            codes = np.searchsorted(categories, values).clip(0, len(categories) - 1)
+            known = categories[codes] == values
+            X[:, j] = np.where(known, codes, np.nan)
+
+        return X
+
+    def _in_bitset(self, bitsets, rows, values):
+        values = values.astype(np.uint8)
+        words = bitsets[rows, values // 32]
+        return ((words >> (values % 32)) & 1).astype(bool)
+
+    def raw_predict(self, X) -> np.ndarray:
+        """
+        (n_samples, n_trees_per_iteration) sum of leaf values.
+        """
+        X = self._preprocess(X)
+        n = len(X)
+
+        node = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        rows = np.arange(n)[:, None]
+
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            missing = np.isnan(x)
+
+            go_left = x <= self.threshold[node]
+
+            if self.has_categorical:
+                categorical = self.categorical[node] & ~missing
+                if categorical.any():
+                    cat_nodes = node[categorical]
+                    values = x[categorical]
+
+                    # Negative or unknown categories are treated as missing
+                    valid = values >= 0
+                    in_left = np.zeros_like(valid)
+                    known = np.zeros_like(valid)
+
+                    in_left[valid] = self._in_bitset(
+                        self.left_bitsets, self.bitset[cat_nodes[valid]], values[valid]
+                    )
+                    known[valid] = self._in_bitset(
+                        self.known_bitsets,
+                        self.f_idx_map[self.feature[cat_nodes[valid]]],
+                        values[valid]
+                    )
+
+                    go_left[categorical] = np.where(
+                        in_left, True,
+                        np.where(known, False, self.missing_left[cat_nodes])
+                    )
+
+            go_left = np.where(missing, self.missing_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+
+        leaves = self.value[node]
+
+        # Same order and association as sklearn's raw += tree, tree by
+        # tree: a cumulative sum is strictly sequential
+        raw = np.empty((n, self.n_per_iteration))
+        for k in range(self.n_per_iteration):
+            terms = np.hstack([
+                np.full((n, 1), self.baseline[k]),
+                leaves[:, k::self.n_per_iteration],
+            ])
+            raw[:, k] = np.cumsum(terms, axis=1)[:, -1]
+
+        return raw
+
+
+def _isotonic(x_table, y_table, x_min, x_max, T):
+    """
+    IsotonicRegression(out_of_bounds="clip").predict. For float64
+    tables scipy's interp1d delegates to np.interp, so this does too.
+    """
+    if len(y_table) == 1:
+        return np.repeat(y_table, T.shape)
+
+    return np.interp(np.clip(T, x_min, x_max), x_table, y_table)
+
+
+class CompactModel:
+    """
+    Drop-in for a calibrated model at serving time: classes_ and
+    predict_proba. For a pooled file, for_ticker() selects a ticker's
+    calibrators over the shared forest.
+    """
+
+    def __init__(self, meta: dict, arrays: dict, group: str = None, path=None):
+        self.meta = meta
+        self.path = path
+        self.classes_ = arrays["classes"]
+        self.feature_names_in_ = meta.get("feature_names")
+        self.feature_dtype_ = meta.get("feature_dtype", "float64")
+
+        self._arrays = arrays
+        self._forests = [
+            _Forest(forest, arrays, f"f{i}.")
+            for i, forest in enumerate(meta["forests"])
+        ]
+
+        groups = meta["groups"]
+        if group is None and len(groups) == 1:
+            group = next(iter(groups))
+        self.group = group
+        self._members = None if group is None else [
+            meta["members"][i] for i in groups[group]
+        ]
+
+    @classmethod
+    def load(cls, path: Path):
+        meta, arrays = read_compact(path)
+        return cls(meta, arrays, path=Path(path))
+
+    @property
+    def tickers(self):
+        return list(self.meta["groups"])
+
+    def for_ticker(self, ticker: str):
+        if ticker not in self.meta["groups"]:
+            raise FileNotFoundError(f"{ticker} is not in the pooled model")
+        return CompactModel(self.meta, self._arrays, ticker, self.path)
+
+    def _as_array(self, X) -> np.ndarray:
+        if hasattr(X, "columns") and self.feature_names_in_ is not None:
+            X = X[self.feature_names_in_]
+        return np.asarray(X, dtype=np.float64)
+
+    def _member_proba(self, member: dict, raw_cache: dict, X) -> np.ndarray:
+        forest = member["forest"]
+        extra = member["extra"]
+
+        key = (forest, extra)
+        if key not in raw_cache:
+            X_in = X
+            if extra is not None:
+                X_in = np.hstack([X, np.full((len(X), 1), extra)])
+            raw_cache[key] = self._forests[forest].raw_predict(X_in)
+
+        predictions = raw_cache[key]
+        n_classes = len(self.classes_)
+
+        proba = np.zeros((len(X), n_classes))
+
+        for j, (class_idx, calibrator) in enumerate(
+                zip(member["class_indices"], member["calibrators"])):
+            if n_classes == 2:
+                class_idx += 1
+            proba[:, class_idx] = _isotonic(
+                self._arrays[f"{calibrator['name']}.x"],
+                self._arrays[f"{calibrator['name']}.y"],
+                calibrator["x_min"],
+                calibrator["x_max"],
+                predictions[:, j]
+            )
+
+        if n_classes == 2:
+            proba[:, 0] = 1.0 - proba[:, 1]
+        else:
+            denominator = np.sum(proba, axis=1)[:, np.newaxis]
+            uniform = np.full_like(proba, 1 / n_classes)
+            proba = np.divide(proba, denominator, out=uniform, where=denominator != 0)
+
+        proba[(1.0 < proba) & (proba <= 1.0 + PROBA_CLIP)] = 1.0
+
+        return proba
+
+    def predict_proba(self, X) -> np.ndarray:
+        if self._members is None:
+            raise ValueError("Pooled model: select a ticker with for_ticker()")
+
+        X = self._as_array(X)
+
+        mean_proba = np.zeros((len(X), len(self.classes_)))
+        raw_cache = {}
+        for member in self._members:
+            mean_proba += self._member_proba(member, raw_cache, X)
+
+        mean_proba /= len(self._members)
+
+        return mean_proba
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,166 @@
+"""
+PTRE - Pooled vs Per-Ticker Benchmark
+
+Trains both model layouts on the same panel splits and compares them
+on each ticker's held-out rows (the last 15%).
+
+- Training: wall time for all per-ticker models vs one pooled model
+- Size: serialized bytes (≈ serving memory) of all models of a kind
+- Quality: accuracy and top-label ECE (10 bins) per ticker, averaged
+
+Needs the panel dataset (python -m src.features.build_panel).
+
+Run: python -m src.models.compare_pooled [--tickers ...] [--kinds ...]
+"""
+
+import argparse
+import pickle
+import time
+
+import numpy as np
+
+from src.features.build_panel import Panel
+from src.models.save_calibrated_models import (
+    CALIB_END,
+    MODEL_SPECS,
+    TRAIN_END,
+    fit_pooled,
+    train_and_calibrate,
+)
+
+ECE_BINS = 10
+
+
+# =====================
+# Metrics
+# =====================
+
+def top_label_ece(probs, classes, y, n_bins=ECE_BINS) -> float:
+    """
+    Weighted |accuracy - confidence| over equal-width confidence bins.
+    """
+    confidence = probs.max(axis=1)
+    correct = classes[probs.argmax(axis=1)] == y
+
+    bins = np.minimum((confidence * n_bins).astype(int), n_bins - 1)
+
+    ece = 0.0
+    for b in np.unique(bins):
+        mask = bins == b
+        ece += abs(correct[mask].mean() - confidence[mask].mean()) * mask.mean()
+
+    return float(ece)
+
+
+def evaluate(model, X, y) -> dict:
+    probs = model.predict_proba(X)
+    predicted = model.classes_[probs.argmax(axis=1)]
+
+    return {
+        "accuracy": float(np.mean(predicted == y)),
+        "ece": top_label_ece(probs, model.classes_, y),
+    }
+
+
+def _size(obj) -> int:
+    return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+# =====================
+# Benchmark
+# =====================
+
+def compare(kind: str, panel: Panel, tickers) -> dict:
+    splits = {t: panel.split(t, kind, (TRAIN_END, CALIB_END)) for t in tickers}
+
+    # Per-ticker layout
+    start = time.perf_counter()
+    per_ticker = {}
+    for ticker in tickers:
+        train, calib, _ = splits[ticker]
+        X_train, y_train = panel.take(train, kind)
+        X_calib, y_calib = panel.take(calib, kind)
+        per_ticker[ticker] = train_and_calibrate(
+            np.asarray(X_train), y_train.astype(np.int64),
+            np.asarray(X_calib), y_calib.astype(np.int64)
+        )
+    per_ticker_seconds = time.perf_counter() - start
+
+    # Pooled layout
+    start = time.perf_counter()
+    pooled = fit_pooled(kind, panel, tickers)
+    pooled_seconds = time.perf_counter() - start
+
+    rows = []
+    for ticker in tickers:
+        X_test, y_test = panel.take(splits[ticker][2], kind)
+        X_test, y_test = np.asarray(X_test), y_test.astype(np.int64)
+
+        rows.append({
+            "ticker": ticker,
+            "n_test": len(y_test),
+            "per_ticker": evaluate(per_ticker[ticker], X_test, y_test),
+            "pooled": evaluate(pooled.for_ticker(ticker), X_test, y_test),
+        })
+
+    return {
+        "kind": kind,
+        "train_seconds": {"per_ticker": per_ticker_seconds, "pooled": pooled_seconds},
+        "size_bytes": {
+            "per_ticker": sum(_size(m) for m in per_ticker.values()),
+            "pooled": _size(pooled),
+        },
+        "tickers": rows,
+    }
+
+
+def print_report(result: dict):
+    kind = result["kind"]
+    rows = result["tickers"]
+
+    print(f"\n=== {kind.upper()}: POOLED VS PER-TICKER ===\n")
+    print(f"{'ticker':<8} {'n':>5}  {'acc per':>8} {'acc pool':>9}  "
+          f"{'ece per':>8} {'ece pool':>9}")
+
+    for r in rows:
+        print(
+            f"{r['ticker']:<8} {r['n_test']:>5}  "
+            f"{r['per_ticker']['accuracy']:8.3f} {r['pooled']['accuracy']:9.3f}  "
+            f"{r['per_ticker']['ece']:8.3f} {r['pooled']['ece']:9.3f}"
+        )
+
+    def mean(layout, metric):
+        return np.mean([r[layout][metric] for r in rows])
+
+    print(
+        f"{'mean':<8} {'':>5}  "
+        f"{mean('per_ticker', 'accuracy'):8.3f} {mean('pooled', 'accuracy'):9.3f}  "
+        f"{mean('per_ticker', 'ece'):8.3f} {mean('pooled', 'ece'):9.3f}"
+    )
+
+    seconds = result["train_seconds"]
+    size = result["size_bytes"]
+
+    print(f"\nTraining time: {seconds['per_ticker']:.2f}s per-ticker, "
+          f"{seconds['pooled']:.2f}s pooled "
+          f"({seconds['per_ticker'] / seconds['pooled']:.1f}x)")
+    print(f"Model size:    {size['per_ticker'] / 2**20:.2f} MB per-ticker, "
+          f"{size['pooled'] / 2**20:.2f} MB pooled "
+          f"({size['per_ticker'] / size['pooled']:.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pooled vs per-ticker models")
+    parser.add_argument("--tickers", nargs="+", help="default: every panel ticker")
+    parser.add_argument("--kinds", nargs="+", choices=list(MODEL_SPECS))
+    args = parser.parse_args()
+
+    panel = Panel()
+    tickers = args.tickers or panel.tickers
+
+    for kind in args.kinds or MODEL_SPECS:
+        print_report(compare(kind, panel, tickers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+PTRE - Compact Model Export
+
+Compiles the saved calibrated models (pickles from
+save_calibrated_models) into compact .ptm files next to them, then
+checks that both give identical probabilities.
+
+- Per-ticker models: CalibratedClassifierCV over HistGradientBoosting
+  -> one forest + calibrators per CV member
+- Pooled models: the shared forest is stored once; each ticker gets
+  its calibrators and its id (the extra categorical column)
+- Parity: predict_proba of the pickle and of the compact file on the
+  ticker's full feature matrix must be exactly equal (np.array_equal);
+  any difference fails the export
+
+Serve them with MODEL_FORMAT = "compact".
+
+Run: python -m src.models.export_compact_models [--tickers ...] [--kinds ...]
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import time
+
+import joblib
+import numpy as np
+
+from src.config.tickers import TICKERS
+from src.models.compact_model import CompactModel, write_compact
+from src.models.model_registry import ModelRegistry, MODEL_KINDS
+from src.utils.storage import read_dataset
+
+
+# =====================
+# Compile
+# =====================
+
+def compact_path(pickle_path: Path) -> Path:
+    return Path(pickle_path).with_suffix(".ptm")
+
+
+def _compile_forest(hgb, prefix: str, arrays: dict) -> dict:
+    """
+    Flatten one fitted HistGradientBoostingClassifier into arrays.
+    """
+    K = hgb.n_trees_per_iteration_
+    trees = [p.nodes for iteration in hgb._predictors for p in iteration]
+    bitsets = [p.raw_left_cat_bitsets for iteration in hgb._predictors
+               for p in iteration]
+
+    sizes = np.array([len(t) for t in trees])
+    node_offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    bitset_offsets = np.concatenate([[0], np.cumsum([len(b) for b in bitsets])[:-1]])
+
+    nodes = np.concatenate(trees)
+    tree_of_node = np.repeat(np.arange(len(trees)), sizes)
+    absolute = node_offsets[tree_of_node]
+
+    is_leaf = nodes["is_leaf"].astype(bool)
+    own_index = np.arange(len(nodes))
+
+    # Leaves point to themselves so extra steps leave them in place
+    left = np.where(is_leaf, own_index, nodes["left"] + absolute)
+    right = np.where(is_leaf, own_index, nodes["right"] + absolute)
+
+    arrays.update({
+        f"{prefix}baseline": hgb._baseline_prediction.ravel().astype(np.float64),
+        f"{prefix}roots": node_offsets.astype(np.int64),
+        f"{prefix}feature": np.where(is_leaf, 0, nodes["feature_idx"]).astype(np.int32),
+        f"{prefix}threshold": nodes["num_threshold"].astype(np.float64),
+        f"{prefix}left": left.astype(np.int64),
+        f"{prefix}right": right.astype(np.int64),
+        f"{prefix}missing_left": nodes["missing_go_to_left"].astype(bool),
+        f"{prefix}value": nodes["value"].astype(np.float64),
+    })
+
+    meta = {
+        "n_trees_per_iteration": int(K),
+        "depth": int(nodes["depth"][is_leaf].max()),
+        "has_categorical": bool(nodes["is_categorical"].any()),
+    }
+
+    # Models with categorical inputs see them ordinal-encoded and moved
+    # to the front by an internal ColumnTransformer
+    if hgb._preprocessor is not None:
+        is_categorical = np.asarray(hgb.is_categorical_, dtype=bool)
+        categories = hgb._preprocessor.named_transformers_["encoder"].categories_
+
+        arrays[f"{prefix}column_order"] = np.concatenate([
+            np.flatnonzero(is_categorical), np.flatnonzero(~is_categorical)
+        ]).astype(np.int64)
+        for j, values in enumerate(categories):
+            arrays[f"{prefix}categories{j}"] = np.asarray(values, dtype=np.float64)
+
+        meta["n_categorical"] = len(categories)
+
+    if meta["has_categorical"]:
+        known_bitsets, f_idx_map = hgb._bin_mapper.make_known_categories_bitsets()
+
+        arrays.update({
+            f"{prefix}categorical": nodes["is_categorical"].astype(bool),
+            f"{prefix}bitset": (
+                nodes["bitset_idx"] + bitset_offsets[tree_of_node]
+            ).astype(np.int64),
+            f"{prefix}left_bitsets": np.concatenate(bitsets).astype(np.uint32),
+            f"{prefix}known_bitsets": np.asarray(known_bitsets, dtype=np.uint32),
+            f"{prefix}f_idx_map": np.asarray(f_idx_map, dtype=np.int64),
+        })
+
+    return meta
+
+
+def _unwrap(estimator):
+    """
+    (HistGradientBoosting model, extra column value or None) behind a
+    calibrated member's estimator.
+    """
+    extra = None
+
+    # FrozenEstimator (pooled calibration)
+    if hasattr(estimator, "estimator") and not hasattr(estimator, "_predictors"):
+        estimator = estimator.estimator
+
+    # TickerView: pooled model + constant ticker id column
+    if hasattr(estimator, "ticker_id"):
+        extra = float(estimator.ticker_id)
+        estimator = estimator.model
+
+    if not hasattr(estimator, "_predictors"):
+        raise TypeError(f"Cannot compile {type(estimator).__name__}")
+
+    return estimator, extra
+
+
+def compile_model(model) -> tuple:
+    """
+    (meta, arrays) of a CalibratedClassifierCV or PooledModel.
+    """
+    if hasattr(model, "calibrated"):
+        groups = model.calibrated
+        feature_names = list(model.columns)
+    else:
+        groups = {"model": model}
+        names = getattr(model, "feature_names_in_", None)
+        feature_names = None if names is None else list(names)
+
+    classes = next(iter(groups.values())).classes_
+
+    arrays = {"classes": np.asarray(classes)}
+    forests, forest_ids = [], {}
+    members, group_members = [], {}
+
+    for group, calibrated in groups.items():
+        if not np.array_equal(calibrated.classes_, classes):
+            raise ValueError(f"{group}: classes differ from the first group")
+
+        group_members[group] = []
+
+        for member in calibrated.calibrated_classifiers_:
+            if member.method != "isotonic":
+                raise ValueError(f"Unsupported calibration method: {member.method}")
+
+            hgb, extra = _unwrap(member.estimator)
+
+            if id(hgb) not in forest_ids:
+                forest_ids[id(hgb)] = len(forests)
+                forests.append(_compile_forest(hgb, f"f{len(forests)}.", arrays))
+
+            i = len(members)
+
+            calibrators = []
+            for j, iso in enumerate(member.calibrators):
+                if iso.out_of_bounds != "clip":
+                    raise ValueError("Isotonic calibrators must clip out of bounds")
+
+                name = f"m{i}.c{j}"
+                arrays[f"{name}.x"] = np.asarray(iso.X_thresholds_, dtype=np.float64)
+                arrays[f"{name}.y"] = np.asarray(iso.y_thresholds_, dtype=np.float64)
+                calibrators.append({
+                    "name": name,
+                    "x_min": float(iso.X_min_),
+                    "x_max": float(iso.X_max_),
+                })
+
+            # LabelEncoder(classes).transform(estimator classes)
+            class_indices = np.searchsorted(member.classes, hgb.classes_)
+
+            members.append({
+                "forest": forest_ids[id(hgb)],
+                "extra": extra,
+                "class_indices": [int(c) for c in class_indices[:len(calibrators)]],
+                "calibrators": calibrators,
+            })
+            group_members[group].append(i)
+
+    meta = {
+        "feature_names": feature_names,
+        "feature_dtype": getattr(
+            next(iter(groups.values())), "feature_dtype_", "float64"
+        ),
+        "forests": forests,
+        "members": members,
+        "groups": group_members,
+    }
+
+    return meta, arrays
+
+
+def export_model(pickle_path: Path):
+    """
+    Compile one pickle. Returns (compact path, sklearn model).
+    """
+    model = joblib.load(pickle_path)
+    meta, arrays = compile_model(model)
+    return write_compact(compact_path(pickle_path), meta, arrays), model
+
+
+# =====================
+# Parity
+# =====================
+
+def check_parity(model, compact: CompactModel, X) -> float:
+    """
+    Max |sklearn - compact| probability difference; raises unless the
+    two are bit-identical.
+    """
+    expected = model.predict_proba(X)
+    actual = compact.predict_proba(X)
+
+    diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+
+    if not np.array_equal(expected, actual):
+        raise AssertionError(f"compact probabilities differ (max {diff:.3g})")
+    if not np.array_equal(model.classes_, compact.classes_):
+        raise AssertionError("compact classes differ")
+
+    return diff
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, (time.perf_counter() - start) * 1000
+
+
+# =====================
+# Main
+# =====================
+
+def export_all(tickers=None, kinds=None) -> int:
+    """
+    Export + parity-check every saved model. Returns the failure count.
+    """
+    tickers = list(tickers or TICKERS)
+    kinds = list(kinds or MODEL_KINDS)
+
+    failures = 0
+
+    for layout in ("per_ticker", "pooled"):
+        registry = ModelRegistry(tickers, layout=layout, model_format="pickle")
+
+        for kind in kinds:
+            pickles = dict.fromkeys(registry.path_for(t, kind) for t in tickers)
+
+            for pickle_path in pickles:
+                if not pickle_path.exists():
+                    continue
+
+                try:
+                    path, model = export_model(pickle_path)
+                    compact, load_ms = _timed(CompactModel.load, path)
+                    _, pickle_ms = _timed(joblib.load, pickle_path)
+
+                    checked = compact.tickers if layout == "pooled" else [
+                        t for t in tickers if registry.path_for(t, kind) == pickle_path
+                    ]
+                    checked = [t for t in checked if t in tickers]
+
+                    diffs = []
+                    for ticker in checked:
+                        X = read_dataset("features", ticker)
+                        if layout == "pooled":
+                            diffs.append(check_parity(
+                                model.for_ticker(ticker), compact.for_ticker(ticker), X
+                            ))
+                        else:
+                            diffs.append(check_parity(model, compact, X))
+
+                except Exception as e:
+                    failures += 1
+                    print(f"{pickle_path.name:<24} FAILED → {e}")
+                    continue
+
+                print(
+                    f"{pickle_path.name:<24} "
+                    f"{pickle_path.stat().st_size / 2**20:7.2f} MB → "
+                    f"{path.stat().st_size / 2**20:6.2f} MB  "
+                    f"load {pickle_ms:7.2f} → {load_ms:5.2f} ms  "
+                    f"parity ok ({len(diffs)} tickers, max diff {max(diffs, default=0.0):.1g})"
+                )
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export compact models")
+    parser.add_argument("--tickers", nargs="+", help="default: TICKERS")
+    parser.add_argument("--kinds", nargs="+", choices=list(MODEL_KINDS))
+    args = parser.parse_args()
+
+    print("\n=== EXPORTING COMPACT MODELS ===\n")
+
+    failures = export_all(args.tickers, args.kinds)
+
+    if failures:
+        print(f"\n{failures} model(s) failed export or parity.")
+        sys.exit(1)
+
+    print("\n=== ALL COMPACT MODELS MATCH ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,17 @@
 from pathlib import Path
-import joblib
 import numpy as np
 import pandas as pd
 
 from src.config.tickers import TICKERS
+from src.features.feature_store import feature_store
+from src.models.model_registry import registry
+from src.utils.metrics import stage
+from src.utils.storage import read_dataset
 
 #ABSOLUTE PROJECT ROOT (CRITICAL FIX)
 BASE_DIR = Path(__file__).resolve().parents[2]
 
 FEATURE_DIR = BASE_DIR / "data" / "processed" / "features"
-TREND_MODEL_DIR = BASE_DIR / "src" / "models" / "trend"
-MOM_MODEL_DIR = BASE_DIR / "src" / "models" / "momentum"
 
 # -----------------------------
 # Soft-gating constants (LOCKED)
@@ -22,28 +23,21 @@ DISAGREE_PENALTY = 0.15
 MIN_CONF = 0.35
 MAX_CONF = 0.85
 
-
-def load_latest_features(ticker):
-    df = pd.read_csv(
-        FEATURE_DIR / f"{ticker}_features.csv",
-        index_col=0
-    )
-    return df.iloc[[-1]]  # latest row only
+SIGNAL_NAMES = {1: "Bullish", -1: "Bearish", 0: "Neutral"}
 
 
-def generate_signal(ticker):
+def load_latest_features(ticker):
+    # Latest row only, cached until the feature file is rewritten
+    return feature_store.latest(ticker)
 
-    # print("FEATURE DIR:", FEATURE_DIR)
-    # print("TREND MODEL PATH:", TREND_MODEL_DIR / f"{ticker}_trend.pkl")
-    # print("MOM MODEL PATH:", MOM_MODEL_DIR / f"{ticker}_momentum.pkl")
-    ticker = ticker.upper()
 
+def check_inputs(ticker):
     if ticker not in TICKERS:
         raise FileNotFoundError(f"Ticker {ticker} not supported.")
-    
-    feature_path = FEATURE_DIR / f"{ticker}_features.csv"
-    trend_path = TREND_MODEL_DIR / f"{ticker}_trend.pkl"
-    mom_path = MOM_MODEL_DIR / f"{ticker}_momentum.pkl"
+
+    feature_path = feature_store.path_for(ticker)
+    trend_path = registry.path_for(ticker, "trend")
+    mom_path = registry.path_for(ticker, "momentum")
 
     if not feature_path.exists():
         raise FileNotFoundError(f"Missing features for {ticker}")
@@ -53,67 +47,81 @@ def generate_signal(ticker):
 
     if not mom_path.exists():
         raise FileNotFoundError(f"Missing momentum model for {ticker}")
-    
-    X = load_latest_features(ticker)
 
 
-    # -----------------------------
-    # Load models
-    # -----------------------------
-    trend_model = joblib.load(TREND_MODEL_DIR / f"{ticker}_trend.pkl")
-    mom_model = joblib.load(MOM_MODEL_DIR / f"{ticker}_momentum.pkl")
+def data_version(ticker):
+    """
+    Versions of everything generate_signal reads for ticker:
+    (features, trend model, momentum model). Any change means a
+    different signal.
+    """
+    ticker = ticker.upper()
+    check_inputs(ticker)
 
-    # -----------------------------
-    # TREND inference
-    # -----------------------------
-    trend_probs = trend_model.predict_proba(X)[0]
-    trend_idx = np.argmax(trend_probs)
-    trend_conf = trend_probs[trend_idx]
+    # Both calls are cheap when nothing changed (a stat per file)
+    feature_store.latest(ticker)
+    registry.get(ticker, "trend")
+    registry.get(ticker, "momentum")
 
-    trend_classes = trend_model.classes_
-    trend_dir = trend_classes[trend_idx]  # -1, 0, +1
+    return (
+        feature_store.version(ticker),
+        registry.version(ticker, "trend"),
+        registry.version(ticker, "momentum"),
+    )
 
-    # -----------------------------
-    # MOMENTUM inference
-    # -----------------------------
-    mom_probs = mom_model.predict_proba(X)[0]
-    mom_idx = np.argmax(mom_probs)
-    mom_conf = mom_probs[mom_idx]
 
-    mom_classes = mom_model.classes_
-    mom_dir = mom_classes[mom_idx]  # -1, +1
+def input_dtype(model) -> np.dtype:
+    """
+    Precision model was trained at: feature_dtype_ as recorded by
+    save_calibrated_models (float32 for models trained on COMPACT_DTYPES
+    features), float64 for models that predate it. Feeding float32 to a
+    float64-trained model moves values across its split thresholds.
+    """
+    return np.dtype(getattr(model, "feature_dtype_", "float64"))
+
+
+def predict_direction(model, X, dtype=None):
+    """
+    Returns (direction, confidence) arrays, one entry per row of X.
+    X is fed to the model as dtype (default: input_dtype(model)).
+    """
+    dtype = input_dtype(model) if dtype is None else dtype
+    probs = model.predict_proba(X.astype(dtype, copy=False))
+    idx = np.argmax(probs, axis=1)
+
+    conf = probs[np.arange(len(idx)), idx]
+    direction = model.classes_[idx]  # trend: -1, 0, +1 / momentum: -1, +1
+
+    return direction, conf
+
+
+def apply_soft_gating(trend_dir, trend_conf, mom_dir, mom_conf):
+    """
+    Vectorized soft gating over arrays of model outputs.
+    Returns (final_conf, agreement) arrays.
+    """
+    trend_dir = np.asarray(trend_dir)
+    mom_dir = np.asarray(mom_dir)
 
-    # -----------------------------
-    # Soft gating
-    # -----------------------------
     raw_conf = (
-        BASE_WEIGHT * trend_conf +
-        MOM_WEIGHT * mom_conf
+        BASE_WEIGHT * np.asarray(trend_conf, dtype=float) +
+        MOM_WEIGHT * np.asarray(mom_conf, dtype=float)
     )
 
-    if trend_dir != 0 and mom_dir != trend_dir:
-        final_conf = raw_conf - DISAGREE_PENALTY
-        agreement = False
-    else:
-        final_conf = raw_conf
-        agreement = True
+    disagree = (trend_dir != 0) & (mom_dir != trend_dir)
 
-    final_conf = float(np.clip(final_conf, MIN_CONF, MAX_CONF))
+    final_conf = np.where(disagree, raw_conf - DISAGREE_PENALTY, raw_conf)
+    final_conf = np.clip(final_conf, MIN_CONF, MAX_CONF)
+
+    return final_conf, ~disagree
 
-    # -----------------------------
-    # Final signal
-    # -----------------------------
-    if trend_dir == 1:
-        signal = "Bullish"
-    elif trend_dir == -1:
-        signal = "Bearish"
-    else:
-        signal = "Neutral"
 
+def format_signal(ticker, final_conf, agreement,
+                  trend_dir, trend_conf, mom_dir, mom_conf):
     return {
     "ticker": ticker,
-    "signal": signal,
-    "confidence": round(final_conf * 100, 2),
+    "signal": SIGNAL_NAMES[int(trend_dir)],
+    "confidence": round(float(final_conf) * 100, 2),
     "components": {
         "trend": {
             "direction": int(trend_dir),
@@ -122,12 +130,152 @@ def generate_signal(ticker):
         "momentum": {
             "direction": int(mom_dir),
             "confidence": round(float(mom_conf), 3),
-            "agreement": agreement
+            "agreement": bool(agreement)
         }
     }
 }
 
 
+def generate_signal(ticker):
+    ticker = ticker.upper()
+
+    check_inputs(ticker)
+
+    with stage("features"):
+        X = load_latest_features(ticker)
+
+    # -----------------------------
+    # Models (shared, loaded once by the registry)
+    # -----------------------------
+    with stage("models"):
+        trend_model = registry.get(ticker, "trend")
+        mom_model = registry.get(ticker, "momentum")
+
+    # -----------------------------
+    # TREND / MOMENTUM inference
+    # -----------------------------
+    with stage("trend_predict"):
+        trend_dir, trend_conf = predict_direction(trend_model, X)
+    with stage("momentum_predict"):
+        mom_dir, mom_conf = predict_direction(mom_model, X)
+
+    # -----------------------------
+    # Soft gating
+    # -----------------------------
+    final_conf, agreement = apply_soft_gating(
+        trend_dir, trend_conf, mom_dir, mom_conf
+    )
+
+    return format_signal(
+        ticker, final_conf[0], agreement[0],
+        trend_dir[0], trend_conf[0], mom_dir[0], mom_conf[0]
+    )
+
+
+def _predict_grouped(tickers, models, rows):
+    """
+    One predict_proba call per distinct model object; tickers that share
+    a model are scored together. Returns {ticker: (direction, conf)}.
+    """
+    groups = {}
+    for ticker in tickers:
+        groups.setdefault(id(models[ticker]), []).append(ticker)
+
+    out = {}
+    for group in groups.values():
+        model = models[group[0]]
+        X = pd.concat([rows[t] for t in group])
+
+        direction, conf = predict_direction(model, X)
+
+        for i, ticker in enumerate(group):
+            out[ticker] = (direction[i], conf[i])
+
+    return out
+
+
+def generate_signals(tickers=None):
+    """
+    Score many tickers in one pass.
+    Returns ({ticker: signal}, {ticker: error message}).
+    """
+    tickers = [t.upper() for t in (tickers or TICKERS)]
+
+    rows, trend_models, mom_models = {}, {}, {}
+    errors = {}
+
+    for ticker in dict.fromkeys(tickers):
+        try:
+            check_inputs(ticker)
+            rows[ticker] = load_latest_features(ticker)
+            trend_models[ticker] = registry.get(ticker, "trend")
+            mom_models[ticker] = registry.get(ticker, "momentum")
+        except FileNotFoundError as e:
+            errors[ticker] = str(e)
+
+    ready = list(rows)
+    if not ready:
+        return {}, errors
+
+    trend = _predict_grouped(ready, trend_models, rows)
+    mom = _predict_grouped(ready, mom_models, rows)
+
+    trend_dir = np.array([trend[t][0] for t in ready])
+    trend_conf = np.array([trend[t][1] for t in ready])
+    mom_dir = np.array([mom[t][0] for t in ready])
+    mom_conf = np.array([mom[t][1] for t in ready])
+
+    final_conf, agreement = apply_soft_gating(
+        trend_dir, trend_conf, mom_dir, mom_conf
+    )
+
+    results = {
+        ticker: format_signal(
+            ticker, final_conf[i], agreement[i],
+            trend_dir[i], trend_conf[i], mom_dir[i], mom_conf[i]
+        )
+        for i, ticker in enumerate(ready)
+    }
+
+    return results, errors
+
+
+def replay_signals(ticker, X=None):
+    """
+    Signals for every row of ticker's feature matrix in one pass: one
+    predict_proba per model over all rows, then the same soft gating
+    as generate_signal, as array operations.
+    Returns a DataFrame indexed by date.
+    """
+    ticker = ticker.upper()
+
+    check_inputs(ticker)
+
+    if X is None:
+        X = read_dataset("features", ticker)
+
+    trend_dir, trend_conf = predict_direction(registry.get(ticker, "trend"), X)
+    mom_dir, mom_conf = predict_direction(registry.get(ticker, "momentum"), X)
+
+    final_conf, agreement = apply_soft_gating(
+        trend_dir, trend_conf, mom_dir, mom_conf
+    )
+
+    trend_dir = trend_dir.astype(np.int8)
+
+    return pd.DataFrame(
+        {
+            "signal": [SIGNAL_NAMES[int(d)] for d in trend_dir],
+            "confidence": final_conf,
+            "trend_direction": trend_dir,
+            "trend_confidence": trend_conf,
+            "momentum_direction": mom_dir.astype(np.int8),
+            "momentum_confidence": mom_conf,
+            "agreement": agreement,
+        },
+        index=X.index
+    )
+
 
 def main():
     print("\n=== FINAL PTRE SIGNALS ===\n")
@@ -0,0 +1,317 @@
+"""
+PTRE - Model Registry
+
+Keeps every ticker's calibrated trend and momentum models in memory so
+the serving path never unpickles a model per request.
+
+- Models are loaded once (at API startup or on first use)
+- Callers receive shared instances and must treat them as read-only
+- Changed pickles on disk are hot-swapped atomically
+- Load time and memory are recorded per model
+- With MODEL_LAYOUT = "pooled", each kind's pooled pickle is loaded
+  once and every ticker's entry points into it
+- With MODEL_FORMAT = "compact", the .ptm exports are served instead of
+  the pickles: memory-mapped (pages shared between worker processes)
+  and evaluated without scikit-learn
+- attach(snapshot) serves a published shared generation instead
+  (src.serving.shared_state): paths follow the generation pointer, so
+  every worker process swaps models when a new generation goes live
+"""
+
+from pathlib import Path
+import pickle
+import threading
+import time
+
+import joblib
+
+from src.config.settings import MODEL_FORMAT, MODEL_LAYOUT
+from src.config.tickers import TICKERS
+from src.utils.metrics import stage_metrics
+
+# ABSOLUTE PROJECT ROOT (same convention as generate_final_signal)
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+TREND_MODEL_DIR = BASE_DIR / "src" / "models" / "trend"
+MOM_MODEL_DIR = BASE_DIR / "src" / "models" / "momentum"
+POOLED_MODEL_DIR = BASE_DIR / "src" / "models" / "pooled"
+
+MODEL_KINDS = ("trend", "momentum")
+
+MODEL_SUFFIXES = {
+    "pickle": ".pkl",
+    "compact": ".ptm",
+}
+
+# Minimum seconds between two on-disk change checks of the same model
+RELOAD_CHECK_INTERVAL = 2.0
+
+
+def _file_version(path: Path):
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _measured_load(path: Path):
+    """
+    Load a model, returning (model, seconds, approx bytes in memory).
+
+    Memory of a pickle is estimated from the re-serialized size: the
+    models are almost entirely NumPy node arrays, so this tracks their
+    footprint without the heavy overhead of tracemalloc during startup.
+    A compact model is a mapping of its file, so its size is the file's.
+    """
+    start = time.perf_counter()
+
+    if path.suffix == MODEL_SUFFIXES["compact"]:
+        from src.models.compact_model import CompactModel
+
+        model = CompactModel.load(path)
+        elapsed = time.perf_counter() - start
+        stage_metrics.observe("model_load", elapsed)
+        return model, elapsed, path.stat().st_size
+
+    model = joblib.load(path)
+    elapsed = time.perf_counter() - start
+    stage_metrics.observe("model_load", elapsed)
+
+    memory = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+
+    return model, elapsed, memory
+
+
+class LoadedModel:
+    """
+    One immutable registry entry. Swapping a model replaces the whole
+    entry, so readers never observe a half-updated model.
+    """
+
+    __slots__ = (
+        "model", "path", "version", "load_seconds",
+        "memory_bytes", "loaded_at", "last_checked"
+    )
+
+    def __init__(self, model, path, version, load_seconds, memory_bytes):
+        self.model = model
+        self.path = path
+        self.version = version
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+        self.loaded_at = time.time()
+        self.last_checked = time.monotonic()
+
+
+class ModelRegistry:
+
+    def __init__(self, tickers=None, model_dirs=None, layout=MODEL_LAYOUT,
+                 model_format=MODEL_FORMAT):
+        if layout not in ("per_ticker", "pooled"):
+            raise ValueError(f"Unknown model layout: {layout}")
+        if model_format not in MODEL_SUFFIXES:
+            raise ValueError(f"Unknown model format: {model_format}")
+
+        self.tickers = list(tickers or TICKERS)
+        self.layout = layout
+        self.suffix = MODEL_SUFFIXES[model_format]
+        self.model_dirs = model_dirs or {
+            kind: POOLED_MODEL_DIR if layout == "pooled" else model_dir
+            for kind, model_dir in (("trend", TREND_MODEL_DIR),
+                                    ("momentum", MOM_MODEL_DIR))
+        }
+
+        self.snapshot = None
+
+        self._entries = {}
+        # kind -> (path, version, pooled model): one copy per kind
+        self._pooled = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    # ------------------------
+    # Paths
+    # ------------------------
+    def attach(self, snapshot):
+        """
+        Serve the models of snapshot's current generation (compact files,
+        mapped and shared with the other workers).
+        """
+        with self._lock:
+            self.snapshot = snapshot
+            self._entries.clear()
+            self._pooled.clear()
+        return self
+
+    def _layout(self) -> str:
+        if self.snapshot is not None:
+            return self.snapshot.current().layout
+        return self.layout
+
+    def path_for(self, ticker: str, kind: str) -> Path:
+        if kind not in self.model_dirs:
+            raise ValueError(f"Unknown model kind: {kind}")
+        if self.snapshot is not None:
+            return self.snapshot.current().model_path(ticker, kind)
+        if self.layout == "pooled":
+            return self.model_dirs[kind] / f"{kind}_pooled{self.suffix}"
+        return self.model_dirs[kind] / f"{ticker}_{kind}{self.suffix}"
+
+    # ------------------------
+    # Loading
+    # ------------------------
+    def _load(self, ticker: str, kind: str):
+        path = self.path_for(ticker, kind)
+        version = _file_version(path)
+
+        if self._layout() == "pooled":
+            model, seconds, memory = self._load_pooled(path, version, ticker, kind)
+        else:
+            model, seconds, memory = _measured_load(path)
+
+        entry = LoadedModel(model, path, version, seconds, memory)
+
+        # Single dict assignment -> atomic swap for concurrent readers
+        self._entries[(ticker, kind)] = entry
+        self._errors.pop((ticker, kind), None)
+
+        return entry
+
+    def _load_pooled(self, path: Path, version, ticker: str, kind: str):
+        """
+        Ticker's calibrated view of a pooled model. The file is read by
+        the first ticker that needs this version; later tickers share
+        it, so their load time and memory are recorded as 0.
+        """
+        shared = self._pooled.get(kind)
+
+        if shared is not None and shared[:2] == (path, version):
+            return shared[2].for_ticker(ticker), 0.0, 0
+
+        pooled, seconds, memory = _measured_load(path)
+        self._pooled[kind] = (path, version, pooled)
+
+        return pooled.for_ticker(ticker), seconds, memory
+
+    def load_all(self):
+        """
+        Load every (ticker, kind) model that exists on disk.
+        Missing or unreadable models are recorded, not raised.
+        """
+        with self._lock:
+            for ticker in self.tickers:
+                for kind in MODEL_KINDS:
+                    try:
+                        self._load(ticker, kind)
+                    except FileNotFoundError:
+                        self._errors[(ticker, kind)] = "missing"
+                    except Exception as e:
+                        self._errors[(ticker, kind)] = str(e)
+
+        return self
+
+    def refresh(self, ticker: str = None, kind: str = None, force: bool = False):
+        """
+        Reload models whose pickle changed on disk since it was loaded.
+        Returns the list of (ticker, kind) pairs that were swapped.
+        """
+        keys = [
+            (t, k)
+            for t in ([ticker] if ticker else self.tickers)
+            for k in ([kind] if kind else MODEL_KINDS)
+        ]
+
+        swapped = []
+
+        for key in keys:
+            entry = self._entries.get(key)
+            path = self.path_for(*key)
+
+            if not path.exists():
+                continue
+
+            now = time.monotonic()
+            if (
+                entry is not None and not force
+                and now - entry.last_checked < RELOAD_CHECK_INTERVAL
+            ):
+                continue
+
+            version = _file_version(path)
+
+            if entry is not None and (entry.path, entry.version) == (path, version):
+                entry.last_checked = now
+                continue
+
+            with self._lock:
+                current = self._entries.get(key)
+                if current is not None and (current.path, current.version) == (path, version):
+                    continue
+
+                try:
+                    self._load(*key)
+                    swapped.append(key)
+                except Exception as e:
+                    # A pickle mid-write fails to load -> keep serving the
+                    # previous model and try again on the next check
+                    self._errors[key] = str(e)
+                    if current is not None:
+                        current.last_checked = now
+
+        return swapped
+
+    # ------------------------
+    # Access
+    # ------------------------
+    def get(self, ticker: str, kind: str):
+        """
+        Shared model instance for (ticker, kind). Do not mutate it.
+        """
+        ticker = ticker.upper()
+        key = (ticker, kind)
+
+        if key not in self._entries and not self.path_for(ticker, kind).exists():
+            raise FileNotFoundError(f"Missing {kind} model for {ticker}")
+
+        self.refresh(ticker, kind)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            raise FileNotFoundError(
+                f"Could not load {kind} model for {ticker}: "
+                f"{self._errors.get(key, 'unknown error')}"
+            )
+
+        return entry.model
+
+    def version(self, ticker: str, kind: str):
+        entry = self._entries.get((ticker.upper(), kind))
+        return None if entry is None else entry.version
+
+    # ------------------------
+    # Reporting
+    # ------------------------
+    def stats(self) -> dict:
+        models = []
+        for (ticker, kind), entry in sorted(self._entries.items()):
+            models.append({
+                "ticker": ticker,
+                "kind": kind,
+                "path": str(entry.path),
+                "load_ms": round(entry.load_seconds * 1000, 2),
+                "memory_mb": round(entry.memory_bytes / 1024 ** 2, 3),
+                "loaded_at": entry.loaded_at,
+            })
+
+        return {
+            "loaded": len(models),
+            "total_load_ms": round(sum(m["load_ms"] for m in models), 2),
+            "total_memory_mb": round(sum(m["memory_mb"] for m in models), 3),
+            "models": models,
+            "errors": [
+                {"ticker": t, "kind": k, "error": err}
+                for (t, k), err in sorted(self._errors.items())
+            ],
+        }
+
+
+# Process-wide registry shared by the API and CLI scripts
+registry = ModelRegistry()
@@ -0,0 +1,77 @@
+"""
+PTRE - Pooled Model
+
+One HistGradientBoosting model per kind, trained on every ticker's
+rows with the ticker id as an extra categorical column, plus one
+isotonic calibrator per ticker on top.
+
+- TickerView shows the pooled model as a 40-feature classifier for one
+  ticker (it appends the id column), so a per-ticker calibrator wraps it
+  with FrozenEstimator and serving code needs no changes
+- PooledModel pickles the base model once; every ticker's calibrator
+  references that same instance
+"""
+
+import numpy as np
+
+from sklearn.base import BaseEstimator, ClassifierMixin
+
+
+class TickerView(ClassifierMixin, BaseEstimator):
+    """
+    The pooled model restricted to one ticker. Already fitted.
+    """
+
+    def __init__(self, model=None, ticker_id: int = 0):
+        self.model = model
+        self.ticker_id = ticker_id
+
+    @property
+    def classes_(self):
+        return self.model.classes_
+
+    def __sklearn_is_fitted__(self):
+        return True
+
+    def _with_id(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        ids = np.full((len(X), 1), self.ticker_id, dtype=np.float64)
+        return np.hstack([X, ids])
+
+    def fit(self, X, y=None):
+        return self
+
+    def decision_function(self, X):
+        return self.model.decision_function(self._with_id(X))
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(self._with_id(X))
+
+    def predict(self, X):
+        return self.model.predict(self._with_id(X))
+
+
+class PooledModel:
+    """
+    Pooled base model + per-ticker calibrated classifiers.
+    """
+
+    def __init__(self, base, calibrated: dict, ticker_ids: dict, columns):
+        self.base = base
+        self.calibrated = calibrated
+        self.ticker_ids = ticker_ids
+        self.columns = list(columns)
+
+    @property
+    def tickers(self):
+        return list(self.calibrated)
+
+    def for_ticker(self, ticker: str):
+        """
+        Calibrated classifier for ticker (predict_proba on the usual
+        feature columns, classes_ like the per-ticker models).
+        """
+        try:
+            return self.calibrated[ticker]
+        except KeyError:
+            raise FileNotFoundError(f"{ticker} is not in the pooled model")
@@ -6,13 +6,14 @@ from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.calibration import CalibratedClassifierCV
 
 from src.config.tickers import TICKERS
+from src.utils.storage import read_dataset
 
 FEATURE_DIR = Path("data/processed/features")
 LABEL_DIR = Path("data/processed/labels")
 
 def load_data(ticker):
-    X = pd.read_csv(FEATURE_DIR / f"{ticker}_features.csv", index_col=0)
-    y = pd.read_csv(LABEL_DIR / f"{ticker}_labels.csv", index_col=0)["label"]
+    X = read_dataset("features", ticker)
+    y = read_dataset("labels", ticker)["label"]
 
     idx = X.index.intersection(y.index)
     df = X.loc[idx].copy()
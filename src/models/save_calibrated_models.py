@@ -1,12 +1,26 @@
+from datetime import datetime
 from pathlib import Path
+import argparse
+import json
+import os
 import joblib
 import numpy as np
-import pandas as pd
 
 from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.calibration import CalibratedClassifierCV
+from sklearn.frozen import FrozenEstimator
 
+from src.config.settings import COMPACT_DTYPES, MODEL_LAYOUT
 from src.config.tickers import TICKERS
+from src.features.build_panel import PANEL_DIR, Panel, load_panel
+from src.models.pooled_model import PooledModel, TickerView
+from src.utils.artifact_cache import (
+    artifact_cache,
+    display_path,
+    file_hash,
+    stage_key,
+)
+from src.utils.storage import dataset_path
 
 # ------------------------
 # PATHS
@@ -18,52 +32,51 @@ MOM_LABEL_DIR = Path("data/processed/momentum_labels")
 TREND_MODEL_DIR = Path("src/models/trend")
 MOM_MODEL_DIR = Path("src/models/momentum")
 
+POOLED_MODEL_DIR = Path("src/models/pooled")
+
 TREND_MODEL_DIR.mkdir(parents=True, exist_ok=True)
 MOM_MODEL_DIR.mkdir(parents=True, exist_ok=True)
 
+# Lineage of every saved model pickle
+MODEL_MANIFEST_PATH = Path("src/models/model_manifest.json")
+
 
 # ------------------------
-# HELPERS
+# TRAINING CONFIG (part of every model's cache key)
 # ------------------------
+HGB_PARAMS = {
+    "max_depth": 6,
+    "learning_rate": 0.05,
+    "max_iter": 300,
+    "random_state": 42,
+}
 
-def load_and_align(feature_path, label_path, label_col):
-    X = pd.read_csv(feature_path, index_col=0)
-    y = pd.read_csv(label_path, index_col=0)
-
-    # print("\n[DEBUG] Loaded:")
-    # print("Features rows:", len(X))
-    # print("Labels rows:", len(y))
-    # print("Feature index dtype:", X.index.dtype)
-    # print("Label index dtype:", y.index.dtype)
-
-    # FORCE datetime (CRITICAL)
-    X.index = pd.to_datetime(X.index, errors="coerce")
-    y.index = pd.to_datetime(y.index, errors="coerce")
-
-    common_idx = X.index.intersection(y.index)
-    print("Common index rows:", len(common_idx))
-
-    df = X.loc[common_idx].copy()
-    df[label_col] = y.loc[common_idx][label_col]
+CALIBRATION = {
+    "method": "isotonic",
+    "cv": 3,
+}
 
-    print("Rows before dropna:", len(df))
+# Chronological split: train | calibration | held out
+TRAIN_END = 0.7
+CALIB_END = 0.85
 
-    df = df.dropna()
 
-    print("Rows after dropna:", len(df))
-
-    df = df.sort_index()
+# ------------------------
+# HELPERS
+# ------------------------
 
-    return df
+def training_dtype(X) -> str:
+    """
+    Precision of X (a DataFrame or an array), recorded as feature_dtype_
+    on calibrated models.
+    """
+    if hasattr(X, "dtypes"):
+        return np.result_type(*X.dtypes).name
+    return np.asarray(X).dtype.name
 
 
 def train_and_calibrate(X_train, y_train, X_calib, y_calib):
-    base_model = HistGradientBoostingClassifier(
-        max_depth=6,
-        learning_rate=0.05,
-        max_iter=300,
-        random_state=42
-    )
+    base_model = HistGradientBoostingClassifier(**HGB_PARAMS)
 
     # 1️ Train base model
     base_model.fit(X_train, y_train)
@@ -71,91 +84,244 @@ def train_and_calibrate(X_train, y_train, X_calib, y_calib):
     # 2️ Calibrate using a proper CV object
     calibrated = CalibratedClassifierCV(
         estimator=base_model,
-        method="isotonic",
-        cv=3   # <-- THIS replaces "prefit"
+        **CALIBRATION   # cv=3 <-- THIS replaces "prefit"
     )
 
     # IMPORTANT: fit on CALIBRATION data
     calibrated.fit(X_calib, y_calib)
 
+    # Serving feeds the model inputs at this precision (float32 only
+    # when it was trained on COMPACT_DTYPES features)
+    calibrated.feature_dtype_ = training_dtype(X_calib)
+
     return calibrated
 
 
 
 # ------------------------
-# MAIN
+# ONE MODEL
 # ------------------------
-def main():
-    print("\n=== SAVING FINAL CALIBRATED MODELS ===\n")
+# kind -> (model dir, label dataset, label column)
+MODEL_SPECS = {
+    "trend": (TREND_MODEL_DIR, "labels", "label"),
+    "momentum": (MOM_MODEL_DIR, "momentum_labels", "momentum_label"),
+}
+
+
+def model_path(ticker, kind):
+    return MODEL_SPECS[kind][0] / f"{ticker}_{kind}.pkl"
+
+
+def model_key(ticker, kind):
+    """
+    (cache key, lineage) of the model trained from the current inputs.
+    """
+    _, label_dataset, label_col = MODEL_SPECS[kind]
+
+    return stage_key(
+        f"{kind}_model",
+        [dataset_path("features", ticker), dataset_path(label_dataset, ticker)],
+        [model_path(ticker, kind)],
+        config={
+            "label_col": label_col,
+            "hgb_params": HGB_PARAMS,
+            "calibration": CALIBRATION,
+            "split": [TRAIN_END, CALIB_END],
+            "compact_dtypes": COMPACT_DTYPES,
+        },
+        code=[__file__, Path(__file__).parents[1] / "features" / "build_panel.py"]
+    )
 
-    for ticker in TICKERS:
-        print(f"\n===== {ticker} =====")
 
-        # ==============================
-        # TREND MODEL
-        # ==============================
-        trend_df = load_and_align(
-            FEATURE_DIR / f"{ticker}_features.csv",
-            TREND_LABEL_DIR / f"{ticker}_labels.csv",
-            "label"
-        )
+def train_model(ticker, kind, panel=None):
+    """
+    Train, calibrate and save one (ticker, kind) model from the panel
+    (default: PANEL_DIR, which must be current: see load_panel).
+    Returns the saved path, or None if there is not enough data.
+    An identical earlier training run is restored from the cache.
+    """
+    path = model_path(ticker, kind)
+
+    key, lineage = model_key(ticker, kind)
+    if artifact_cache.restore(key, [path]):
+        print(f"{ticker} {kind}: inputs unchanged, using cached model")
+        return path
+
+    panel = panel or Panel()
+    # The cache key hashes the datasets, so the rows must come from them
+    if not panel.is_current(ticker):
+        raise RuntimeError(f"Panel is out of date for {ticker}, run build_panel")
+
+    train_rows, calib_rows, _ = panel.split(ticker, kind, (TRAIN_END, CALIB_END))
+    train = panel.frame(train_rows, kind)
+    calib = panel.frame(calib_rows, kind)
+
+    if len(train) == 0 or len(calib) == 0:
+        print("Not enough data after split, skipping.")
+        return None
+
+    model = train_and_calibrate(
+        train.drop(columns="label"),
+        train["label"].astype(np.int64),
+        calib.drop(columns="label"),
+        calib["label"].astype(np.int64)
+    )
 
-        n = len(trend_df)
+    # Atomic write: a crash never leaves a truncated model behind
+    tmp = path.with_suffix(".tmp")
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
 
-        train_end = int(n * 0.7)
-        calib_end = int(n * 0.85)
+    artifact_cache.store(key, [path], lineage)
+    return path
 
-        train = trend_df.iloc[:train_end]
-        calib = trend_df.iloc[train_end:calib_end]
 
-        if len(train) == 0 or len(calib) == 0:
-            print("Not enough data after split, skipping.")
-            continue
+def record_lineage(ticker, kind):
+    """
+    Write the lineage of the current model pickle to MODEL_MANIFEST_PATH.
+    Call from one process only (the manifest is read-modify-write).
+    """
+    _write_lineage(model_path(ticker, kind), *model_key(ticker, kind))
 
-        trend_model = train_and_calibrate(
-            train.drop(columns="label"),
-            train["label"],
-            calib.drop(columns="label"),
-            calib["label"]
-        )
 
-        trend_path = TREND_MODEL_DIR / f"{ticker}_trend.pkl"
-        joblib.dump(trend_model, trend_path)
+def _write_lineage(path, key, lineage):
+    manifest = {}
+    if MODEL_MANIFEST_PATH.exists():
+        with open(MODEL_MANIFEST_PATH) as f:
+            manifest = json.load(f)
+
+    manifest[display_path(path)] = dict(
+        lineage,
+        cache_key=key,
+        sha256=file_hash(path),
+        recorded_at=datetime.utcnow().isoformat(),
+    )
+
+    tmp = MODEL_MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MODEL_MANIFEST_PATH)
 
-        print(f"✔ Trend model saved → {trend_path}")
 
-        # ==============================
-        # MOMENTUM MODEL
-        # ==============================
-        mom_df = load_and_align(
-            FEATURE_DIR / f"{ticker}_features.csv",
-            MOM_LABEL_DIR / f"{ticker}_momentum_labels.csv",
-            "momentum_label"
+# ------------------------
+# POOLED MODELS
+# ------------------------
+def pooled_path(kind):
+    return POOLED_MODEL_DIR / f"{kind}_pooled.pkl"
+
+
+def fit_pooled(kind, panel, tickers=None):
+    """
+    One HGB on every ticker's train rows (ticker id as a categorical
+    last column), then an isotonic calibrator per ticker on that
+    ticker's calibration rows. Same splits as the per-ticker models.
+    """
+    tickers = list(tickers or panel.tickers)
+    ticker_ids = {t: panel.tickers.index(t) for t in tickers}
+    n_features = len(panel.columns)
+
+    splits = {
+        t: panel.split(t, kind, (TRAIN_END, CALIB_END))
+        for t in tickers
+    }
+
+    X_parts, y_parts = [], []
+    for ticker in tickers:
+        X, y = panel.take(splits[ticker][0], kind)
+        X_parts.append(TickerView(ticker_id=ticker_ids[ticker])._with_id(X))
+        y_parts.append(y)
+
+    base = HistGradientBoostingClassifier(
+        **HGB_PARAMS,
+        categorical_features=[n_features]
+    )
+    base.fit(np.vstack(X_parts), np.concatenate(y_parts).astype(np.int64))
+
+    calibrated = {}
+    for ticker in tickers:
+        X, y = panel.take(splits[ticker][1], kind)
+
+        calibrator = CalibratedClassifierCV(
+            FrozenEstimator(TickerView(base, ticker_ids[ticker])),
+            method=CALIBRATION["method"]
         )
+        calibrator.fit(np.asarray(X), y.astype(np.int64))
+        calibrator.feature_dtype_ = panel.features.dtype.name
 
-        n = len(mom_df)
+        calibrated[ticker] = calibrator
 
-        train_end = int(n * 0.7)
-        calib_end = int(n * 0.85)
+    return PooledModel(base, calibrated, ticker_ids, panel.columns)
 
-        train = mom_df.iloc[:train_end]
-        calib = mom_df.iloc[train_end:calib_end]
 
-        if len(train) == 0 or len(calib) == 0:
-            print("Not enough data after split, skipping.")
-            continue
+def pooled_key(kind, panel_dir=PANEL_DIR):
+    return stage_key(
+        f"{kind}_pooled",
+        sorted(Path(panel_dir).iterdir()),
+        [pooled_path(kind)],
+        config={
+            "hgb_params": HGB_PARAMS,
+            "calibration": CALIBRATION["method"],
+            "split": [TRAIN_END, CALIB_END],
+        },
+        code=[__file__, Path(__file__).with_name("pooled_model.py")]
+    )
 
-        mom_model = train_and_calibrate(
-            train.drop(columns="momentum_label"),
-            train["momentum_label"],
-            calib.drop(columns="momentum_label"),
-            calib["momentum_label"]
-        )
 
-        mom_path = MOM_MODEL_DIR / f"{ticker}_momentum.pkl"
-        joblib.dump(mom_model, mom_path)
+def train_pooled(kind, panel=None):
+    """
+    Train and save the pooled model of one kind. Returns its path.
+    """
+    panel = panel or Panel()
+    path = pooled_path(kind)
+
+    key, lineage = pooled_key(kind, panel.panel_dir)
+    if artifact_cache.restore(key, [path]):
+        print(f"pooled {kind}: inputs unchanged, using cached model")
+    else:
+        model = fit_pooled(kind, panel)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        joblib.dump(model, tmp)
+        os.replace(tmp, path)
+
+        artifact_cache.store(key, [path], lineage)
+
+    _write_lineage(path, key, lineage)
+    return path
+
+
+# ------------------------
+# MAIN
+# ------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Save calibrated models")
+    parser.add_argument("--pooled", action="store_true",
+                        help="one pooled model per kind (needs build_panel)")
+    args = parser.parse_args()
+
+    print("\n=== SAVING FINAL CALIBRATED MODELS ===\n")
+
+    if args.pooled or MODEL_LAYOUT == "pooled":
+        panel = Panel()
+        for kind in MODEL_SPECS:
+            path = train_pooled(kind, panel)
+            print(f"✔ Pooled {kind} model saved → {path}")
+
+        print("\n=== ALL MODELS SAVED SUCCESSFULLY ===")
+        return
+
+    panel = load_panel()
+
+    for ticker in TICKERS:
+        print(f"\n===== {ticker} =====")
+
+        for kind in MODEL_SPECS:
+            path = train_model(ticker, kind, panel)
 
-        print(f"✔ Momentum model saved → {mom_path}")
+            if path is not None:
+                record_lineage(ticker, kind)
+                print(f"✔ {kind.capitalize()} model saved → {path}")
 
     print("\n=== ALL MODELS SAVED SUCCESSFULLY ===")
 
@@ -0,0 +1,135 @@
+"""
+PTRE - Signal History
+
+Precomputed signal for every historical date, so past signals are
+read from a table instead of being scored on demand.
+
+- build_history replays both models over a ticker's whole feature
+  matrix (generate_final_signal.replay_signals) and writes the
+  "signals" dataset (data/processed/signals/{ticker}_signals)
+- SignalHistory serves the tables, keeping each one in memory until
+  its file is rewritten
+- Rebuild after retraining models or rebuilding features
+
+Run: python -m src.models.signal_history [--tickers ...]
+"""
+
+import argparse
+import threading
+import time
+
+import pandas as pd
+
+from src.config.tickers import TICKERS
+from src.models.generate_final_signal import replay_signals
+from src.utils.storage import dataset_path, read_frame, write_dataset
+
+
+# =====================
+# Build
+# =====================
+
+def build_history(ticker: str):
+    """
+    Replay and store ticker's signal history. Returns (path, frame).
+    """
+    history = replay_signals(ticker)
+    return write_dataset(history, "signals", ticker.upper()), history
+
+
+# =====================
+# Serve
+# =====================
+
+def _file_version(path):
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class SignalHistory:
+
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def table(self, ticker: str) -> pd.DataFrame:
+        """
+        Full history of ticker. Shared between callers; do not mutate it.
+        """
+        ticker = ticker.upper()
+        path = dataset_path("signals", ticker)
+
+        if not path.exists():
+            raise FileNotFoundError(f"No signal history for {ticker}")
+
+        version = _file_version(path)
+
+        cached = self._tables.get(ticker)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self._lock:
+            cached = self._tables.get(ticker)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            table = read_frame(path)
+            self._tables[ticker] = (version, table)
+
+        return table
+
+    def query(self, ticker: str, start=None, end=None, limit: int = None) -> dict:
+        """
+        JSON-ready history between start and end (inclusive dates),
+        keeping the most recent `limit` rows.
+        """
+        table = self.table(ticker).loc[start:end]
+        if limit is not None:
+            table = table.iloc[-limit:] if limit > 0 else table.iloc[:0]
+
+        return {
+            "ticker": ticker.upper(),
+            "count": len(table),
+            "signals": [
+                {
+                    "date": date.strftime("%Y-%m-%d"),
+                    "signal": row.signal,
+                    "confidence": round(float(row.confidence) * 100, 2),
+                    "agreement": bool(row.agreement),
+                    "trend": {
+                        "direction": int(row.trend_direction),
+                        "confidence": round(float(row.trend_confidence), 3),
+                    },
+                    "momentum": {
+                        "direction": int(row.momentum_direction),
+                        "confidence": round(float(row.momentum_confidence), 3),
+                    },
+                }
+                for date, row in zip(table.index, table.itertuples(index=False))
+            ],
+        }
+
+
+# Process-wide history tables shared by the API
+signal_history = SignalHistory()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build signal history tables")
+    parser.add_argument("--tickers", nargs="+", help="default: TICKERS")
+    args = parser.parse_args()
+
+    print("\n=== BUILDING SIGNAL HISTORY ===\n")
+
+    for ticker in args.tickers or TICKERS:
+        try:
+            start = time.perf_counter()
+            path, history = build_history(ticker)
+            print(f"{ticker:<6} {len(history):>5} days "
+                  f"{time.perf_counter() - start:6.2f}s → {path}")
+        except FileNotFoundError as e:
+            print(f"{ticker:<6} skipped → {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,47 +3,21 @@ os.environ["LOKY_MAX_CPU_COUNT"] = str(os.cpu_count())
 
 
 from pathlib import Path
-import pandas as pd
 import numpy as np
 
 from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 
 from src.config.tickers import TICKERS
+from src.features.build_panel import load_panel
 
 FEATURE_DIR = Path("data/processed/features")
 LABEL_DIR = Path("data/processed/labels")
 
 
-def load_data(ticker):
-    X = pd.read_csv(
-        FEATURE_DIR / f"{ticker}_features.csv",
-        index_col=0
-    )
-
-    y = pd.read_csv(
-        LABEL_DIR / f"{ticker}_labels.csv",
-        index_col=0
-    )["label"]
-
-    # SAFE datetime conversion (handles "Date" bug)
-    X.index = pd.to_datetime(X.index, errors="coerce")
-    y.index = pd.to_datetime(y.index, errors="coerce")
-
-    # Drop bad index rows (NaT)
-    X = X[~X.index.isna()]
-    y = y[~y.index.isna()]
-
-    # Ensure sorted
-    X = X.sort_index()
-    y = y.sort_index()
-
-    # Align explicitly
-    common_idx = X.index.intersection(y.index)
-    df = X.loc[common_idx].copy()
-    df["label"] = y.loc[common_idx]
-
-    return df
+def load_data(ticker, panel):
+    # Trend rows of ticker's panel block, labels aligned already
+    return panel.frame(panel.rows(ticker), "trend")
 
 
 def time_split(df, train_ratio=0.7):
@@ -63,10 +37,12 @@ def time_split(df, train_ratio=0.7):
 
 
 def main():
+    panel = load_panel()
+
     for ticker in TICKERS:
         print(f"\n===== {ticker} =====")
 
-        df = load_data(ticker)
+        df = load_data(ticker, panel)
         print("Data shape after alignment:", df.shape)
 
         X_train, y_train, X_val, y_val = time_split(df)
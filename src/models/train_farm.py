@@ -0,0 +1,259 @@
+"""
+PTRE - Training Farm
+
+Parallel, resumable version of save_calibrated_models.main.
+
+- One job per (ticker, model kind), fanned out over a process pool
+- OpenMP threads per worker are capped with threadpoolctl, so
+  workers × HGB threads never oversubscribes the cores
+- Finished jobs are checkpointed: the model is written atomically, then
+  recorded in training_checkpoint.json
+- --resume skips jobs whose recorded model file is still in place, so
+  an interrupted run continues where it stopped
+- Wall time and peak RSS are recorded per job; every job gets a fresh
+  worker process, so a peak never includes an earlier job's memory
+
+Run: python -m src.models.train_farm [--workers N] [--threads T] [--resume]
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import threading
+import time
+
+import psutil
+
+from src.config.settings import TRAIN_THREADS_PER_WORKER, TRAIN_WORKERS
+from src.config.tickers import TICKERS
+from src.features.build_panel import load_panel
+from src.models.save_calibrated_models import MODEL_SPECS, record_lineage
+
+CHECKPOINT_PATH = Path("src/models/training_checkpoint.json")
+
+# Seconds between RSS samples while a job runs
+MEMORY_SAMPLE_SECONDS = 0.05
+
+
+# =====================
+# Worker side
+# =====================
+
+def _peak_rss(fn, *args):
+    """
+    Run fn(*args) while sampling this process' RSS.
+    Returns (result, peak bytes).
+    """
+    process = psutil.Process()
+    peak = [process.memory_info().rss]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(MEMORY_SAMPLE_SECONDS):
+            peak[0] = max(peak[0], process.memory_info().rss)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    try:
+        result = fn(*args)
+    finally:
+        stop.set()
+        sampler.join()
+
+    return result, max(peak[0], process.memory_info().rss)
+
+
+def run_job(ticker: str, kind: str, threads: int) -> dict:
+    """
+    Train one model with at most `threads` OpenMP threads.
+    """
+    from threadpoolctl import threadpool_limits
+    from src.models.save_calibrated_models import train_model
+
+    start = time.perf_counter()
+
+    with threadpool_limits(limits=threads, user_api="openmp"):
+        path, peak = _peak_rss(train_model, ticker, kind)
+
+    return {
+        "path": None if path is None else str(path),
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "peak_rss_mb": round(peak / 2**20, 1),
+        "threads": threads,
+    }
+
+
+# =====================
+# Checkpoint
+# =====================
+
+def _file_version(path: Path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_checkpoint(path: Path = CHECKPOINT_PATH) -> dict:
+    if not path.exists():
+        return {"jobs": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(checkpoint: dict, path: Path = CHECKPOINT_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def is_finished(record: dict) -> bool:
+    # The model on disk must still be the one this run produced
+    return (
+        record is not None
+        and record.get("path") is not None
+        and _file_version(record["path"]) == record.get("model_version")
+    )
+
+
+# =====================
+# Orchestrator
+# =====================
+
+def plan(workers=None, threads=None, n_jobs=None):
+    """
+    (workers, OpenMP threads per worker) that fit the available cores.
+    """
+    cores = os.cpu_count() or 1
+
+    workers = workers or TRAIN_WORKERS or cores
+    if n_jobs:
+        workers = min(workers, n_jobs)
+
+    threads = threads or TRAIN_THREADS_PER_WORKER or max(1, cores // workers)
+
+    return workers, threads
+
+
+def train_all(tickers=None, kinds=None, workers=None, threads=None,
+              resume=False):
+    """
+    Train every (ticker, kind) job. Returns the checkpoint dict.
+    """
+    tickers = list(tickers or TICKERS)
+    kinds = [k for k in MODEL_SPECS if k in (kinds or MODEL_SPECS)]
+
+    checkpoint = load_checkpoint() if resume else {"jobs": {}}
+    checkpoint.setdefault("started_at", datetime.utcnow().isoformat())
+
+    jobs = []
+    for ticker in tickers:
+        for kind in kinds:
+            key = f"{ticker}:{kind}"
+            if resume and is_finished(checkpoint["jobs"].get(key)):
+                print(f"{key:<16} already trained, skipping")
+                continue
+            jobs.append((ticker, kind))
+
+    save_checkpoint(checkpoint)
+
+    if not jobs:
+        print("Nothing to train.")
+        return checkpoint
+
+    # Workers map the panel; it is (re)built here, in one process
+    load_panel(tickers)
+
+    workers, threads = plan(workers, threads, len(jobs))
+    print(f"\nTraining {len(jobs)} models: {workers} workers × {threads} threads\n")
+
+    start = time.perf_counter()
+
+    # One job per worker process: peak RSS is that job's alone
+    with ProcessPoolExecutor(workers, max_tasks_per_child=1) as pool:
+        futures = {
+            pool.submit(run_job, ticker, kind, threads): (ticker, kind)
+            for ticker, kind in jobs
+        }
+
+        for future in as_completed(futures):
+            ticker, kind = futures[future]
+            key = f"{ticker}:{kind}"
+
+            try:
+                record = future.result()
+            except Exception as e:
+                print(f"{key:<16} FAILED → {e}")
+                continue
+
+            if record["path"] is None:
+                print(f"{key:<16} not enough data, skipped")
+                continue
+
+            record["model_version"] = _file_version(record["path"])
+            record["finished_at"] = datetime.utcnow().isoformat()
+
+            checkpoint["jobs"][key] = record
+            save_checkpoint(checkpoint)
+
+            # Lineage is written here, by the only process that owns it
+            record_lineage(ticker, kind)
+
+            print(
+                f"{key:<16} {record['wall_seconds']:8.2f}s "
+                f"{record['peak_rss_mb']:8.1f} MB → {record['path']}"
+            )
+
+    wall = time.perf_counter() - start
+    print_summary(checkpoint, [f"{t}:{k}" for t, k in jobs], wall)
+
+    return checkpoint
+
+
+def print_summary(checkpoint: dict, keys, wall: float):
+    records = [checkpoint["jobs"][k] for k in keys if k in checkpoint["jobs"]]
+
+    job_seconds = sum(r["wall_seconds"] for r in records)
+    peak = max((r["peak_rss_mb"] for r in records), default=0.0)
+
+    print("\n=== TRAINING FARM SUMMARY ===\n")
+    print(f"Jobs finished:     {len(records)} / {len(keys)}")
+    print(f"Sum of job time:   {job_seconds:.2f}s")
+    print(f"Wall time:         {wall:.2f}s")
+    print(f"Max job peak RSS:  {peak:.1f} MB")
+    print(f"Checkpoint:        {CHECKPOINT_PATH}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE training farm")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="training processes (default: TRAIN_WORKERS or all cores)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="OpenMP threads per process (default: cores // workers)")
+    parser.add_argument("--tickers", nargs="+", help="default: TICKERS")
+    parser.add_argument("--kinds", nargs="+", choices=list(MODEL_SPECS))
+    parser.add_argument("--resume", action="store_true",
+                        help="skip jobs finished by the previous run")
+
+    args = parser.parse_args()
+
+    print("\n=== TRAINING FARM: CALIBRATED MODELS ===")
+
+    train_all(
+        tickers=args.tickers,
+        kinds=args.kinds,
+        workers=args.workers,
+        threads=args.threads,
+        resume=args.resume,
+    )
+
+
+if __name__ == "__main__":
+    main()
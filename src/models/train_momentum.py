@@ -7,6 +7,8 @@ from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 
 from src.config.tickers import TICKERS
+from src.features.build_features import build_columns
+from src.utils.storage import read_dataset
 
 # -----------------------------
 # Paths
@@ -39,20 +41,10 @@ MOMENTUM_FEATURES = [
 # Data loading & alignment
 # -----------------------------
 def load_data(ticker: str) -> pd.DataFrame:
-    X = pd.read_csv(
-        FEATURE_DIR / f"{ticker}_features.csv",
-        index_col=0,
-        parse_dates=True
-    )
-
-    y = pd.read_csv(
-        LABEL_DIR / f"{ticker}_momentum_labels.csv",
-        index_col=0,
-        parse_dates=True
-    )["momentum_label"]
-
-    # Select momentum features only
-    X = X[MOMENTUM_FEATURES]
+    # Momentum features only (just their part of the feature graph)
+    X = build_columns(ticker, MOMENTUM_FEATURES)
+
+    y = read_dataset("momentum_labels", ticker)["momentum_label"]
 
     # Force clean datetime indices
     X.index = pd.to_datetime(X.index, errors="coerce")
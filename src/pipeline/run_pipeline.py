@@ -0,0 +1,346 @@
+"""
+PTRE - Pipeline Runner
+
+Runs the per-ticker data pipeline as a DAG instead of one serial
+loop per script:
+
+    download → clean ─┬→ features → labels
+                      └→ momentum_labels
+
+- Downloads are I/O-bound and run on a thread pool (DOWNLOAD_WORKERS)
+- clean / features / labels are CPU-bound and run on a process pool
+  (PIPELINE_WORKERS, default: all cores)
+- Tickers advance independently; a failure only stops that ticker's
+  downstream stages
+- A stage is skipped when its input files, its code and its outputs
+  are unchanged since its last successful run
+- Per-stage timings are printed at the end, then the artifact cache
+  is pruned to the entries still in use (ARTIFACT_CACHE_KEEP)
+
+Run: python -m src.pipeline.run_pipeline [--workers N] [--stages ...]
+"""
+
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from pathlib import Path
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import time
+
+from src.config.settings import DOWNLOAD_WORKERS, PIPELINE_WORKERS
+from src.config.tickers import TICKERS
+from src.utils.artifact_cache import artifact_cache
+from src.utils.storage import dataset_path
+
+RAW_DIR = Path("data/raw")
+
+MANIFEST_PATH = Path("data/processed/pipeline_manifest.json")
+
+# Code every stage depends on besides its own module
+SHARED_CODE = ["src.config.settings", "src.utils.storage"]
+
+
+# =====================
+# Stages
+# =====================
+
+class Stage:
+
+    __slots__ = ("name", "target", "deps", "inputs", "outputs", "pool",
+                 "always", "code")
+
+    def __init__(self, name, target, deps, inputs, outputs,
+                 pool="cpu", always=False, code=()):
+        self.name = name
+        self.target = target      # "module:function", called with ticker
+        self.deps = deps
+        self.inputs = inputs      # ticker -> input files
+        self.outputs = outputs    # ticker -> output files
+        self.pool = pool          # "io" (threads) or "cpu" (processes)
+        self.always = always      # never skipped (e.g. downloads)
+        self.code = code          # modules besides its own it depends on
+
+    @property
+    def module(self):
+        return self.target.split(":")[0]
+
+
+def _raw_path(ticker):
+    return RAW_DIR / f"{ticker}.csv"
+
+
+STAGES = {
+    "download": Stage(
+        "download", "src.ingestion.download_data:download_ticker",
+        deps=(),
+        inputs=lambda t: [],
+        outputs=lambda t: [_raw_path(t)],
+        pool="io",
+        always=True,
+    ),
+    "clean": Stage(
+        "clean", "src.ingestion.clean_data:clean_ticker",
+        deps=("download",),
+        inputs=lambda t: [_raw_path(t)],
+        outputs=lambda t: [dataset_path("clean", t)],
+    ),
+    "features": Stage(
+        "features", "src.features.build_features:build_ticker",
+        deps=("clean",),
+        inputs=lambda t: [dataset_path("clean", t)],
+        outputs=lambda t: [dataset_path("features", t)],
+        code=("src.features.feature_registry", "src.features.rolling"),
+    ),
+    "labels": Stage(
+        "labels", "src.labels.build_labels:label_ticker",
+        deps=("clean", "features"),
+        inputs=lambda t: [dataset_path("clean", t), dataset_path("features", t)],
+        outputs=lambda t: [dataset_path("labels", t)],
+    ),
+    "momentum_labels": Stage(
+        "momentum_labels", "src.labels.build_momentum_labels:label_ticker",
+        deps=("clean",),
+        inputs=lambda t: [dataset_path("clean", t)],
+        outputs=lambda t: [dataset_path("momentum_labels", t)],
+    ),
+}
+
+
+def _run_stage(name: str, ticker: str):
+    """
+    Worker entry point. Returns (seconds, output path or None).
+    """
+    module, func = STAGES[name].target.split(":")
+    fn = getattr(importlib.import_module(module), func)
+
+    start = time.perf_counter()
+    result = fn(ticker)
+    elapsed = time.perf_counter() - start
+
+    # Stage functions return a path or (path, frame); only the path
+    # travels back across the process boundary
+    path = result[0] if isinstance(result, tuple) else result
+    return elapsed, None if path is None else str(path)
+
+
+# =====================
+# Change detection
+# =====================
+
+def _file_version(path: Path):
+    path = Path(path)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _code_files(stage: Stage):
+    return [
+        importlib.util.find_spec(module).origin
+        for module in [stage.module, *stage.code, *SHARED_CODE]
+    ]
+
+
+def fingerprint(stage: Stage, ticker: str) -> dict:
+    files = {
+        "inputs": stage.inputs(ticker),
+        "code": _code_files(stage),
+        "outputs": stage.outputs(ticker),
+    }
+    return {
+        group: {str(p): _file_version(p) for p in paths}
+        for group, paths in files.items()
+    }
+
+
+def is_fresh(stage: Stage, ticker: str, manifest: dict) -> bool:
+    if stage.always:
+        return False
+
+    recorded = manifest.get(f"{stage.name}:{ticker}")
+    if recorded is None:
+        return False
+
+    current = fingerprint(stage, ticker)
+    outputs_exist = all(v is not None for v in current["outputs"].values())
+
+    return outputs_exist and current == recorded
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> dict:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, path: Path = MANIFEST_PATH):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# =====================
+# Scheduler
+# =====================
+
+def run_pipeline(tickers=None, stages=None, workers=None,
+                 download_workers=DOWNLOAD_WORKERS, force=False):
+    """
+    Run the selected stages for the selected tickers.
+    Returns {(stage, ticker): "done" | "skipped" | "failed" | "blocked"}
+    and prints per-stage timings.
+    """
+    tickers = list(tickers or TICKERS)
+    stages = [s for s in STAGES if s in (stages or STAGES)]
+    workers = workers or PIPELINE_WORKERS or os.cpu_count()
+
+    manifest = load_manifest()
+    status = {}
+    timings = {name: [] for name in stages}
+    errors = {}
+
+    pending = [(s, t) for t in tickers for s in stages]
+    running = {}
+
+    run_start = time.perf_counter()
+
+    def resolve_ready():
+        # Skips can unblock further stages, so repeat until stable
+        changed = True
+        while changed:
+            changed = False
+            for key in list(pending):
+                name, ticker = key
+                deps = [status.get((d, ticker))
+                        for d in STAGES[name].deps if d in stages]
+
+                if any(d in ("failed", "blocked") for d in deps):
+                    status[key] = "blocked"
+                elif all(d in ("done", "skipped") for d in deps):
+                    if not force and is_fresh(STAGES[name], ticker, manifest):
+                        status[key] = "skipped"
+                        print(f"{name:<16} {ticker:<6} skipped (unchanged)")
+                    else:
+                        status[key] = "ready"
+                else:
+                    continue
+
+                pending.remove(key)
+                changed = True
+
+    with ThreadPoolExecutor(download_workers, thread_name_prefix="ptre-io") as io_pool, \
+            ProcessPoolExecutor(workers) as cpu_pool:
+        pools = {"io": io_pool, "cpu": cpu_pool}
+
+        try:
+            while True:
+                resolve_ready()
+
+                for key, state in status.items():
+                    if state == "ready":
+                        name, ticker = key
+                        pool = pools[STAGES[name].pool]
+                        running[pool.submit(_run_stage, name, ticker)] = key
+                        status[key] = "running"
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    key = running.pop(future)
+                    name, ticker = key
+
+                    try:
+                        elapsed, path = future.result()
+                    except Exception as e:
+                        status[key] = "failed"
+                        errors[key] = str(e)
+                        print(f"{name:<16} {ticker:<6} FAILED → {e}")
+                        continue
+
+                    if path is None:
+                        status[key] = "failed"
+                        errors[key] = "no output"
+                        print(f"{name:<16} {ticker:<6} FAILED → no output")
+                        continue
+
+                    status[key] = "done"
+                    timings[name].append(elapsed)
+                    manifest[f"{name}:{ticker}"] = fingerprint(STAGES[name], ticker)
+
+                    print(f"{name:<16} {ticker:<6} {elapsed:7.2f}s → {path}")
+        finally:
+            save_manifest(manifest)
+
+    wall = time.perf_counter() - run_start
+    print_timings(stages, status, timings, wall, workers)
+
+    pruned = artifact_cache.prune()
+    if pruned["entries"] or pruned["objects"]:
+        print(
+            f"\nArtifact cache: pruned {pruned['entries']} entries, "
+            f"{pruned['objects']} objects ({pruned['bytes'] / 1024 ** 2:.1f} MB)"
+        )
+
+    return status
+
+
+def print_timings(stages, status, timings, wall, workers):
+    print(f"\n=== PIPELINE TIMINGS ({workers} workers) ===\n")
+    print(f"{'stage':<16} {'run':>4} {'skip':>5} {'fail':>5} "
+          f"{'total s':>9} {'mean s':>8} {'max s':>8}")
+
+    for name in stages:
+        states = [s for (n, _), s in status.items() if n == name]
+        runs = timings[name]
+        total = sum(runs)
+        mean = total / len(runs) if runs else 0.0
+
+        print(
+            f"{name:<16} {len(runs):>4} {states.count('skipped'):>5} "
+            f"{states.count('failed') + states.count('blocked'):>5} "
+            f"{total:9.2f} {mean:8.2f} {max(runs, default=0.0):8.2f}"
+        )
+
+    print(f"\nWall time: {wall:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE pipeline runner")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for CPU stages (default: all cores)")
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES),
+                        help="subset of stages to run (default: all)")
+    parser.add_argument("--tickers", nargs="+", help="default: TICKERS")
+    parser.add_argument("--force", action="store_true",
+                        help="rerun stages even if inputs are unchanged")
+
+    args = parser.parse_args()
+
+    print("Running PTRE pipeline...\n")
+
+    run_pipeline(
+        tickers=args.tickers,
+        stages=args.stages,
+        workers=args.workers,
+        download_workers=args.download_workers,
+        force=args.force,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+PTRE - Async Signal Service
+
+Non-blocking counterpart of signal_service for the FastAPI handlers.
+
+- Model inference runs on a bounded thread pool (INFERENCE_WORKERS)
+- Price downloads run on their own bounded pool with a timeout, and
+  fall back to cached/local prices so a slow upstream cannot stall
+  unrelated tickers; the fallback runs on the same pool (never on the
+  event loop) under PRICE_FALLBACK_TIMEOUT
+- Concurrent requests for the same ticker share one computation
+- Executor jobs run in a copy of the caller's context, so stages they
+  time land in the request's trace (src.utils.metrics)
+- Single-ticker responses are cached under the ETag of their input
+  versions (response_cache), so repeated polls skip inference; a hit
+  is re-stamped with the response time
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src.config.settings import (
+    INFERENCE_WORKERS,
+    MAX_CONCURRENT_FETCHES,
+    PRICE_FALLBACK_TIMEOUT,
+    PRICE_FETCH_TIMEOUT,
+    SIGNAL_TIMEOUT,
+)
+from src.config.tickers import TICKERS
+from src.models.generate_final_signal import data_version
+from src.models.generate_final_signal import generate_signal as model_generate_signal
+from src.models.generate_final_signal import generate_signals as model_generate_signals
+from src.models.signal_history import signal_history
+from src.services.response_cache import etag_for, etag_matches, response_cache
+from src.services.signal_service import build_response, load_prices
+from src.utils.metrics import run_in_context, stage
+
+
+EXECUTOR_SIZES = {
+    "inference": INFERENCE_WORKERS,
+    "prices": MAX_CONCURRENT_FETCHES,
+}
+
+# Created lazily so the app can be started again after shutdown()
+_executors = {}
+
+# key -> running task; lets identical concurrent requests share work
+_in_flight = {}
+
+
+def _executor(name: str) -> ThreadPoolExecutor:
+    executor = _executors.get(name)
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=EXECUTOR_SIZES[name],
+            thread_name_prefix=f"ptre-{name}"
+        )
+        _executors[name] = executor
+    return executor
+
+
+async def _run_blocking(pool: str, fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(pool), run_in_context(fn, *args))
+
+
+async def _coalesce(key, factory):
+    task = _in_flight.get(key)
+
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    # shield: one caller timing out must not cancel the shared work
+    return await asyncio.shield(task)
+
+
+async def load_prices_async(ticker: str):
+    """
+    Fresh prices if the fetch finishes within PRICE_FETCH_TIMEOUT,
+    otherwise whatever is cached or on disk (never blocks on upstream),
+    or no prices if even that takes longer than PRICE_FALLBACK_TIMEOUT.
+    """
+    fetch = _coalesce(
+        ("prices", ticker),
+        lambda: _run_blocking("prices", load_prices, ticker)
+    )
+
+    try:
+        return await asyncio.wait_for(fetch, PRICE_FETCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+
+    # Cold cache: load_prices reads the clean dataset, keep it off the loop
+    fallback = _coalesce(
+        ("local_prices", ticker),
+        lambda: _run_blocking("prices", load_prices, ticker, False)
+    )
+
+    try:
+        return await asyncio.wait_for(fallback, PRICE_FALLBACK_TIMEOUT)
+    except asyncio.TimeoutError:
+        return []
+
+
+async def signal_key_async(ticker: str):
+    """
+    (cache key, prices) for ticker's signal. Cheap: prices come from
+    the price cache, versions from file stats.
+    """
+    prices = await load_prices_async(ticker)
+    versions = await _run_blocking("inference", data_version, ticker)
+
+    price_date = prices[-1]["date"] if prices else None
+
+    return (ticker, *versions, price_date), prices
+
+
+async def _compute_signal(ticker: str, etag: str, prices):
+    inference = _run_blocking("inference", model_generate_signal, ticker)
+    result = await asyncio.wait_for(inference, SIGNAL_TIMEOUT)
+
+    response = build_response(ticker, result, prices)
+    response_cache.put(etag, response)
+
+    return response
+
+
+async def cached_signal_async(ticker: str, if_none_match: str = None):
+    """
+    (etag, response, status) for ticker. status is "HIT", "MISS" or
+    "NOT_MODIFIED"; a not-modified result carries no response.
+    "timestamp" is when the response was served, also on a hit.
+    """
+    ticker = ticker.upper()
+
+    # Unsupported tickers never reach the pools or the price upstream
+    if ticker not in TICKERS:
+        raise FileNotFoundError(f"Ticker {ticker} not supported.")
+
+    with stage("cache_key"):
+        key, prices = await signal_key_async(ticker)
+    # Hashed once: the ETag is also the cache and coalescing key
+    etag = etag_for(key)
+
+    if etag_matches(if_none_match, etag):
+        response_cache.record_not_modified()
+        return etag, None, "NOT_MODIFIED"
+
+    response = response_cache.get(etag)
+    if response is not None:
+        # Shared cached body: stamp a copy
+        return etag, {**response, "timestamp": datetime.utcnow().isoformat()}, "HIT"
+
+    response = await _coalesce(
+        ("signal", etag), lambda: _compute_signal(ticker, etag, prices)
+    )
+    return etag, response, "MISS"
+
+
+async def generate_signal_async(ticker: str):
+    _, response, _ = await cached_signal_async(ticker)
+    return response
+
+
+async def _compute_signals(tickers):
+    inference = asyncio.ensure_future(
+        _run_blocking("inference", model_generate_signals, tickers)
+    )
+
+    supported = [t for t in tickers if t in TICKERS]
+    prices = await asyncio.gather(*(load_prices_async(t) for t in supported))
+    prices = dict(zip(supported, prices))
+
+    results, errors = await asyncio.wait_for(inference, SIGNAL_TIMEOUT)
+
+    signals = [
+        build_response(ticker, result, prices[ticker])
+        for ticker, result in results.items()
+    ]
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "count": len(signals),
+        "signals": signals,
+        "errors": errors
+    }
+
+
+async def generate_signals_async(tickers=None):
+    tickers = list(dict.fromkeys(t.upper() for t in (tickers or TICKERS)))
+    return await _coalesce(
+        ("signals", tuple(tickers)),
+        lambda: _compute_signals(tickers)
+    )
+
+
+async def signal_history_async(ticker: str, start=None, end=None, limit=None):
+    """
+    Past signals from the precomputed history table (no model calls).
+    """
+    ticker = ticker.upper()
+
+    if ticker not in TICKERS:
+        raise FileNotFoundError(f"Ticker {ticker} not supported.")
+
+    return await _run_blocking(
+        "inference", signal_history.query, ticker, start, end, limit
+    )
+
+
+def shutdown():
+    while _executors:
+        _, executor = _executors.popitem()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,121 @@
+"""
+PTRE - Signal Response Cache
+
+A signal only changes when new bars arrive or models are retrained, so
+/api/signal responses are cached under the versions of their inputs:
+
+    (ticker, feature version, trend model version,
+     momentum model version, last price date)
+
+- A new key (rebuilt features, swapped model, new price bar) is a
+  miss; stale keys are never looked up again and age out of the LRU
+- At most RESPONSE_CACHE_ENTRIES responses are kept per process
+- The ETag is a hash of the key, so it is known before the response is
+  computed: a matching If-None-Match is answered with 304 without
+  touching the models, and every worker process gives the same ETag.
+  Responses are stored under the ETag, so the key is hashed once
+- The ETag covers the signal, not the response "timestamp" (the time
+  it was served), so it is a weak validator (W/"...")
+- Hits, misses, 304s and evictions are counted for /api/cache
+"""
+
+from collections import OrderedDict
+import hashlib
+import threading
+
+from src.config.settings import RESPONSE_CACHE_ENTRIES, RESPONSE_MAX_AGE
+
+
+def etag_for(key) -> str:
+    digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """
+    If-None-Match check (weak comparison, "*" matches anything).
+    """
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.removeprefix("W/") == etag.removeprefix("W/"):
+            return True
+
+    return False
+
+
+def cache_headers(etag: str, status: str = None) -> dict:
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={RESPONSE_MAX_AGE}, must-revalidate",
+    }
+    if status is not None:
+        headers["X-Cache"] = status
+    return headers
+
+
+class ResponseCache:
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Cached response for key, or None (counted as a miss).
+        Responses are shared between callers; do not mutate them.
+        """
+        with self._lock:
+            response = self._entries.get(key)
+            if response is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, key, response):
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+# Process-wide cache shared by the API
+response_cache = ResponseCache()
@@ -1,33 +1,35 @@
 from datetime import datetime
+from src.config.tickers import TICKERS
 from src.models.generate_final_signal import generate_signal as model_generate_signal
+from src.models.generate_final_signal import generate_signals as model_generate_signals
 from src.utils.market_data import load_price_series, calculate_volatility
+from src.utils.metrics import stage
 
 
-def generate_signal(ticker: str):
-    ticker = ticker.upper()
-
-    # 1️ Call ML layer
-    result = model_generate_signal(ticker)
-
-    # 2️ Load prices
+def load_prices(ticker: str, refresh: bool = True):
     try:
-        prices = load_price_series(ticker, period="1Y")
+        with stage("prices"):
+            return load_price_series(ticker, period="1Y", refresh=refresh)
     except FileNotFoundError:
-        prices = []
+        return []
 
-    # 3️ Volatility (API-level risk)
-    vol = calculate_volatility(prices)
 
+def volatility_label(vol):
     if vol is None:
-        vol_label = "Unknown"
+        return "Unknown"
     elif vol < 0.20:
-        vol_label = "Low"
+        return "Low"
     elif vol < 0.35:
-        vol_label = "Moderate"
+        return "Moderate"
     else:
-        vol_label = "High"
+        return "High"
+
+
+def build_response(ticker: str, result: dict, prices: list):
+    # Volatility (API-level risk)
+    with stage("volatility"):
+        vol = calculate_volatility(prices)
 
-    # 4️ Final API response
     return {
         "ticker": ticker,
         "timestamp": datetime.utcnow().isoformat(),
@@ -53,7 +55,7 @@ def generate_signal(ticker: str):
         },
 
         "risk": {
-            "volatility": vol_label,
+            "volatility": volatility_label(vol),
             "volatility_value": vol,
             "risk_score": int(result["confidence"])
         },
@@ -63,3 +65,38 @@ def generate_signal(ticker: str):
             "prices": prices
         }
     }
+
+
+def generate_signal(ticker: str):
+    ticker = ticker.upper()
+
+    # 1️ Call ML layer
+    result = model_generate_signal(ticker)
+
+    # 2️ Load prices
+    prices = load_prices(ticker)
+
+    # 3️ Final API response
+    return build_response(ticker, result, prices)
+
+
+def generate_signals(tickers=None):
+    """
+    Batch version of generate_signal: all tickers (default: TICKERS)
+    are scored in a single vectorized pass of the ML layer.
+    """
+    tickers = [t.upper() for t in (tickers or TICKERS)]
+
+    results, errors = model_generate_signals(tickers)
+
+    signals = [
+        build_response(ticker, result, load_prices(ticker))
+        for ticker, result in results.items()
+    ]
+
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "count": len(signals),
+        "signals": signals,
+        "errors": errors
+    }
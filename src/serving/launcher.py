@@ -0,0 +1,84 @@
+"""
+PTRE - Multi-Worker Launcher
+
+Starts the API with several uvicorn worker processes that share one
+copy of the models and latest features.
+
+- Publishes a generation (shared_state.publish) before the workers
+  start, then points them at it through PTRE_SHARED_SERVING
+- Watches the model pickles / .ptm exports and feature files; when one
+  changes, publishes a new generation, which every worker picks up
+  within SHARED_RELOAD_INTERVAL seconds
+- GET /api/workers reports each worker's RSS / USS / PSS next to the
+  size of the shared generation
+
+Run: python -m src.serving.launcher [--workers N] [--port 8000]
+"""
+
+import argparse
+import os
+import threading
+import time
+
+from src.config.settings import MODEL_LAYOUT, SERVING_WORKERS, SHARED_RELOAD_INTERVAL
+from src.serving.shared_state import SERVING_DIR, SHARED_ENV, fingerprint, publish
+
+
+def watch(layout: str, stop: threading.Event, interval: float = SHARED_RELOAD_INTERVAL):
+    """
+    Republish whenever a source file changes.
+    """
+    seen = fingerprint(layout=layout)
+
+    while not stop.wait(interval):
+        try:
+            current = fingerprint(layout=layout)
+            if current == seen:
+                continue
+
+            name = publish(layout=layout)
+            seen = current
+            print(f"[launcher] sources changed, published {name}")
+        except Exception as e:
+            # Keep serving the previous generation; retry next round
+            print(f"[launcher] publish failed → {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE multi-worker API")
+    parser.add_argument("--workers", type=int, default=SERVING_WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--layout", choices=["per_ticker", "pooled"], default=MODEL_LAYOUT)
+    parser.add_argument("--no-watch", action="store_true",
+                        help="do not republish when models or features change")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    start = time.perf_counter()
+    name = publish(layout=args.layout)
+    print(f"[launcher] published {name} in {time.perf_counter() - start:.2f}s")
+
+    # Inherited by the worker processes uvicorn spawns
+    os.environ[SHARED_ENV] = str(SERVING_DIR)
+
+    stop = threading.Event()
+    if not args.no_watch:
+        threading.Thread(
+            target=watch, args=(args.layout, stop), daemon=True
+        ).start()
+
+    try:
+        uvicorn.run(
+            "src.api.main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+        )
+    finally:
+        stop.set()
+
+
+if __name__ == "__main__":
+    main()
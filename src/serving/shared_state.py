@@ -0,0 +1,406 @@
+"""
+PTRE - Shared Serving State
+
+Lets several API worker processes serve from one copy of the models
+and latest features.
+
+- The parent publishes a generation: data/serving/gen-NNNNNN/ with
+  every model as a compact .ptm file and the latest feature row of
+  every ticker in one features.npy block
+- Generations are immutable; the CURRENT file names the live one and
+  is replaced atomically, so all workers move to a new generation on
+  their next check (every SHARED_RELOAD_INTERVAL seconds) and never
+  see a half-written one
+- Workers memory-map the files: the page cache holds one copy that
+  every worker shares, nothing is unpickled or re-parsed per process
+- Each worker reports its RSS / USS / PSS to data/serving/workers/,
+  which the /api/workers endpoint reads back
+
+Run: python -m src.serving.shared_state publish
+"""
+
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import psutil
+
+from src.config.settings import (
+    MODEL_LAYOUT,
+    SHARED_KEEP_GENERATIONS,
+    SHARED_RELOAD_INTERVAL,
+)
+from src.config.tickers import TICKERS
+
+# ABSOLUTE PROJECT ROOT (same convention as generate_final_signal)
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+SERVING_DIR = BASE_DIR / "data" / "serving"
+
+POINTER_NAME = "CURRENT"
+
+# Environment variable that puts an API process in shared mode; its
+# value is the serving directory
+SHARED_ENV = "PTRE_SHARED_SERVING"
+
+
+# =====================
+# Publish (parent side)
+# =====================
+
+def _write_atomic(path: Path, text: str):
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def read_pointer(serving_dir: Path = SERVING_DIR):
+    path = serving_dir / POINTER_NAME
+    if not path.exists():
+        return None
+    return path.read_text().strip() or None
+
+
+def _next_generation(serving_dir: Path) -> str:
+    numbers = [
+        int(p.name.split("-")[1]) for p in serving_dir.glob("gen-*")
+        if p.is_dir() and p.name.split("-")[1].isdigit()
+    ]
+    return f"gen-{max(numbers, default=0) + 1:06d}"
+
+
+def _publish_model(pickle_path: Path, out_path: Path):
+    """
+    Copy the exported .ptm when it is newer than its pickle,
+    otherwise compile the pickle.
+    """
+    compact = pickle_path.with_suffix(".ptm")
+
+    if compact.exists() and (
+        not pickle_path.exists()
+        or compact.stat().st_mtime_ns >= pickle_path.stat().st_mtime_ns
+    ):
+        shutil.copyfile(compact, out_path)
+        return
+
+    from src.models.compact_model import write_compact
+    from src.models.export_compact_models import compile_model
+    import joblib
+
+    write_compact(out_path, *compile_model(joblib.load(pickle_path)))
+
+
+def source_files(tickers=None, layout: str = MODEL_LAYOUT):
+    """
+    Files a generation is built from (models + feature files).
+    """
+    from src.features.feature_store import FeatureStore
+    from src.models.model_registry import MODEL_KINDS, ModelRegistry
+
+    tickers = list(tickers or TICKERS)
+    registry = ModelRegistry(tickers, layout=layout, model_format="pickle")
+
+    models = {
+        (t, k): registry.path_for(t, k)
+        for t in tickers for k in MODEL_KINDS
+    }
+    # Fresh instances: the process-wide ones may be attached to a generation
+    store = FeatureStore()
+    features = {t: store.path_for(t) for t in tickers}
+
+    return models, features
+
+
+def publish(tickers=None, layout: str = MODEL_LAYOUT,
+            serving_dir: Path = SERVING_DIR) -> str:
+    """
+    Build a new generation and make it current. Returns its name.
+    """
+    tickers = list(tickers or TICKERS)
+    serving_dir.mkdir(parents=True, exist_ok=True)
+
+    models, features = source_files(tickers, layout)
+
+    name = _next_generation(serving_dir)
+    tmp_dir = serving_dir / f"{name}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    try:
+        manifest = _build_generation(name, tmp_dir, tickers, layout, models, features)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    with open(tmp_dir / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    tmp_dir.rename(serving_dir / name)
+    _write_atomic(serving_dir / POINTER_NAME, name)
+
+    prune(serving_dir)
+
+    return name
+
+
+def _build_generation(name, tmp_dir, tickers, layout, models, features) -> dict:
+    from src.features.feature_registry import FEATURE_DTYPE
+    from src.features.feature_store import read_last_parquet_row, read_last_row
+    from src.utils.storage import SUFFIXES
+
+    # Models: one file per distinct source (a pooled file serves every ticker)
+    model_files = {}
+    for (ticker, kind), pickle_path in models.items():
+        if not pickle_path.exists() and not pickle_path.with_suffix(".ptm").exists():
+            continue
+
+        out_name = pickle_path.with_suffix(".ptm").name
+        if out_name not in model_files.values():
+            _publish_model(pickle_path, tmp_dir / out_name)
+        model_files[f"{ticker}:{kind}"] = out_name
+
+    # Latest feature row of every ticker, one FEATURE_DTYPE block
+    rows, dates, columns = [], [], None
+    for ticker in tickers:
+        path = features[ticker]
+        if not path.exists():
+            continue
+
+        if path.suffix == SUFFIXES["parquet"]:
+            row = read_last_parquet_row(path)
+        else:
+            row = read_last_row(path)
+
+        if columns is None:
+            columns = list(row.columns)
+
+        rows.append((ticker, row[columns].to_numpy(dtype=FEATURE_DTYPE)[0]))
+        dates.append(str(pd.Timestamp(row.index[0]).date()))
+
+    if rows:
+        np.save(tmp_dir / "features.npy", np.vstack([values for _, values in rows]))
+
+    return {
+        "generation": name,
+        "created_at": datetime.utcnow().isoformat(),
+        "layout": layout,
+        "models": model_files,
+        "features": {
+            "tickers": [t for t, _ in rows],
+            "dates": dates,
+            "columns": columns,
+        },
+    }
+
+
+def prune(serving_dir: Path = SERVING_DIR, keep: int = SHARED_KEEP_GENERATIONS):
+    """
+    Delete all but the newest `keep` generations (workers still on an
+    older one keep their mappings: unlinked files stay readable).
+    """
+    current = read_pointer(serving_dir)
+    generations = sorted(
+        p for p in serving_dir.glob("gen-*")
+        if p.is_dir() and not p.name.endswith(".tmp")
+    )
+
+    for path in generations[:-keep]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def fingerprint(tickers=None, layout: str = MODEL_LAYOUT) -> dict:
+    """
+    (mtime, size) of every source file; a change means republish.
+    """
+    models, features = source_files(tickers, layout)
+
+    paths = [*features.values()]
+    for path in models.values():
+        paths += [path, path.with_suffix(".ptm")]
+
+    versions = {}
+    for p in paths:
+        if p.exists():
+            stat = p.stat()
+            versions[str(p)] = (stat.st_mtime_ns, stat.st_size)
+
+    return versions
+
+
+# =====================
+# Attach (worker side)
+# =====================
+
+class Generation:
+    """
+    One mapped generation. Immutable once loaded.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+
+        with open(path / "manifest.json") as f:
+            self.manifest = json.load(f)
+
+        self.layout = self.manifest["layout"]
+        self.models = self.manifest["models"]
+
+        meta = self.manifest["features"]
+        self.columns = meta["columns"]
+        self.rows = {t: i for i, t in enumerate(meta["tickers"])}
+        self.dates = pd.to_datetime(meta["dates"])
+
+        block = path / "features.npy"
+        self.features = np.load(block, mmap_mode="r") if block.exists() else None
+
+    def model_path(self, ticker: str, kind: str) -> Path:
+        name = self.models.get(f"{ticker}:{kind}")
+        return self.path / (name or f"{ticker}_{kind}.ptm")
+
+    def latest(self, ticker: str) -> pd.DataFrame:
+        i = self.rows.get(ticker)
+        if i is None:
+            raise FileNotFoundError(f"Missing features for {ticker}")
+
+        return pd.DataFrame(
+            self.features[i:i + 1],
+            index=self.dates[i:i + 1],
+            columns=self.columns,
+            copy=False
+        )
+
+    def shared_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self.path.iterdir() if p.is_file())
+
+
+class SharedSnapshot:
+    """
+    Worker-side handle on the current generation. current() re-reads
+    the pointer at most every SHARED_RELOAD_INTERVAL seconds.
+    """
+
+    def __init__(self, serving_dir: Path = SERVING_DIR,
+                 interval: float = SHARED_RELOAD_INTERVAL):
+        self.serving_dir = Path(serving_dir)
+        self.interval = interval
+
+        self._generation = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> Generation:
+        now = time.monotonic()
+        generation = self._generation
+
+        if generation is not None and now - self._checked < self.interval:
+            return generation
+
+        with self._lock:
+            self._checked = now
+            name = read_pointer(self.serving_dir)
+
+            if name is None:
+                raise FileNotFoundError(
+                    f"No published generation in {self.serving_dir}"
+                )
+
+            if self._generation is None or self._generation.name != name:
+                self._generation = Generation(self.serving_dir / name)
+
+            return self._generation
+
+
+# =====================
+# Worker memory reports
+# =====================
+
+def _workers_dir(serving_dir: Path) -> Path:
+    return serving_dir / "workers"
+
+
+def memory_report(snapshot: SharedSnapshot = None) -> dict:
+    process = psutil.Process()
+    info = process.memory_full_info()
+
+    report = {
+        "pid": process.pid,
+        "rss_mb": round(info.rss / 2**20, 2),
+        "uss_mb": round(info.uss / 2**20, 2),
+        "pss_mb": round(getattr(info, "pss", 0) / 2**20, 2),
+        "shared_mb": round(getattr(info, "shared", 0) / 2**20, 2),
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+    if snapshot is not None:
+        generation = snapshot.current()
+        report["generation"] = generation.name
+        report["generation_mb"] = round(generation.shared_bytes() / 2**20, 2)
+
+    return report
+
+
+def write_report(snapshot: SharedSnapshot) -> dict:
+    report = memory_report(snapshot)
+
+    directory = _workers_dir(snapshot.serving_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    _write_atomic(directory / f"{report['pid']}.json", json.dumps(report))
+
+    return report
+
+
+def read_reports(serving_dir: Path = SERVING_DIR) -> list:
+    """
+    Reports of live workers; files of exited workers are removed.
+    """
+    reports = []
+    for path in sorted(_workers_dir(serving_dir).glob("*.json")):
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+
+        if not psutil.pid_exists(pid):
+            path.unlink(missing_ok=True)
+            continue
+
+        try:
+            with open(path) as f:
+                reports.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE shared serving state")
+    parser.add_argument("command", choices=["publish", "status"])
+    parser.add_argument("--layout", choices=["per_ticker", "pooled"], default=MODEL_LAYOUT)
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        start = time.perf_counter()
+        name = publish(layout=args.layout)
+        print(f"Published {name} in {time.perf_counter() - start:.2f}s → "
+              f"{SERVING_DIR / name}")
+        return
+
+    name = read_pointer()
+    print(f"Current generation: {name}")
+    for report in read_reports():
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
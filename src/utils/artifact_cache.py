@@ -0,0 +1,225 @@
+"""
+PTRE - Artifact Cache
+
+Content-addressed cache for pipeline outputs, so a stage whose inputs
+and settings did not change is never recomputed.
+
+- A stage key is the SHA-256 of: stage name, the content hash of every
+  input file and of the stage's own code, the output file names and
+  the stage's config values (horizons, thresholds, HGB params, ...)
+- Outputs are stored once under data/cache/objects/<sha256>
+- On a hit, outputs that already hold the cached bytes are left
+  untouched (mtime kept); missing or different ones are restored
+- Entries live in data/cache/entries/<key>.json with the hashes of
+  their inputs and outputs (lineage)
+- prune() keeps the ARTIFACT_CACHE_KEEP most recently used entries of
+  each stage output and deletes objects no kept entry references
+"""
+
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from src.config.settings import ARTIFACT_CACHE, ARTIFACT_CACHE_KEEP
+
+# ABSOLUTE PROJECT ROOT (same convention as generate_final_signal)
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+CACHE_DIR = BASE_DIR / "data" / "cache"
+
+# Code every stage depends on (how datasets are read and written)
+SHARED_CODE = [BASE_DIR / "src" / "utils" / "storage.py"]
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+# =====================
+# Hashing
+# =====================
+
+# (path, mtime_ns, size) -> sha256; files are only re-hashed when touched
+_hash_memo = {}
+_hash_lock = threading.Lock()
+
+
+def file_hash(path: Path) -> str:
+    path = Path(path).resolve()
+    stat = path.stat()
+    memo_key = (str(path), stat.st_mtime_ns, stat.st_size)
+
+    cached = _hash_memo.get(memo_key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    sha = digest.hexdigest()
+    with _hash_lock:
+        _hash_memo[memo_key] = sha
+
+    return sha
+
+
+def display_path(path: Path) -> str:
+    """
+    Project-relative path when possible (stable across checkouts).
+    """
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(BASE_DIR).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def stage_key(stage: str, inputs, outputs, config: dict = None,
+              code=()) -> tuple:
+    """
+    Returns (key, lineage) for a stage run.
+    """
+    lineage = {
+        "stage": stage,
+        "inputs": {display_path(p): file_hash(p) for p in inputs},
+        "code": {display_path(p): file_hash(p) for p in [*code, *SHARED_CODE]},
+        "outputs": [Path(p).name for p in outputs],
+        "config": config or {},
+    }
+
+    blob = json.dumps(lineage, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest(), lineage
+
+
+# =====================
+# Cache
+# =====================
+
+def _atomic_copy(src: Path, dst: Path):
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+class ArtifactCache:
+
+    def __init__(self, root: Path = CACHE_DIR, enabled: bool = ARTIFACT_CACHE):
+        self.root = Path(root)
+        self.enabled = enabled
+
+    def _entry_path(self, key: str) -> Path:
+        return self.root / "entries" / f"{key}.json"
+
+    def _object_path(self, sha: str) -> Path:
+        return self.root / "objects" / sha[:2] / sha
+
+    def lookup(self, key: str):
+        path = self._entry_path(key)
+        if not self.enabled or not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def restore(self, key: str, outputs) -> bool:
+        """
+        Bring outputs to their cached content. False on a miss.
+        """
+        entry = self.lookup(key)
+        if entry is None:
+            return False
+
+        hashes = entry["output_hashes"]
+        if len(hashes) != len(outputs):
+            return False
+
+        objects = [self._object_path(sha) for sha in hashes]
+        if not all(obj.exists() for obj in objects):
+            return False
+
+        for out, sha, obj in zip(outputs, hashes, objects):
+            out = Path(out)
+            if out.exists() and file_hash(out) == sha:
+                continue
+            _atomic_copy(obj, out)
+
+        # Entry mtime = last use, for prune()
+        os.utime(self._entry_path(key))
+        return True
+
+    def store(self, key: str, outputs, lineage: dict) -> dict:
+        """
+        Record freshly computed outputs under key.
+        """
+        if not self.enabled:
+            return None
+
+        hashes = []
+        for out in outputs:
+            sha = file_hash(out)
+            obj = self._object_path(sha)
+            if not obj.exists():
+                _atomic_copy(Path(out), obj)
+            hashes.append(sha)
+
+        entry = dict(
+            lineage,
+            key=key,
+            output_hashes=hashes,
+            created_at=datetime.utcnow().isoformat(),
+        )
+
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(entry, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+        return entry
+
+    def prune(self, keep: int = ARTIFACT_CACHE_KEEP) -> dict:
+        """
+        Drop all but the keep most recently used entries of each
+        (stage, outputs), then every object no remaining entry refers
+        to. Not safe while stages are storing.
+        Returns {"entries": n, "objects": n, "bytes": n} removed.
+        """
+        removed = {"entries": 0, "objects": 0, "bytes": 0}
+        if not self.enabled:
+            return removed
+
+        groups = {}
+        for path in (self.root / "entries").glob("*.json"):
+            with open(path) as f:
+                entry = json.load(f)
+            group = (entry["stage"], tuple(entry["outputs"]))
+            groups.setdefault(group, []).append((path.stat().st_mtime_ns, path, entry))
+
+        referenced = set()
+        for entries in groups.values():
+            entries.sort(key=lambda e: e[0], reverse=True)
+
+            for _, _, entry in entries[:keep]:
+                referenced.update(entry["output_hashes"])
+
+            for _, path, _ in entries[keep:]:
+                path.unlink()
+                removed["entries"] += 1
+
+        for obj in (self.root / "objects").glob("*/*"):
+            if obj.name in referenced:
+                continue
+            removed["bytes"] += obj.stat().st_size
+            obj.unlink()
+            removed["objects"] += 1
+
+        return removed
+
+
+# Process-wide cache shared by the pipeline stages
+artifact_cache = ArtifactCache()
@@ -1,58 +1,278 @@
-import yfinance as yf
-from datetime import datetime
+"""
+PTRE - Market Data (price series for the API)
 
-def load_price_series(ticker: str, period: str = "6M"):
+Serves close-price series for frontend charts from one cached array
+per ticker instead of downloading a year of data on every request.
+
+- History is seeded from the stored {ticker}_clean dataset (adj_close)
+- Only bars newer than the cache are fetched, at most once per TTL,
+  as adjusted closes (the same column), from the last cached bar on:
+  when that bar comes back at a new adjustment (a split or dividend
+  since), the cached history is rescaled to it
+- 1M / 3M / 6M / 1Y are slices of the same cached array
+- The fetcher is pluggable so tests can run without network access
+"""
+
+from pathlib import Path
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.utils.metrics import stage
+from src.utils.storage import locate, read_frame
+
+# ABSOLUTE PROJECT ROOT (same convention as generate_final_signal)
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+
+# Frontend periods -> calendar look-back from the latest bar
+PERIOD_OFFSETS = {
+    "1M": pd.DateOffset(months=1),
+    "3M": pd.DateOffset(months=3),
+    "6M": pd.DateOffset(months=6),
+    "1Y": pd.DateOffset(years=1),
+}
+
+DEFAULT_PERIOD = "6M"
+
+# Seconds before the cache asks the fetcher for newer bars again
+PRICE_TTL_SECONDS = 15 * 60
+
+
+# =====================
+# Fetchers
+# =====================
+# A fetcher takes (ticker, start) and returns an adjusted close-price
+# Series (what the clean dataset stores as adj_close) indexed by date,
+# from start inclusive. start=None means "the longest period we serve".
+
+def yfinance_fetcher(ticker: str, start=None) -> pd.Series:
+    import yfinance as yf
+
+    # auto_adjust=False + "Adj Close", as in download_data
+    if start is None:
+        df = yf.download(ticker, period="1y", interval="1d",
+                         auto_adjust=False, progress=False)
+    else:
+        df = yf.download(ticker, start=start, interval="1d",
+                         auto_adjust=False, progress=False)
+
+    if df.empty:
+        return pd.Series(dtype=float)
+
+    close = df["Adj Close"]
+
+    # Newer yfinance returns (field, ticker) MultiIndex columns
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+
+    return close
+
+
+def offline_fetcher(ticker: str, start=None) -> pd.Series:
     """
-    Returns list of {date, close} dicts for frontend charts
+    Local stand-in: never touches the network, serves disk data only.
     """
+    return pd.Series(dtype=float)
 
-    ticker = ticker.upper()
 
-    # Map frontend periods to yfinance periods
-    PERIOD_MAP = {
-        "1M": "1mo",
-        "3M": "3mo",
-        "6M": "6mo",
-        "1Y": "1y"
-    }
+# =====================
+# Price service
+# =====================
 
-    yf_period = PERIOD_MAP.get(period, "6mo")
+class _PriceEntry:
 
-    df = yf.download(
-        ticker,
-        period=yf_period,
-        interval="1d",
-        progress=False
-    )
+    __slots__ = ("dates", "closes", "fetched_at")
 
-    if df.empty:
-        raise FileNotFoundError(f"No price data for {ticker}")
+    def __init__(self, dates, closes, fetched_at):
+        self.dates = dates
+        self.closes = closes
+        self.fetched_at = fetched_at
 
-    prices = []
-    for idx, row in df.iterrows():
-        prices.append({
-            "date": idx.strftime("%Y-%m-%d"),
-            "close": round(float(row["Close"]), 2)
-        })
 
-    return prices
+def _to_arrays(series: pd.Series):
+    series = pd.to_numeric(series, errors="coerce").dropna()
+    index = pd.to_datetime(series.index, errors="coerce")
+
+    valid = ~index.isna()
+    dates = index[valid].values.astype("datetime64[D]")
+    closes = series.values[valid].astype(float)
+
+    return dates, closes
+
+
+def _merge(dates, closes, new_dates, new_closes):
+    """
+    Append fetched bars; a refetched date replaces the cached value.
+    Adjusted closes are rescaled back in time on every split or
+    dividend, so when the first fetched bar is cached at a different
+    value, the cached history is scaled to the fetched adjustment.
+    """
+    if len(new_dates) == 0:
+        return dates, closes
+
+    i = np.searchsorted(dates, new_dates[0])
+    if i < len(dates) and dates[i] == new_dates[0] and closes[i] > 0:
+        ratio = new_closes[0] / closes[i]
+        if not np.isclose(ratio, 1.0, rtol=1e-6):
+            closes = closes * ratio
+
+    keep = dates < new_dates[0]
+    dates = np.concatenate([dates[keep], new_dates])
+    closes = np.concatenate([closes[keep], new_closes])
+
+    return dates, closes
+
+
+class PriceService:
+
+    def __init__(self, fetcher=None, ttl: float = PRICE_TTL_SECONDS,
+                 processed_dir: Path = PROCESSED_DIR):
+        self.fetcher = fetcher or yfinance_fetcher
+        self.ttl = ttl
+        self.processed_dir = Path(processed_dir)
+
+        self._entries = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def set_fetcher(self, fetcher):
+        self.fetcher = fetcher
+        self.clear()
+
+    def clear(self):
+        self._entries.clear()
+
+    def _lock_for(self, ticker: str):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _load_local(self, ticker: str):
+        path = locate(self.processed_dir, f"{ticker}_clean")
+
+        if not path.exists():
+            empty = np.array([], dtype="datetime64[D]")
+            return empty, np.array([], dtype=float)
+
+        df = read_frame(path, columns=["adj_close"])
+        return _to_arrays(df["adj_close"])
+
+    def _refresh(self, ticker: str, entry):
+        if entry is None:
+            dates, closes = self._load_local(ticker)
+        else:
+            dates, closes = entry.dates, entry.closes
+
+        # Refetch the last cached bar too: it anchors the adjustment
+        start = None
+        if len(dates):
+            start = pd.Timestamp(dates[-1])
+
+        try:
+            if start is None or start.normalize() < pd.Timestamp.now().normalize():
+                with stage("price_fetch"):
+                    fetched = self.fetcher(ticker, start)
+                new_dates, new_closes = _to_arrays(fetched)
+                dates, closes = _merge(dates, closes, new_dates, new_closes)
+        except Exception as e:
+            # Upstream failure -> keep serving what we have until next TTL
+            logger.warning("Price fetch failed for %s: %s", ticker, e)
+
+        return _PriceEntry(dates, closes, time.monotonic())
+
+    def arrays(self, ticker: str, refresh: bool = True):
+        """
+        Cached (dates, closes) arrays for ticker, refreshed after TTL.
+        With refresh=False the fetcher is never called: cached arrays,
+        or local disk data on a cold cache, are returned as-is.
+        """
+        ticker = ticker.upper()
+
+        entry = self._entries.get(ticker)
+        if entry is not None and time.monotonic() - entry.fetched_at < self.ttl:
+            return entry.dates, entry.closes
+
+        if not refresh:
+            if entry is not None:
+                return entry.dates, entry.closes
+            return self._load_local(ticker)
+
+        # One refresh per ticker at a time; others wait and reuse it
+        with self._lock_for(ticker):
+            current = self._entries.get(ticker)
+            if current is not entry and current is not None:
+                return current.dates, current.closes
+
+            entry = self._refresh(ticker, current)
+            self._entries[ticker] = entry
+
+        return entry.dates, entry.closes
+
+    def window(self, ticker: str, period: str = DEFAULT_PERIOD,
+               refresh: bool = True):
+        """
+        (dates, closes) views covering the requested period.
+        """
+        dates, closes = self.arrays(ticker, refresh=refresh)
+
+        if len(dates) == 0:
+            raise FileNotFoundError(f"No price data for {ticker}")
+
+        offset = PERIOD_OFFSETS.get(period, PERIOD_OFFSETS[DEFAULT_PERIOD])
+        start = (pd.Timestamp(dates[-1]) - offset).to_datetime64()
+        i = np.searchsorted(dates, start.astype("datetime64[D]"), side="right")
+
+        return dates[i:], closes[i:]
+
+    def load(self, ticker: str, period: str = DEFAULT_PERIOD,
+             refresh: bool = True):
+        dates, closes = self.window(ticker, period, refresh=refresh)
+
+        # Bulk column conversion (no per-row pandas access)
+        date_strs = np.datetime_as_string(dates, unit="D").tolist()
+        close_vals = np.round(closes, 2).tolist()
+
+        return [
+            {"date": d, "close": c}
+            for d, c in zip(date_strs, close_vals)
+        ]
+
+
+# Process-wide service shared by the API
+price_service = PriceService()
+
+
+def load_price_series(ticker: str, period: str = "6M", refresh: bool = True):
+    """
+    Returns list of {date, close} dicts for frontend charts
+    """
+    return price_service.load(ticker, period, refresh=refresh)
 
-import numpy as np
 
 def calculate_volatility(prices):
     """
-    prices: list of {date, close}
+    prices: list of {date, close}, or an array of closes
     returns annualized volatility
     """
 
     if len(prices) < 20:
         return None
 
-    closes = np.array([p["close"] for p in prices])
-    log_returns = np.diff(np.log(closes))
+    if isinstance(prices, np.ndarray):
+        closes = prices.astype(float, copy=False)
+    else:
+        closes = np.fromiter((p["close"] for p in prices), dtype=float, count=len(prices))
+
+    log_closes = np.log(closes)
+    log_returns = log_closes[1:] - log_closes[:-1]
 
     daily_vol = np.std(log_returns)
     annual_vol = daily_vol * np.sqrt(252)
 
     return round(float(annual_vol), 4)
-
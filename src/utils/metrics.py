@@ -0,0 +1,179 @@
+"""
+PTRE - Latency Metrics
+
+Per-stage timing of the serving path, kept in-process and exported in
+Prometheus text format on GET /metrics.
+
+- stage("trend_predict") times a block and records it in that stage's
+  histogram (fixed buckets, cumulative counts, sum and count)
+- A request can open a trace (start_trace): every stage timed while it
+  is active, in any thread, is also added to the request's breakdown,
+  which /api/signal returns as a Server-Timing header on request
+- The trace lives in a contextvar; executor jobs must run in a copy of
+  the caller's context (run_in_context) to report into it
+- Metrics are per process: with several workers each one reports its
+  own histograms
+"""
+
+from contextlib import contextmanager
+import contextvars
+import functools
+import threading
+import time
+
+# Seconds; +Inf is implicit
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+METRIC_PREFIX = "ptre"
+
+# stage -> seconds of the current request (None outside a trace)
+_trace = contextvars.ContextVar("ptre_trace", default=None)
+
+
+# =====================
+# Histograms
+# =====================
+
+class Histogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """
+        (cumulative bucket counts incl. +Inf, sum, count)
+        """
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+
+        return cumulative, total, count
+
+
+class StageMetrics:
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, Histogram())
+        return histogram
+
+    def observe(self, stage: str, seconds: float):
+        self.histogram(stage).observe(seconds)
+
+        trace = _trace.get()
+        if trace is not None:
+            trace[stage] = trace.get(stage, 0.0) + seconds
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition of every stage histogram.
+        """
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines = [
+            f"# HELP {name} Time spent in each serving stage.",
+            f"# TYPE {name} histogram",
+        ]
+
+        with self._lock:
+            stages = sorted(self._histograms.items())
+
+        for stage, histogram in stages:
+            cumulative, total, count = histogram.snapshot()
+            bounds = [_format(b) for b in histogram.buckets] + ["+Inf"]
+
+            for bound, c in zip(bounds, cumulative):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {c}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _format(value: float) -> str:
+    return repr(float(value))
+
+
+# Process-wide metrics shared by the API
+stage_metrics = StageMetrics()
+
+
+# =====================
+# Timing helpers
+# =====================
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_metrics.observe(name, time.perf_counter() - start)
+
+
+def start_trace() -> dict:
+    """
+    Collect the stages of the current request (this context and the
+    contexts copied from it) into the returned dict.
+    """
+    trace = {}
+    _trace.set(trace)
+    return trace
+
+
+def run_in_context(fn, *args):
+    """
+    Callable running fn(*args) in a copy of the current context, for
+    executor jobs (run_in_executor does not propagate contextvars).
+    """
+    context = contextvars.copy_context()
+    return functools.partial(context.run, fn, *args)
+
+
+def server_timing(trace: dict) -> str:
+    """
+    Server-Timing header value (durations in milliseconds).
+    """
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in trace.items()
+    )
+
+
+def render_counter(name: str, help_text: str, label: str, values: dict) -> str:
+    """
+    Prometheus text for one counter with a value per label value.
+    """
+    name = f"{METRIC_PREFIX}_{name}"
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    lines += [f'{name}{{{label}="{key}"}} {value}' for key, value in values.items()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,345 @@
+"""
+PTRE - Dataset Storage
+
+One read/write path for the clean, feature and label datasets.
+
+- "parquet": columnar and typed (DatetimeIndex, numeric columns),
+  optional float32 columns, column projection on read
+- "csv": the original text files, still readable everywhere
+- Readers use whichever file exists, preferring STORAGE_FORMAT, so
+  CSV-only checkouts keep working before migration
+- Every frame leaves here with a sorted DatetimeIndex; rows whose date
+  does not parse (leftover "Date"/"Ticker" header rows) are dropped
+- With COMPACT_DTYPES, the feature dataset is read and written as
+  float32 unless a caller asks otherwise
+
+Run:
+  python -m src.utils.storage migrate [--float32] [--remove-csv]
+  python -m src.utils.storage benchmark
+"""
+
+from pathlib import Path
+import argparse
+import importlib.util
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config.settings import COMPACT_DTYPES, STORAGE_FORMAT
+from src.config.tickers import TICKERS
+
+# ABSOLUTE PROJECT ROOT (same convention as generate_final_signal)
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+PROCESSED_DIR = BASE_DIR / "data" / "processed"
+
+# dataset -> (directory, file stem)
+DATASETS = {
+    "clean": (PROCESSED_DIR, "{ticker}_clean"),
+    "features": (PROCESSED_DIR / "features", "{ticker}_features"),
+    "labels": (PROCESSED_DIR / "labels", "{ticker}_labels"),
+    "momentum_labels": (
+        PROCESSED_DIR / "momentum_labels", "{ticker}_momentum_labels"
+    ),
+    "signals": (PROCESSED_DIR / "signals", "{ticker}_signals"),
+}
+
+# Datasets stored as float32 with COMPACT_DTYPES (prices and label
+# returns keep float64)
+COMPACT_DATASETS = ("features",)
+
+SUFFIXES = {
+    "parquet": ".parquet",
+    "csv": ".csv",
+}
+
+BENCHMARK_REPEATS = 5
+
+
+# =====================
+# Paths
+# =====================
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def default_format() -> str:
+    if STORAGE_FORMAT == "parquet" and not parquet_available():
+        return "csv"
+    return STORAGE_FORMAT
+
+
+def locate(directory: Path, stem: str, fmt: str = None) -> Path:
+    """
+    Path of stem in directory. With fmt, exactly that format; otherwise
+    the existing file (preferring the default format), or the path a
+    default-format write would create.
+    """
+    directory = Path(directory)
+
+    if fmt is not None:
+        return directory / f"{stem}{SUFFIXES[fmt]}"
+
+    preferred = default_format()
+    order = [preferred] + [f for f in SUFFIXES if f != preferred]
+
+    for f in order:
+        path = directory / f"{stem}{SUFFIXES[f]}"
+        if path.exists():
+            return path
+
+    return directory / f"{stem}{SUFFIXES[preferred]}"
+
+
+def dataset_path(dataset: str, ticker: str, fmt: str = None) -> Path:
+    directory, stem = DATASETS[dataset]
+    return locate(directory, stem.format(ticker=ticker), fmt)
+
+
+# =====================
+# Frames
+# =====================
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+
+    index = pd.to_datetime(df.index, errors="coerce")
+    valid = ~index.isna()
+
+    df = df[valid]
+    df.index = index[valid]
+
+    return df.sort_index()
+
+
+def _to_float32(df: pd.DataFrame) -> pd.DataFrame:
+    floats = df.select_dtypes("float64").columns
+    if len(floats) == 0:
+        return df
+    return df.astype({col: np.float32 for col in floats})
+
+
+def read_frame(path: Path, columns=None, float32: bool = False) -> pd.DataFrame:
+    """
+    Read a stored dataset (format from the suffix).
+    columns: optional projection; float32: downcast float64 columns.
+    """
+    path = Path(path)
+
+    if path.suffix == SUFFIXES["parquet"]:
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        usecols = None
+        if columns is not None:
+            index_col = pd.read_csv(path, nrows=0).columns[0]
+            keep = {index_col, *columns}
+            usecols = lambda col: col in keep
+        df = pd.read_csv(path, index_col=0, usecols=usecols)
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    df = _normalize(df)
+
+    return _to_float32(df) if float32 else df
+
+
+def write_frame(df: pd.DataFrame, path: Path, float32: bool = False) -> Path:
+    """
+    Write df to path (format from the suffix), replacing it atomically.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    df = _normalize(df)
+    if float32:
+        df = _to_float32(df)
+
+    tmp = path.with_name(path.name + ".tmp")
+
+    if path.suffix == SUFFIXES["parquet"]:
+        df.to_parquet(tmp, engine="pyarrow")
+    else:
+        df.to_csv(tmp)
+
+    os.replace(tmp, path)
+    return path
+
+
+def _compact(dataset: str, float32) -> bool:
+    if float32 is None:
+        return COMPACT_DTYPES and dataset in COMPACT_DATASETS
+    return float32
+
+
+def read_dataset(dataset: str, ticker: str, columns=None,
+                 float32: bool = None) -> pd.DataFrame:
+    """
+    float32: downcast float columns (None means the COMPACT_DTYPES default)
+    """
+    path = dataset_path(dataset, ticker)
+
+    if not path.exists():
+        raise FileNotFoundError(f"Missing {dataset} data for {ticker}")
+
+    return read_frame(path, columns=columns, float32=_compact(dataset, float32))
+
+
+def write_path(dataset: str, ticker: str, fmt: str = None) -> Path:
+    """
+    Path that write_dataset creates for this dataset.
+    """
+    return dataset_path(dataset, ticker, fmt or default_format())
+
+
+def write_dataset(df: pd.DataFrame, dataset: str, ticker: str,
+                  fmt: str = None, float32: bool = None) -> Path:
+    return write_frame(
+        df, write_path(dataset, ticker, fmt), float32=_compact(dataset, float32)
+    )
+
+
+def _has_header_rows(path: Path, lines: int = 3) -> bool:
+    # Legacy yfinance CSVs carry "Ticker"/"Date" rows under the header
+    with open(path) as f:
+        next(f, None)
+        for _, line in zip(range(lines), f):
+            field = line.split(",", 1)[0].strip()
+            if pd.isna(pd.to_datetime(field, errors="coerce")):
+                return True
+    return False
+
+
+def append_dataset(rows: pd.DataFrame, dataset: str, ticker: str) -> Path:
+    """
+    Append rows to the existing file of a dataset (same format).
+    """
+    path = dataset_path(dataset, ticker)
+
+    # A legacy CSV is rewritten clean once; later appends go straight on
+    if path.suffix == SUFFIXES["csv"] and not _has_header_rows(path):
+        _normalize(rows).to_csv(path, mode="a", header=False)
+        return path
+
+    # Parquet files are immutable: rewrite with the new rows
+    df = pd.concat([read_frame(path), rows])
+    return write_frame(df, path, float32=_compact(dataset, None))
+
+
+# =====================
+# Migration
+# =====================
+
+def migrate(float32: bool = False, remove_csv: bool = False):
+    """
+    Convert existing CSV datasets to Parquet. float32 applies to
+    COMPACT_DATASETS only: prices and label returns stay float64.
+    """
+    if not parquet_available():
+        raise ImportError("pyarrow is required for Parquet storage")
+
+    for dataset in DATASETS:
+        for ticker in TICKERS:
+            src = dataset_path(dataset, ticker, "csv")
+            if not src.exists():
+                continue
+
+            df = read_frame(src)
+            dst = write_frame(df, dataset_path(dataset, ticker, "parquet"),
+                              float32=float32 and dataset in COMPACT_DATASETS)
+
+            print(
+                f"{dataset:<16} {ticker:<6} {len(df):>5} rows  "
+                f"{src.stat().st_size / 1024:8.1f} KB → "
+                f"{dst.stat().st_size / 1024:8.1f} KB"
+            )
+
+            if remove_csv:
+                src.unlink()
+
+
+# =====================
+# Benchmark
+# =====================
+
+def _legacy_csv_read(path: Path, columns=None) -> pd.DataFrame:
+    # What the trainers did before this module existed
+    df = pd.read_csv(path, index_col=0, parse_dates=True)
+    if columns is not None:
+        df = df[columns]
+    df.index = pd.to_datetime(df.index, errors="coerce")
+    return df[~df.index.isna()].sort_index()
+
+
+def _best_time(fn, repeats: int = BENCHMARK_REPEATS) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(repeats: int = BENCHMARK_REPEATS):
+    """
+    Read times of every stored feature file: CSV vs Parquet,
+    all columns and the MOMENTUM_FEATURES projection.
+    """
+    from src.models.calibrate_momentum import MOMENTUM_FEATURES
+
+    cases = {
+        "csv (legacy read)": lambda p, c: _legacy_csv_read(p["csv"]),
+        "csv momentum": lambda p, c: _legacy_csv_read(p["csv"], c),
+        "parquet": lambda p, c: read_frame(p["parquet"]),
+        "parquet momentum": lambda p, c: read_frame(p["parquet"], columns=c),
+        "parquet float32": lambda p, c: read_frame(p["parquet"], float32=True),
+    }
+
+    totals = dict.fromkeys(cases, 0.0)
+
+    for ticker in TICKERS:
+        paths = {f: dataset_path("features", ticker, f) for f in SUFFIXES}
+        if not all(p.exists() for p in paths.values()):
+            print(f"{ticker}: needs both CSV and Parquet features, skipping")
+            continue
+
+        for name, case in cases.items():
+            totals[name] += _best_time(
+                lambda: case(paths, MOMENTUM_FEATURES), repeats
+            )
+
+    baseline = totals["csv (legacy read)"]
+
+    print(f"\nFeature read time, all tickers (best of {repeats}):\n")
+    for name, total in totals.items():
+        speedup = baseline / total if total else float("nan")
+        print(f"{name:<20} {total * 1000:9.2f} ms   {speedup:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PTRE dataset storage")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    mig = sub.add_parser("migrate", help="convert CSV datasets to Parquet")
+    mig.add_argument("--float32", action="store_true",
+                     help="store feature columns as float32")
+    mig.add_argument("--remove-csv", action="store_true",
+                     help="delete each CSV after conversion")
+
+    bench = sub.add_parser("benchmark", help="compare CSV and Parquet reads")
+    bench.add_argument("--repeats", type=int, default=BENCHMARK_REPEATS)
+
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate(float32=args.float32, remove_csv=args.remove_csv)
+    else:
+        benchmark(repeats=args.repeats)
+
+
+if __name__ == "__main__":
+    main()